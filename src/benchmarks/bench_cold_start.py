@@ -0,0 +1,126 @@
+# bench_cold_start.py
+# Measures what a cold function instance pays per request path: the time to import
+# main.py and the time to the first response (import plus the first request), and
+# the same request again on the now warm instance. Every path runs in a fresh
+# subprocess, so each import is a real cold import. The Firestore client is the
+# in-memory fake (injected as main's instance client), so data reads cost nothing
+# and the numbers isolate import and initialization work. "solve" POSTs a small
+# synthetic dataset to optimizeProduction; the other paths never need the solver,
+# and the "solverLoaded" column shows whether OR-Tools was imported anyway.
+# Usage: python bench_cold_start.py [--paths preflight health ...] [--repeat 3] [--items 200] [--machines 6] [--json out.json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'functions'))
+
+PATHS = ("preflight", "health", "job_status", "plan_view", "solve")
+
+
+def request_for(path):
+    """(handler name, EnvironBuilder arguments) of a request path."""
+    if path == "preflight":
+        return "optimizeProduction", {"method": "OPTIONS"}
+    if path == "health":
+        return "health", {"method": "GET"}
+    if path == "job_status":
+        # Unknown job: the error path of the status endpoint
+        return "optimizationJobs", {"method": "GET", "query_string": {"jobId": "unknown"}}
+    if path == "plan_view":
+        return "productionPlan", {"method": "GET", "query_string": {"planId": "bench", "pageSize": 100}}
+    if path == "solve":
+        return "optimizeProduction", {"method": "POST", "json": {
+            "warm_start": False, "use_cache": False, "anytime": {"max_time_seconds": 10}}}
+    raise ValueError(f"Unknown path '{path}'. Expected one of {PATHS}.")
+
+
+def prepare(db, path, items, machines):
+    """Puts the documents a path reads into the fake client (not timed)."""
+    if path == "plan_view":
+        from plan_storage import save_plan
+        entries = [{"month": "Jan", "machineId": "M1", "itemId": f"I{n}", "quantity": n, "operationTimeUsedMinutes": 1.0,
+                    "machiningCostSEK": 1.0} for n in range(1000)]
+        save_plan(db, {"status": "success"}, entries)
+        # save_plan picks an id; the request asks for a fixed one
+        plans = db.collection('production_plans')
+        plan_id = next(iter(plans.docs))
+        plans.docs["bench"] = plans.docs.pop(plan_id)
+        plans.subcollections[("bench", "pages")] = plans.subcollections.pop((plan_id, "pages"))
+    elif path == "solve":
+        from bench_dataset_load import populate
+        from synthetic import generate_items, generate_machines
+        machine_docs = generate_machines(machines)
+        populate(db, generate_items(items, machine_docs), machine_docs)
+
+
+def run_child(path, items, machines):
+    """Cold import of main and two requests on one path; prints the measurements as JSON."""
+    from flask import Request
+    from werkzeug.test import EnvironBuilder
+
+    from fake_firestore import FakeFirestoreClient
+
+    handler_name, request_args = request_for(path)
+    start = time.perf_counter()
+    import main
+    import_seconds = time.perf_counter() - start
+
+    db = FakeFirestoreClient()
+    main._db = db
+    prepare(db, path, items, machines)
+
+    timings = []
+    for _ in range(2):
+        request = Request(EnvironBuilder(path="/", **request_args).get_environ())
+        start = time.perf_counter()
+        response = getattr(main, handler_name)(request)
+        timings.append(time.perf_counter() - start)
+    print(json.dumps({
+        "path": path, "status": response.status_code, "importSeconds": import_seconds,
+        "firstResponseSeconds": import_seconds + timings[0], "warmResponseSeconds": timings[1],
+        "solverLoaded": "ortools" in sys.modules,
+    }))
+
+
+def run_path(path, repeat, items, machines):
+    rows = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", path, "--items", str(items),
+                                 "--machines", str(machines)], check=True, capture_output=True, text=True, cwd=BENCHMARKS_DIR).stdout
+        rows.append(json.loads(output.strip().splitlines()[-1]))
+    # Best of the repeats per measurement, like the other benchmarks
+    row = dict(rows[0])
+    for key in ("importSeconds", "firstResponseSeconds", "warmResponseSeconds"):
+        row[key] = round(min(r[key] for r in rows), 4)
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--paths', nargs='+', choices=PATHS, default=list(PATHS))
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--items', type=int, default=200)
+    parser.add_argument('--machines', type=int, default=6)
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--child', choices=PATHS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.items, args.machines)
+        return
+
+    results = [run_path(path, args.repeat, args.items, args.machines) for path in args.paths]
+    for row in results:
+        print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
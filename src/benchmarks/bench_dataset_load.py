@@ -0,0 +1,83 @@
+# bench_dataset_load.py
+# Measures how long the optimizer takes to get its input columns: streaming the items
+# and machines collections and converting the documents, versus reading the columnar
+# snapshot (memory-mapped and fully loaded). Runs against the in-memory fake client,
+# or against the Firestore emulator when FIRESTORE_EMULATOR_HOST is set. The fake
+# client has no stream latency, so its numbers are a lower bound for Firestore.
+# Usage: python bench_dataset_load.py [--items 20000] [--machines 12] [--repeat 3] [--json out.json]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'functions'))
+
+from dataset_snapshot import read_snapshot, stream_columns, write_snapshot
+from fake_firestore import FakeFirestoreClient
+from planning_data import normalize_columns
+from synthetic import generate_items, generate_machines
+
+
+def make_client():
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        return firestore.Client(project=os.environ.get("GCLOUD_PROJECT", "demo-dataset-load-bench"))
+    return FakeFirestoreClient()
+
+
+def populate(db, items, machines):
+    for collection_name, documents in (("items", items), ("machines", machines)):
+        batch = db.batch()
+        pending = 0
+        for doc_id, document in documents.items():
+            batch.set(db.collection(collection_name).document(doc_id), document)
+            pending += 1
+            if pending == 500:
+                batch.commit()
+                batch, pending = db.batch(), 0
+        if pending:
+            batch.commit()
+
+
+def best_of(repeat, load):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        normalize_columns(load())
+        seconds.append(time.perf_counter() - start)
+    return round(min(seconds), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--machines', type=int, default=12)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    machines = generate_machines(args.machines)
+    db = make_client()
+    populate(db, generate_items(args.items, machines), machines)
+
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        manifest = write_snapshot(snapshot_dir, stream_columns(db))
+        snapshot_bytes = sum(os.path.getsize(os.path.join(snapshot_dir, name)) for name in os.listdir(snapshot_dir))
+        results = [
+            {"source": "firestore", "seconds": best_of(args.repeat, lambda: stream_columns(db))},
+            {"source": "snapshot (mmap)", "seconds": best_of(args.repeat, lambda: read_snapshot(snapshot_dir))},
+            {"source": "snapshot (loaded)", "seconds": best_of(args.repeat, lambda: read_snapshot(snapshot_dir, mmap=False))},
+        ]
+    for row in results:
+        row.update(items=manifest["itemCount"], machines=manifest["machineCount"], snapshotBytes=snapshot_bytes)
+        print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# bench_ingest_memory.py
+# Peak RSS of item ingestion versus input size, reading the whole file at once versus
+# streaming it in chunks (src/scripts/streaming_reader.py). Every measurement runs in a
+# fresh subprocess against a fake Firestore client that does not keep the documents.
+# Usage: python bench_ingest_memory.py [--rows 20000 80000 160000] [--format csv|xlsx] [--chunk-rows 5000] [--json out.json]
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+from synthetic import generate_item_rows, generate_machines
+
+
+def write_input(path, rows, file_format):
+    frame = generate_item_rows(rows, generate_machines(6))
+    if file_format == 'csv':
+        frame.to_csv(path, sep=';', index=False)
+    else:
+        import openpyxl
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet('Items')
+        sheet.append(list(frame.columns))
+        for row in frame.itertuples(index=False):
+            sheet.append(list(row))
+        workbook.save(path)
+
+
+def peak_rss_mb():
+    # ru_maxrss of an exec'd child can include the parent's high-water mark at fork time;
+    # VmHWM belongs to the current address space only
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def worker(mode, path, file_format, chunk_rows):
+    import pandas as pd
+    import ingest_data
+    from fake_firestore import FakeFirestoreClient
+    from streaming_reader import iter_csv_chunks, iter_xlsx_chunks
+
+    db = FakeFirestoreClient(keep_documents=False)
+    start = time.perf_counter()
+    if mode == 'frame':
+        df = pd.read_csv(path, delimiter=';') if file_format == 'csv' else pd.ExcelFile(path).parse('Items')
+        _, report = ingest_data.ingest_items(db, df)
+    else:
+        chunks = iter_csv_chunks(path, chunk_rows) if file_format == 'csv' else iter_xlsx_chunks(path, 'Items', chunk_rows)
+        _, report = ingest_data.ingest_item_chunks(db, chunks)
+    return {
+        "seconds": round(time.perf_counter() - start, 3),
+        "writes": report["writes"],
+        "peakRssMB": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='+', default=[20000, 80000, 160000])
+    parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+    parser.add_argument('--chunk-rows', type=int, default=5000)
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--worker', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, path = args.worker
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = worker(mode, path, args.format, args.chunk_rows)
+            finally:
+                sys.stdout = stdout
+        print(json.dumps(result))
+        return
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"items-{rows}.{args.format}")
+            write_input(path, rows, args.format)
+            for mode in ('frame', 'stream'):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', mode, path,
+                                         '--format', args.format, '--chunk-rows', str(args.chunk_rows)],
+                                        check=True, capture_output=True, text=True).stdout
+                row = {"rows": rows, "format": args.format, "mode": mode, **json.loads(output.strip().splitlines()[-1])}
+                results.append(row)
+                print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
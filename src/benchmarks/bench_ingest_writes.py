@@ -0,0 +1,62 @@
+# bench_ingest_writes.py
+# Measures item ingestion throughput (rows/s) for one write per document versus
+# batched commits, sequential and concurrent. Runs against the in-memory fake client
+# with a simulated round-trip latency, or against the Firestore emulator when
+# FIRESTORE_EMULATOR_HOST is set.
+# Usage: python bench_ingest_writes.py [--rows 2000] [--latency-ms 20] [--concurrency 1 4 8] [--json out.json]
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import ingest_data
+from fake_firestore import FakeFirestoreClient
+from synthetic import generate_item_rows, generate_machines
+
+
+def make_client(latency_seconds):
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+        return firestore.Client(project=os.environ.get("GCLOUD_PROJECT", "demo-ingest-bench"))
+    return FakeFirestoreClient(rpc_latency_seconds=latency_seconds)
+
+
+def bench(rows, mode, batch_size, concurrency, latency_seconds):
+    db = make_client(latency_seconds)
+    start = time.perf_counter()
+    _, stats = ingest_data.ingest_items(db, rows.copy(), batch_size=batch_size, max_concurrent_commits=concurrency)
+    seconds = time.perf_counter() - start
+    return {
+        "mode": mode, "rows": len(rows), "batchSize": batch_size, "concurrency": concurrency,
+        "commits": stats["commits"], "seconds": round(seconds, 3),
+        "rowsPerSecond": round(stats["writes"] / seconds, 1) if seconds > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=float, default=20.0, help="Simulated round trip per write RPC (fake client only)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    rows = generate_item_rows(args.rows, generate_machines(6))
+    latency_seconds = args.latency_ms / 1000.0
+
+    results = [bench(rows, "per-document", 1, 1, latency_seconds)]
+    for concurrency in args.concurrency:
+        results.append(bench(rows, "batched", ingest_data.WRITE_BATCH_SIZE, concurrency, latency_seconds))
+    for row in results:
+        print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_item_normalization.py
+# Compares the per-row (iterrows) item parsing with the column-wise normalization in
+# src/scripts/item_table.py on a synthetic turning-data CSV (semicolon separated,
+# comma decimals), and checks that both produce the same documents.
+# Usage: python bench_item_normalization.py [--rows 100000] [--skip-legacy] [--json out.json]
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+
+import pandas as pd
+
+from ingest_data import parse_float_with_comma
+from item_table import CONSUMPTION_COLUMN_MAP, normalize_items_frame, item_documents
+from synthetic import generate_item_rows, generate_machines
+
+
+def parse_operation_time(op_time_str):
+    # The previous per-row parser of the operation time (item_table._numeric with strip_unit replaced it)
+    if pd.isna(op_time_str) or str(op_time_str).lower() == 'nan':
+        return 0.0
+    try:
+        return float(str(op_time_str).replace(',', '.').upper().replace(' MIN', '').strip())
+    except ValueError:
+        return 0.0
+
+
+def legacy_documents(df):
+    """The previous per-row parser of ingest_items, without the Firestore writes."""
+    df.columns = [str(col).strip() for col in df.columns]
+    documents = {}
+    for index, row in df.iterrows():
+        item_id_val = str(row['Item Id']).strip()
+        if not item_id_val or item_id_val.lower() == 'nan':
+            continue
+        monthly_consumption = {}
+        for excel_col, firestore_month in CONSUMPTION_COLUMN_MAP.items():
+            val = 0
+            if excel_col in row and not pd.isna(row[excel_col]):
+                val = int(parse_float_with_comma(row[excel_col]))
+            monthly_consumption[firestore_month] = val
+        documents[item_id_val] = {
+            'itemId': item_id_val,
+            'operationTimePerPC': parse_operation_time(row.get('Operation Time Per PC')),
+            'materialLengthMM': parse_float_with_comma(row.get('Material Length (mm)')),
+            'currentMachineId': str(row.get('Machine Id', '')).strip(),
+            'rawMaterialId': str(row.get('RawMaterial Id', '')).strip(),
+            'forecastYear': int(parse_float_with_comma(row.get('FORECAST_YEAR', 0))),
+            'FIXED_LOT_SIZE': int(parse_float_with_comma(row.get('FIXED_LOT_SIZE', 0))),
+            'monthlyConsumption': monthly_consumption,
+        }
+    return documents
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--skip-legacy', action='store_true', help="Only time the column-wise normalization")
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'turning-data.csv')
+        generate_item_rows(args.rows, generate_machines(6)).to_csv(csv_path, sep=';', index=False)
+        start = time.perf_counter()
+        df = pd.read_csv(csv_path, delimiter=';')
+        read_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table, rejections = normalize_items_frame(df)
+    normalize_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    documents = dict(item_documents(table))
+    documents_seconds = time.perf_counter() - start
+    result = {
+        "rows": args.rows, "accepted": len(table), "rejected": len(rejections),
+        "readSeconds": round(read_seconds, 3), "normalizeSeconds": round(normalize_seconds, 3),
+        "documentsSeconds": round(documents_seconds, 3),
+        "rowsPerSecond": round(args.rows / (normalize_seconds + documents_seconds), 1),
+    }
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        legacy = legacy_documents(df.copy())
+        legacy_seconds = time.perf_counter() - start
+        result.update({
+            "legacySeconds": round(legacy_seconds, 3),
+            "legacyRowsPerSecond": round(args.rows / legacy_seconds, 1),
+            "speedup": round(legacy_seconds / (normalize_seconds + documents_seconds), 1),
+            "identical": legacy == documents,
+        })
+    print(json.dumps(result))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# bench_model_build.py
+# Measures input normalization and CP-SAT model build time versus item and machine count.
+# Usage: python bench_model_build.py [--items 100 500 1000] [--machines 6 24 48] [--json out.json]
+import argparse
+import json
+import time
+
+from synthetic import generate_items, generate_machines
+from planning_data import normalize_inputs
+from planning_model import build_model
+
+
+def bench(num_items, num_machines):
+    machines = generate_machines(num_machines)
+    items = generate_items(num_items, machines)
+
+    start = time.perf_counter()
+    data = normalize_inputs(items, machines)
+    normalize_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    handle = build_model(data, 0.10)
+    build_seconds = time.perf_counter() - start
+
+    proto = handle["model"].Proto()
+    return {
+        "items": num_items, "machines": num_machines,
+        "normalizeSeconds": round(normalize_seconds, 4), "buildSeconds": round(build_seconds, 4),
+        "variables": len(proto.variables), "constraints": len(proto.constraints),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, nargs='+', default=[100, 250, 500, 1000])
+    parser.add_argument('--machines', type=int, nargs='+', default=[6, 12, 24])
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'items':>6} {'machines':>8} {'normalize s':>12} {'build s':>9} {'variables':>10} {'constraints':>12}")
+    for num_machines in args.machines:
+        for num_items in args.items:
+            row = bench(num_items, num_machines)
+            results.append(row)
+            print(f"{row['items']:>6} {row['machines']:>8} {row['normalizeSeconds']:>12.4f} {row['buildSeconds']:>9.3f} {row['variables']:>10} {row['constraints']:>12}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
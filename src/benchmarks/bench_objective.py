@@ -0,0 +1,74 @@
+# bench_objective.py
+# Compares the "linear" and "multiplication" objective formulations on the sample
+# data: model size, build time, time to first feasible solution and final objective.
+# Usage: python bench_objective.py [--time-limit 30] [--workers 8] [--json out.json]
+import argparse
+import json
+import time
+
+from ortools.sat.python import cp_model
+
+from sample_data import load_turning_data
+from planning_data import normalize_inputs
+from planning_model import OBJECTIVE_MODES, build_model
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    def __init__(self):
+        super().__init__()
+        self.first_solution_seconds = None
+        self.solutions = 0
+
+    def on_solution_callback(self):
+        if self.first_solution_seconds is None:
+            self.first_solution_seconds = self.WallTime()
+        self.solutions += 1
+
+
+def bench(data, objective_mode, time_limit, workers):
+    start = time.perf_counter()
+    handle = build_model(data, 0.10, objective_mode=objective_mode)
+    build_seconds = time.perf_counter() - start
+    proto = handle["model"].Proto()
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    timer = FirstSolutionTimer()
+    status = solver.Solve(handle["model"], timer)
+    return {
+        "objectiveMode": objective_mode,
+        "variables": len(proto.variables), "constraints": len(proto.constraints),
+        "buildSeconds": round(build_seconds, 3),
+        "firstFeasibleSeconds": round(timer.first_solution_seconds, 3) if timer.first_solution_seconds is not None else None,
+        "solveSeconds": round(solver.WallTime(), 3),
+        "status": solver.StatusName(status),
+        "objective": solver.ObjectiveValue() if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else None,
+        "solutions": timer.solutions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--time-limit', type=float, default=30.0)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    items, machines = load_turning_data()
+    data = normalize_inputs(items, machines)
+    print(f"turning-data.csv: {len(items)} items, {len(machines)} machines")
+
+    results = []
+    for objective_mode in OBJECTIVE_MODES:
+        row = bench(data, objective_mode, args.time_limit, args.workers)
+        results.append(row)
+        print(json.dumps(row))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# bench_solver_backends.py
+# Compares the solver backends (CP-SAT, the SCIP MIP and the GLOP LP relaxation with
+# rounding) on turning-data.csv and on synthetic sets of growing size: build and solve
+# wall time, objective, bound and gap, all in the CP-SAT model's objective units. The
+# synthetic machines are all of one type, so each set is a single model (one
+# decomposition component), and demand is thinned to the given share of capacity.
+# Usage: python bench_solver_backends.py [--sizes 1000x12 4000x24] [--backends cpsat mip lp]
+#        [--load 0.3] [--formulation basic] [--time-limit 60] [--json out.json]
+import argparse
+import json
+import time
+
+from sample_data import load_turning_data
+from synthetic import generate_items, generate_machines
+from planning_data import normalize_inputs
+from eligibility import DEFAULT_ELIGIBILITY_POLICY, build_eligibility
+from anytime import parse_stop_criteria, relative_gap
+from solver_backends import SOLVER_BACKENDS, solve_problem
+
+def capacity_load(data):
+    return float((data["demand"] * data["op_time"][:, None]).sum() / (data["capacity_minutes"].sum() * data["demand"].shape[1]))
+
+
+def synthetic_data(num_items, num_machines, load):
+    machines = generate_machines(num_machines, num_types=1)
+    full = normalize_inputs(generate_items(num_items, machines), machines)
+    # Load is proportional to the share of months with demand
+    density = min(0.9, 0.9 * load / capacity_load(full))
+    return normalize_inputs(generate_items(num_items, machines, demand_density=density), machines)
+
+
+def bench(name, data, backend, formulation, time_limit):
+    mask = build_eligibility(data, DEFAULT_ELIGIBILITY_POLICY)
+    criteria = {**parse_stop_criteria({"max_time_seconds": time_limit}), "relative_gap": 0.0}
+    start = time.perf_counter()
+    result = solve_problem(data, mask, 0.10, "linear", criteria, backend=backend, formulation=formulation, log_search_progress=False)
+    total_seconds = time.perf_counter() - start
+    return {
+        "dataset": name, "items": len(data["item_ids"]), "machines": len(data["machine_ids"]),
+        "load": round(capacity_load(data), 3), "variables": int(mask.sum()) * data["demand"].shape[1],
+        "backend": backend, "solver": result["backend"]["solver"], "status": result["statusName"],
+        "buildSeconds": round(total_seconds - result["wallTime"], 3), "solveSeconds": round(result["wallTime"], 3),
+        "objective": result.get("objective"), "bestBound": result.get("bestBound"),
+        "gap": relative_gap(result.get("objective"), result.get("bestBound")),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', default=["1000x12", "2000x24", "4000x48"],
+                        help="Synthetic sets as <items>x<machines>")
+    parser.add_argument('--backends', nargs='+', default=[b for b in SOLVER_BACKENDS if b != "auto"], choices=SOLVER_BACKENDS)
+    parser.add_argument('--load', type=float, default=0.3, help="Share of machine capacity the synthetic demand needs")
+    parser.add_argument('--formulation', default="basic")
+    parser.add_argument('--time-limit', type=float, default=60.0)
+    parser.add_argument('--json', help="Write the results to this file")
+    args = parser.parse_args()
+
+    items, machines = load_turning_data()
+    datasets = [("turning-data.csv", normalize_inputs(items, machines))]
+    for size in args.sizes:
+        num_items, num_machines = (int(part) for part in size.split("x"))
+        datasets.append((f"synthetic {size}", synthetic_data(num_items, num_machines, args.load)))
+
+    results = []
+    print(f"{'dataset':>20} {'load':>5} {'variables':>9} {'backend':>7} {'status':>9} {'build s':>8} {'solve s':>8} {'objective':>16} {'gap':>8}")
+    for name, data in datasets:
+        best = None
+        rows = []
+        for backend in args.backends:
+            row = bench(name, data, backend, args.formulation, args.time_limit)
+            rows.append(row)
+            if row["objective"] is not None and (best is None or row["objective"] < best):
+                best = row["objective"]
+        for row in rows:
+            # Objective relative to the best plan any backend found for this dataset
+            row["vsBest"] = None if row["objective"] is None or not best else round(row["objective"] / best - 1.0, 6)
+            results.append(row)
+            objective = f"{row['objective']:.0f}" if row["objective"] is not None else "-"
+            gap = f"{row['gap']:.4%}" if row["gap"] is not None else "-"
+            print(f"{name:>20} {row['load']:>5.2f} {row['variables']:>9} {row['backend']:>7} {row['status']:>9} {row['buildSeconds']:>8.2f} "
+                  f"{row['solveSeconds']:>8.2f} {objective:>16} {gap:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+# bench_solver_suite.py
+# Regression benchmark of the optimizer core on synthetic item/machine sets: loading the
+# columns from a fake Firestore client, normalization, eligibility, model build, solve
+# and plan extraction. Per case it records each phase's time, the model's variable and
+# constraint counts, the time to the first feasible solution, the final gap and the
+# peak RSS. Every case runs in a fresh subprocess, so the memory high-water marks are
+# its own. --eligibility-density sets the share of machines an item may run on
+# (the machines are split into 1/density types). CP-SAT runs with --workers workers
+# (default 1, which makes its search deterministic) and stops at --relative-gap, by
+# default the optimizer's own.
+# --baseline writes the results as a JSON baseline. --compare checks them against
+# one: counts must match, and times, memory and gap may grow by at most --tolerance.
+# It exits with status 1 on a regression.
+# Usage: python bench_solver_suite.py [--sizes 200x6 500x12 1000x12] [--demand-density 0.9]
+#        [--eligibility-density 0.5] [--formulation basic] [--time-limit 30] [--relative-gap 0.01] [--workers 1]
+#        [--baseline out.json | --compare baseline.json [--tolerance 0.25]] [--json out.json]
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from bench_dataset_load import populate
+from bench_ingest_memory import peak_rss_mb
+from fake_firestore import FakeFirestoreClient
+from synthetic import generate_items, generate_machines
+from dataset_snapshot import stream_columns
+from planning_data import normalize_columns
+from eligibility import DEFAULT_ELIGIBILITY_POLICY, build_eligibility, eligible_pairs
+from anytime import relative_gap
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_solver_suite.json")
+# Measurements compared against the baseline: relative growth for times and memory, absolute for the gap (GAP_TOLERANCE)
+TIMED_FIELDS = ("loadSeconds", "normalizeSeconds", "buildSeconds", "firstSolutionSeconds", "solveSeconds", "extractSeconds", "peakRssMB")
+COUNT_FIELDS = ("eligiblePairs", "variables", "constraints")
+# Phases this short are dominated by noise and never count as regressions
+MIN_COMPARED_SECONDS = 0.05
+GAP_TOLERANCE = 0.001
+
+
+def run_case(num_items, num_machines, demand_density, eligibility_density, formulation, time_limit, gap_limit, workers):
+    from ortools.sat.python import cp_model
+    from planning_model import build_model, extract_plan, solution_values
+    from progress import SolutionProgressCallback
+
+    machines = generate_machines(num_machines, num_types=max(1, round(1 / eligibility_density)))
+    db = FakeFirestoreClient()
+    populate(db, generate_items(num_items, machines, demand_density=demand_density), machines)
+    row = {}
+
+    start = time.perf_counter()
+    columns = stream_columns(db)
+    row["loadSeconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    data = normalize_columns(columns)
+    mask = build_eligibility(data, DEFAULT_ELIGIBILITY_POLICY)
+    row["normalizeSeconds"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    handle = build_model(data, 0.10, pairs=eligible_pairs(mask), formulation=formulation)
+    row["buildSeconds"] = time.perf_counter() - start
+    proto = handle["model"].Proto()
+    row.update({"eligiblePairs": int(mask.sum()), "variables": len(proto.variables), "constraints": len(proto.constraints)})
+
+    solver = cp_model.CpSolver()
+    solver.parameters.log_search_progress = False
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    solver.parameters.relative_gap_limit = gap_limit
+    callback = SolutionProgressCallback(handle, data)
+    status = solver.Solve(handle["model"], callback)
+    row.update({
+        "status": solver.StatusName(status),
+        "solveSeconds": solver.WallTime(),
+        "firstSolutionSeconds": callback.solutions[0]["wallTime"] if callback.solutions else None,
+        "solutions": len(callback.solutions),
+        "branches": solver.NumBranches(),
+        "conflicts": solver.NumConflicts(),
+        "objective": None, "bestBound": None, "gap": None, "extractSeconds": None, "planEntries": None,
+    })
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        start = time.perf_counter()
+        plan = extract_plan(solution_values(solver), handle, data)["plan"]
+        row["extractSeconds"] = time.perf_counter() - start
+        row.update({"objective": solver.ObjectiveValue(), "bestBound": solver.BestObjectiveBound(), "planEntries": len(plan)})
+        row["gap"] = relative_gap(row["objective"], row["bestBound"])
+    row["peakRssMB"] = peak_rss_mb()
+    return {key: round(value, 4) if isinstance(value, float) else value for key, value in row.items()}
+
+
+def compare(results, baseline, tolerance):
+    """Lines describing each regression of ``results`` against the ``baseline`` rows with the same case."""
+    baseline_by_case = {row["case"]: row for row in baseline}
+    regressions = []
+    for row in results:
+        before = baseline_by_case.get(row["case"])
+        if before is None:
+            print(f"{row['case']}: not in baseline")
+            continue
+        for field in COUNT_FIELDS:
+            if row[field] != before[field]:
+                regressions.append(f"{row['case']}: {field} {before[field]} -> {row[field]}")
+        if row["status"] != before["status"] and before["status"] == "OPTIMAL":
+            regressions.append(f"{row['case']}: status {before['status']} -> {row['status']}")
+        for field in TIMED_FIELDS:
+            old, new = before.get(field), row.get(field)
+            if old is None or new is None:
+                if old is not None:
+                    regressions.append(f"{row['case']}: {field} {old} -> none")
+                continue
+            if field != "peakRssMB" and max(old, new) < MIN_COMPARED_SECONDS:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"{row['case']}: {field} {old} -> {new} (+{new / old - 1:.0%})" if old else f"{row['case']}: {field} 0 -> {new}")
+        if before.get("gap") is not None and (row["gap"] is None or row["gap"] > before["gap"] + GAP_TOLERANCE):
+            regressions.append(f"{row['case']}: gap {before['gap']} -> {row['gap']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', nargs='+', default=["200x6", "500x12", "1000x12"], help="Cases as <items>x<machines>")
+    parser.add_argument('--demand-density', type=float, default=0.9, help="Share of months with demand")
+    parser.add_argument('--eligibility-density', type=float, default=0.5, help="Share of machines an item may run on")
+    parser.add_argument('--formulation', default="basic")
+    parser.add_argument('--time-limit', type=float, default=30.0)
+    parser.add_argument('--relative-gap', type=float, default=0.01, help="Relative gap limit (the stored baseline uses 0.01)")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE, help="Write the results as the baseline")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help="Compare the results with this baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed relative growth of times and memory")
+    parser.add_argument('--json', help="Write the results to this file")
+    parser.add_argument('--worker', metavar='SIZE', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    options = ['--demand-density', str(args.demand_density), '--eligibility-density', str(args.eligibility_density),
+               '--formulation', args.formulation, '--time-limit', str(args.time_limit), '--relative-gap', str(args.relative_gap), '--workers', str(args.workers)]
+
+    if args.worker:
+        num_items, num_machines = (int(part) for part in args.worker.split("x"))
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = run_case(num_items, num_machines, args.demand_density, args.eligibility_density,
+                                  args.formulation, args.time_limit, args.relative_gap, args.workers)
+            finally:
+                sys.stdout = stdout
+        print(json.dumps(result))
+        return
+
+    results = []
+    print(f"{'case':>34} {'vars':>7} {'constr':>7} {'build s':>8} {'first s':>8} {'solve s':>8} {'extract s':>9} {'gap':>8} {'peak MB':>8}")
+    for size in args.sizes:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', size, *options],
+                                check=True, capture_output=True, text=True).stdout
+        case = f"{size} d{args.demand_density:g} e{args.eligibility_density:g} {args.formulation}"
+        row = {"case": case, "size": size, "demandDensity": args.demand_density, "eligibilityDensity": args.eligibility_density,
+               "formulation": args.formulation, "timeLimit": args.time_limit, "relativeGap": args.relative_gap, "workers": args.workers,
+               **json.loads(output.strip().splitlines()[-1])}
+        results.append(row)
+        first = f"{row['firstSolutionSeconds']:.2f}" if row["firstSolutionSeconds"] is not None else "-"
+        extract = f"{row['extractSeconds']:.3f}" if row["extractSeconds"] is not None else "-"
+        gap = f"{row['gap']:.4%}" if row["gap"] is not None else "-"
+        print(f"{case:>34} {row['variables']:>7} {row['constraints']:>7} {row['buildSeconds']:>8.3f} {first:>8} "
+              f"{row['solveSeconds']:>8.2f} {extract:>9} {gap:>8} {row['peakRssMB']:>8.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        print(f"{len(regressions)} regression(s) against {args.compare}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# fake_firestore.py
+# Minimal in-memory stand-in for the parts of the Firestore client used by the
+# ingestion script and the optimizer, so benchmarks can run without credentials.
+# ``rpc_latency_seconds`` adds a sleep to every write round trip (single document
+# writes and batch commits) to approximate the network cost of the real service;
+# ``keep_documents=False`` counts writes without storing them (memory benchmarks).
+# Queries support order_by and limit (the newest stored plan); SERVER_TIMESTAMP
+# fields are stored as the write's time.
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    from google.cloud.firestore import SERVER_TIMESTAMP
+except ImportError:  # Benchmarks without the Firestore client never write the sentinel
+    SERVER_TIMESTAMP = None
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data, merge=False):
+        self._collection.client.round_trip()
+        self._write(data, merge)
+
+    def _write(self, data, merge=False):
+        if not self._collection.client.keep_documents:
+            return
+        if SERVER_TIMESTAMP is not None:
+            data = {key: datetime.now(timezone.utc) if value is SERVER_TIMESTAMP else value for key, value in data.items()}
+        if merge and self.id in self._collection.docs:
+            self._collection.docs[self.id].update(data)
+        else:
+            self._collection.docs[self.id] = dict(data)
+
+    def get(self):
+        return FakeSnapshot(self.id, self._collection.docs.get(self.id))
+
+    def delete(self):
+        self._collection.docs.pop(self.id, None)
+
+    def collection(self, name):
+        # Subcollections live next to the parent collection's documents, keyed by document id
+        key = (self.id, name)
+        if key not in self._collection.subcollections:
+            self._collection.subcollections[key] = FakeCollection(self._collection.client)
+        return self._collection.subcollections[key]
+
+
+class FakeWriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._operations = []
+
+    def set(self, doc_ref, data, merge=False):
+        self._operations.append((doc_ref, data, merge))
+
+    def delete(self, doc_ref):
+        self._operations.append((doc_ref, None, False))
+
+    def commit(self):
+        self._client.round_trip()
+        with self._client.lock:
+            for doc_ref, data, merge in self._operations:
+                if data is None:
+                    doc_ref._collection.docs.pop(doc_ref.id, None)
+                else:
+                    doc_ref._write(data, merge)
+        self._client.commits += 1
+
+
+class FakeQuery:
+    def __init__(self, collection, orders=(), limit=None):
+        self._collection = collection
+        self._orders = tuple(orders)
+        self._limit = limit
+
+    def order_by(self, field, direction=None):
+        return FakeQuery(self._collection, self._orders + ((field, direction == "DESCENDING"),), self._limit)
+
+    def limit(self, count):
+        return FakeQuery(self._collection, self._orders, count)
+
+    def stream(self):
+        # As in Firestore, ordering on a field leaves out the documents without it, and ties
+        # follow the document id in the direction of the last ordering
+        snapshots = sorted(self._collection.stream(), key=lambda s: s.id, reverse=bool(self._orders) and self._orders[-1][1])
+        for field, descending in reversed(self._orders):
+            snapshots = sorted((s for s in snapshots if field in s._data), key=lambda s: s._data[field], reverse=descending)
+        return snapshots if self._limit is None else snapshots[:self._limit]
+
+
+class FakeCollection:
+    def __init__(self, client):
+        self.client = client
+        self.docs = {}
+        self.subcollections = {}
+        self._next_id = 0
+
+    def document(self, doc_id=None):
+        if doc_id is None:
+            self._next_id += 1
+            doc_id = f"auto{self._next_id:08d}"
+        return FakeDocument(self, doc_id)
+
+    def add(self, data):
+        doc = self.document()
+        doc.set(data)
+        return None, doc
+
+    def stream(self):
+        return [FakeSnapshot(doc_id, data) for doc_id, data in list(self.docs.items())]
+
+    def order_by(self, field, direction=None):
+        return FakeQuery(self).order_by(field, direction)
+
+    def limit(self, count):
+        return FakeQuery(self).limit(count)
+
+
+class FakeFirestoreClient:
+    def __init__(self, rpc_latency_seconds=0.0, keep_documents=True):
+        self.collections = {}
+        self.rpc_latency_seconds = rpc_latency_seconds
+        self.keep_documents = keep_documents
+        self.round_trips = 0
+        self.commits = 0
+        self.lock = threading.Lock()
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        if self.rpc_latency_seconds:
+            time.sleep(self.rpc_latency_seconds)
+
+    def collection(self, name):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self)
+        return self.collections[name]
+
+    def batch(self):
+        return FakeWriteBatch(self)
@@ -0,0 +1,27 @@
+# sample_data.py
+# Loads the sample planning data in data/ through the real ingestion code into a
+# fake Firestore client and returns the resulting item and machine documents.
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'scripts'))
+sys.path.insert(0, os.path.join(BENCHMARKS_DIR, '..', 'functions'))
+
+import pandas as pd
+
+import ingest_data
+from fake_firestore import FakeFirestoreClient
+
+DATA_DIR = os.path.join(BENCHMARKS_DIR, '..', '..', 'data')
+CSV_PATH = os.path.join(DATA_DIR, 'turning-data.csv')
+EXCEL_PATH = os.path.join(DATA_DIR, 'turning-data.xlsx')
+
+
+def load_turning_data():
+    """Items from turning-data.csv, machines from the mapping/specification sheets of turning-data.xlsx."""
+    db = FakeFirestoreClient()
+    ingest_data.ingest_items(db, pd.read_csv(CSV_PATH, delimiter=';'))
+    xls = pd.ExcelFile(EXCEL_PATH)
+    ingest_data.ingest_machines(db, xls.parse('Machine Mapping'), xls.parse('Machine Specification'))
+    return db.collection('items').docs, db.collection('machines').docs
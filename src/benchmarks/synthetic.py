@@ -0,0 +1,73 @@
+# synthetic.py
+# Generates item and machine documents shaped like the output of
+# src/scripts/ingest_data.py (ingest_items / ingest_machines), for benchmarks.
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'functions'))
+
+from planning_data import MONTHS
+
+
+def generate_machines(num_machines, num_types=2, seed=0):
+    rng = random.Random(seed)
+    machines = {}
+    for m in range(num_machines):
+        machine_type = f"Type{m % num_types}"
+        machine_id = f"5523{m:04d}"
+        machines[machine_id] = {
+            'machineType': machine_type,
+            'actualMachineId': machine_id,
+            'dailyOperationalHours': 24,
+            'weeklyOperationalDays': 5,
+            'hourlyOperatingCost': rng.choice([600.0, 660.0, 780.0]),
+            'turretCapacity': rng.choice([10, 12]),
+            'toolCapacityTurret2': rng.choice([10, 12]),
+            'toolCapacityMillingSpindle': rng.choice([80, 139]),
+            'speedUpFactor': rng.choice([1.0, 1.1]),
+            'toolChangeTimeMinutes': 5,
+            'rawMaterialChangeTimeMinutes': 20,
+        }
+    return machines
+
+
+def generate_items(num_items, machines, demand_density=0.9, seed=0):
+    rng = random.Random(seed)
+    machine_ids = list(machines.keys())
+    items = {}
+    for i in range(num_items):
+        item_id = f"{i + 1:010d}"
+        monthly_consumption = {m: (rng.randint(50, 700) if rng.random() < demand_density else 0) for m in MONTHS}
+        items[item_id] = {
+            'itemId': item_id,
+            'operationTimePerPC': round(rng.uniform(0.5, 8.0), 2),
+            'materialLengthMM': float(rng.randint(10, 40)),
+            'currentMachineId': rng.choice(machine_ids) if machine_ids else '',
+            'rawMaterialId': f"20000000{rng.randint(0, 24):02d}",
+            'forecastYear': sum(monthly_consumption.values()),
+            'FIXED_LOT_SIZE': rng.choice([0, 250, 500, 1000]),
+            'monthlyConsumption': monthly_consumption,
+            'baseCostPerItem': round(rng.uniform(1.5, 3.0), 2),
+        }
+    return items
+
+
+def generate_item_rows(num_items, machines, demand_density=0.9, seed=0):
+    """Spreadsheet rows (as read from the Items sheet / CSV) for the same items as generate_items."""
+    import pandas as pd
+
+    rows = []
+    for item_id, item in generate_items(num_items, machines, demand_density, seed).items():
+        row = {
+            'Item Id': item_id,
+            'Material Length (mm)': f"{item['materialLengthMM']:g}",
+            'Operation Time Per PC': f"{item['operationTimePerPC']:g}".replace('.', ','),
+            'Machine Id': item['currentMachineId'],
+            'FORECAST_YEAR': item['forecastYear'],
+            'FIXED_LOT_SIZE': item['FIXED_LOT_SIZE'],
+            'RawMaterial Id': item['rawMaterialId'],
+        }
+        row.update({f"Consumed {month}": qty for month, qty in item['monthlyConsumption'].items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
@@ -0,0 +1,137 @@
+# anytime.py
+# Anytime solving: every improving solution is recorded with its objective, bound
+# and wall time, and the search stops as soon as one of the stop criteria is met:
+# a relative optimality gap, no improvement for N seconds, or an absolute deadline.
+# Without a relative_gap in the request no gap limit is set, so the search runs to
+# proven optimality or the time limit; a plan accepted within a requested gap larger
+# than OPTIMALITY_TOLERANCE is reported as FEASIBLE, not OPTIMAL.
+import datetime
+import threading
+import time
+
+from planning_model import solve_model
+from progress import SolutionProgressCallback
+
+DEFAULT_MAX_TIME_SECONDS = 120.0
+DEFAULT_RELATIVE_GAP = None
+DEFAULT_NO_IMPROVEMENT_SECONDS = None
+# Only classifies the stop: a solve called optimal within a larger gap stopped on the gap limit
+# (SCIP's default MIP gap is 1e-4)
+OPTIMALITY_TOLERANCE = 1e-4
+WATCHDOG_POLL_SECONDS = 0.25
+
+
+def _parse_deadline(value):
+    # Epoch seconds or an ISO 8601 timestamp (naive timestamps are taken as UTC)
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, str):
+        parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+        return parsed.timestamp()
+    raise ValueError(f"Unsupported deadline: {value}")
+
+
+def parse_stop_criteria(options, now=None):
+    """Stop criteria from the payload's "anytime" section, falling back to the defaults.
+
+    Recognized keys: max_time_seconds, relative_gap, no_improvement_seconds and
+    deadline (epoch seconds or ISO timestamp). Invalid values are logged and ignored.
+    """
+    now = time.time() if now is None else now
+    criteria = {
+        "max_time_in_seconds": DEFAULT_MAX_TIME_SECONDS,
+        "relative_gap": DEFAULT_RELATIVE_GAP,
+        "no_improvement_seconds": DEFAULT_NO_IMPROVEMENT_SECONDS,
+        "deadline": None,
+    }
+    if not isinstance(options, dict):
+        return criteria
+
+    def positive(key):
+        value = options.get(key)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0:
+            return float(value)
+        print(f"Warning: Invalid anytime.{key} in payload: {value}. Using default.")
+        return None
+
+    if "max_time_seconds" in options:
+        criteria["max_time_in_seconds"] = positive("max_time_seconds") or DEFAULT_MAX_TIME_SECONDS
+    if "relative_gap" in options:
+        value = options.get("relative_gap")
+        criteria["relative_gap"] = float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) and 0 <= value < 1 else DEFAULT_RELATIVE_GAP
+    if "no_improvement_seconds" in options:
+        criteria["no_improvement_seconds"] = positive("no_improvement_seconds")
+    if options.get("deadline") is not None:
+        try:
+            criteria["deadline"] = _parse_deadline(options["deadline"])
+        except ValueError as e:
+            print(f"Warning: Invalid anytime.deadline in payload: {e}")
+    if criteria["deadline"] is not None:
+        criteria["max_time_in_seconds"] = max(0.1, min(criteria["max_time_in_seconds"], criteria["deadline"] - now))
+    return criteria
+
+
+class NoImprovementWatchdog(threading.Thread):
+    """Stops the search once no improving solution has been found for ``seconds`` (after the first one)."""
+
+    def __init__(self, callback, seconds):
+        super().__init__(daemon=True)
+        self.callback = callback
+        self.seconds = seconds
+        self.triggered = False
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(WATCHDOG_POLL_SECONDS):
+            last = self.callback.last_improvement
+            if last is not None and time.monotonic() - last >= self.seconds:
+                self.triggered = True
+                self.callback.StopSearch()
+                return
+
+    def finish(self):
+        self._done.set()
+
+
+def solve_anytime(handle, data, criteria, listener=None, num_workers=None, log_search_progress=True):
+    """Solves with the given stop criteria; the result gains an "anytime" report of the solution trajectory."""
+    callback = SolutionProgressCallback(handle, data, listener)
+    watchdog = None
+    if criteria.get("no_improvement_seconds"):
+        watchdog = NoImprovementWatchdog(callback, criteria["no_improvement_seconds"])
+        watchdog.start()
+    try:
+        result = solve_model(handle, data, max_time_in_seconds=criteria["max_time_in_seconds"], num_workers=num_workers,
+                             log_search_progress=log_search_progress, solution_callback=callback,
+                             relative_gap=criteria.get("relative_gap"))
+    finally:
+        if watchdog is not None:
+            watchdog.finish()
+
+    if watchdog is not None and watchdog.triggered:
+        stop_reason = "no_improvement"
+    elif result["statusName"] == "OPTIMAL":
+        gap = relative_gap(result.get("objective"), result.get("bestBound"))
+        stop_reason = "relative_gap" if gap and gap > OPTIMALITY_TOLERANCE else "optimal"
+        if stop_reason == "relative_gap":
+            # CP-SAT calls a plan within the gap limit optimal; it is only proven within the gap
+            result["statusName"] = "FEASIBLE"
+    elif result["statusName"] == "FEASIBLE" or result["statusName"] == "UNKNOWN":
+        stop_reason = "deadline" if criteria.get("deadline") is not None else "time_limit"
+    else:
+        stop_reason = result["statusName"].lower()
+    result["anytime"] = {
+        "stopReason": stop_reason,
+        "relativeGap": relative_gap(result.get("objective"), result.get("bestBound")),
+        "solutions": callback.solutions,
+        "criteria": criteria,
+    }
+    return result
+
+
+def relative_gap(objective, bound):
+    if objective is None or bound is None:
+        return None
+    return abs(objective - bound) / max(abs(objective), 1.0)
@@ -0,0 +1,69 @@
+# dataset_cache.py
+# Keeps the planning data of a warm function instance in memory between requests.
+# Every request still reads meta/dataset_version (one document), and the cached
+# columns are reused until ingest_data.py bumps that version. Without a version
+# document there is nothing to validate against, so the data is read every time.
+import threading
+
+import numpy as np
+
+from dataset_snapshot import load_dataset_columns, read_dataset_version
+from planning_data import deterministic_base_cost, normalize_columns
+
+
+class DatasetEntry:
+    """Loaded source columns of one dataset version, with missing base costs filled in.
+
+    The arrays are read-only (memory-mapped where the snapshot was); ``planning_data``
+    is the normalized form without overrides.
+    """
+
+    def __init__(self, columns, info):
+        # Memory-mapped snapshot columns stay mapped; only the column written to is copied
+        columns = {name: np.asarray(array) for name, array in columns.items()}
+        missing_cost = np.flatnonzero(np.isnan(columns["baseCostPerItem"]))
+        if len(missing_cost):
+            columns["baseCostPerItem"] = np.array(columns["baseCostPerItem"])
+            columns["baseCostPerItem"][missing_cost] = [deterministic_base_cost(item_id) for item_id in columns["item_ids"][missing_cost].tolist()]
+        for array in columns.values():
+            array.flags.writeable = False
+        self.columns = columns
+        self.info = info
+        self._planning_data = None
+
+    @property
+    def planning_data(self):
+        if self._planning_data is None:
+            self._planning_data = normalize_columns(self.columns)
+        return self._planning_data
+
+
+class DatasetCache:
+    """The current DatasetEntry of this instance, invalidated by meta/dataset_version."""
+
+    def __init__(self, loader=load_dataset_columns):
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self._version = None
+        self._entry = None
+        self._lock = threading.Lock()
+
+    def get(self, db):
+        """Returns (entry, cache_report) for the dataset version currently in Firestore."""
+        dataset_version = read_dataset_version(db)
+        version = (dataset_version or {}).get("version")
+        with self._lock:
+            if version is not None and self._entry is not None and self._version == version:
+                self.hits += 1
+                return self._entry, self._report(True, version)
+        # Load outside the lock: concurrent misses may both read, the last one is kept
+        entry = DatasetEntry(*self.loader(db, dataset_version))
+        with self._lock:
+            self.misses += 1
+            if version is not None:
+                self._version, self._entry = version, entry
+            return entry, self._report(False, version)
+
+    def _report(self, hit, version):
+        return {"hit": hit, "version": version, "hits": self.hits, "misses": self.misses}
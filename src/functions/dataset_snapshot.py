@@ -0,0 +1,132 @@
+# dataset_snapshot.py
+# Columnar snapshot of the planning data. ingest_data.py publishes the source columns
+# (planning_data.documents_to_columns) as one .npy file per column in Cloud Storage and
+# records the dataset version in the meta/dataset_version document. The optimizer
+# downloads a snapshot once per instance, memory-maps it, and only streams the items
+# and machines collections when no current snapshot exists.
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from planning_data import documents_to_columns
+
+SNAPSHOT_FORMAT = 2  # 2: machine changeover times
+DATASET_META_COLLECTION = "meta"
+DATASET_META_DOCUMENT = "dataset_version"
+SNAPSHOT_PREFIX = "dataset_snapshots"
+LOCAL_SNAPSHOT_DIR = os.environ.get("DATASET_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "dataset_snapshots"))
+MANIFEST_FILE = "manifest.json"
+
+
+def content_hash(columns):
+    """SHA-256 over every column (name, dtype, shape and bytes)."""
+    digest = hashlib.sha256(f"snapshot-{SNAPSHOT_FORMAT}".encode())
+    for name in sorted(columns):
+        array = np.ascontiguousarray(columns[name])
+        digest.update(f"{name}|{array.dtype.str}|{array.shape}|".encode())
+        digest.update(array.tobytes())
+    return digest.hexdigest()
+
+
+def write_snapshot(directory, columns):
+    """Writes one .npy per column plus a manifest; returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    for name, array in columns.items():
+        files[name] = f"{name}.npy"
+        np.save(os.path.join(directory, files[name]), np.ascontiguousarray(array), allow_pickle=False)
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "contentHash": content_hash(columns),
+        "itemCount": int(len(columns["item_ids"])),
+        "machineCount": int(len(columns["machine_ids"])),
+        "files": files,
+    }
+    with open(os.path.join(directory, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+def read_snapshot(directory, mmap=True):
+    """Loads the columns of a snapshot directory, memory-mapped unless ``mmap`` is False."""
+    with open(os.path.join(directory, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format')} in {directory}")
+    return {name: np.load(os.path.join(directory, file_name), mmap_mode="r" if mmap else None, allow_pickle=False)
+            for name, file_name in manifest["files"].items()}
+
+
+def _bucket(name):
+    from firebase_admin import storage
+    return storage.bucket(name)
+
+
+def publish_snapshot(bucket_name, version, directory):
+    """Uploads a snapshot directory to gs://bucket/dataset_snapshots/<version>/; returns the snapshot reference."""
+    bucket = _bucket(bucket_name)
+    prefix = f"{SNAPSHOT_PREFIX}/{version}/"
+    # The manifest goes last: a snapshot without one is never read
+    names = sorted(os.listdir(directory), key=lambda name: name == MANIFEST_FILE)
+    for name in names:
+        bucket.blob(prefix + name).upload_from_filename(os.path.join(directory, name))
+    return {"format": SNAPSHOT_FORMAT, "bucket": bucket_name, "prefix": prefix}
+
+
+def fetch_snapshot(snapshot, version):
+    """Local directory holding the given snapshot, downloading it on first use in this instance."""
+    directory = os.path.join(LOCAL_SNAPSHOT_DIR, version)
+    if os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+        return directory
+    bucket = _bucket(snapshot["bucket"])
+    partial = f"{directory}.{os.getpid()}.partial"
+    os.makedirs(partial, exist_ok=True)
+    try:
+        manifest_blob = bucket.blob(snapshot["prefix"] + MANIFEST_FILE)
+        manifest = json.loads(manifest_blob.download_as_bytes())
+        for file_name in manifest["files"].values():
+            bucket.blob(snapshot["prefix"] + file_name).download_to_filename(os.path.join(partial, file_name))
+        with open(os.path.join(partial, MANIFEST_FILE), "w") as f:
+            json.dump(manifest, f)
+        os.replace(partial, directory)
+    except OSError:
+        # Another request finished the same download first
+        if not os.path.exists(os.path.join(directory, MANIFEST_FILE)):
+            raise
+    finally:
+        shutil.rmtree(partial, ignore_errors=True)
+    return directory
+
+
+def stream_columns(db):
+    """Source columns read directly from the items and machines collections."""
+    return documents_to_columns(((doc.id, doc.to_dict()) for doc in db.collection("items").stream()),
+                                ((doc.id, doc.to_dict()) for doc in db.collection("machines").stream()))
+
+
+def read_dataset_version(db):
+    """The meta/dataset_version document ({version, contentHash, snapshot, ...}) or None."""
+    doc = db.collection(DATASET_META_COLLECTION).document(DATASET_META_DOCUMENT).get()
+    return doc.to_dict() if doc.exists else None
+
+
+def load_dataset_columns(db, dataset_version=None):
+    """Returns (columns, info): from the current snapshot when there is one, else from Firestore.
+
+    ``info`` is {"source": "snapshot" | "firestore", "version": ...} for the response.
+    ``dataset_version`` is the already read meta document, if any.
+    """
+    if dataset_version is None:
+        dataset_version = read_dataset_version(db)
+    version = (dataset_version or {}).get("version")
+    snapshot = (dataset_version or {}).get("snapshot")
+    if version and isinstance(snapshot, dict) and snapshot.get("format") == SNAPSHOT_FORMAT:
+        try:
+            return read_snapshot(fetch_snapshot(snapshot, version)), {"source": "snapshot", "version": version}
+        except Exception as e:
+            print(f"Warning: Could not load dataset snapshot {version}, reading Firestore instead: {e}")
+    return stream_columns(db), {"source": "firestore", "version": version}
@@ -0,0 +1,183 @@
+# decomposition.py
+# Splits the planning problem into independent sub-problems. Items only compete
+# for capacity on the machines they are eligible for, so the connected components
+# of the bipartite item/machine eligibility graph can be solved separately (and in
+# parallel) and their plans concatenated without losing optimality.
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from planning_data import subset_data
+from planning_model import DEFAULT_FORMULATION, period_labels
+from anytime import relative_gap
+from diagnostics import merge_solver_stats
+from solver_backends import DEFAULT_SOLVER_BACKEND, solve_problem
+
+# Opt-in ("decompose": true): a default solve stays one model in the request's process, without a solver pool
+DECOMPOSE_DEFAULT = False
+# Each component gets a share of the total time budget proportional to its size, but at least this
+MIN_COMPONENT_TIME_SECONDS = 5.0
+
+
+def connected_components(mask):
+    """Returns a list of (item_idx, machine_idx) arrays, one per connected component that has items."""
+    num_items, num_machines = mask.shape
+    parent = list(range(num_items + num_machines))
+
+    def find(node):
+        root = node
+        while parent[root] != root:
+            root = parent[root]
+        while parent[node] != root:
+            parent[node], node = root, parent[node]
+        return root
+
+    for i, m in zip(*(axis.tolist() for axis in np.nonzero(mask))):
+        root_item, root_machine = find(i), find(num_items + m)
+        if root_item != root_machine:
+            parent[root_machine] = root_item
+
+    roots = np.array([find(node) for node in range(num_items + num_machines)], dtype=np.int64)
+    item_roots, machine_roots = roots[:num_items], roots[num_items:]
+    components = []
+    for root in np.unique(item_roots):
+        components.append((np.flatnonzero(item_roots == root), np.flatnonzero(machine_roots == root)))
+    return components
+
+
+def solve_component(task):
+    """Builds, optionally warm-starts and solves one component. Runs in a worker process."""
+    criteria = dict(task["criteria"])
+    # Components may wait in the pool queue; the deadline is absolute
+    criteria["max_time_in_seconds"] = max(0.1, min(criteria["max_time_in_seconds"], task["deadline"] - time.time()))
+    return solve_problem(task["data"], task["mask"], task["stock_holding_rate_yearly"], task["objective_mode"], criteria,
+                         backend=task["backend"], formulation=task["formulation"], hint_plan_id=task.get("hint_plan_id"),
+                         hint_plan=task.get("hint_plan"), num_workers=task["num_workers"], log_search_progress=False)
+
+
+def _count(values):
+    return {value: values.count(value) for value in sorted(set(values))}
+
+
+def _merge_status(status_names):
+    for status_name in status_names:
+        if status_name not in ("OPTIMAL", "FEASIBLE"):
+            return status_name
+    return "FEASIBLE" if "FEASIBLE" in status_names else "OPTIMAL"
+
+
+def _merge_warm_start(reports, enabled):
+    reports = [r for r in reports if r]
+    if not enabled:
+        return {"enabled": False}
+    merged = {"enabled": True, "applied": any(r.get("applied") for r in reports), "hintedVariables": 0,
+              "matchedEntries": 0, "unmatchedEntries": 0, "clampedEntries": 0, "hintFeasible": True}
+    for report in reports:
+        merged["sourcePlanId"] = report.get("sourcePlanId")
+        for key in ("hintedVariables", "matchedEntries", "unmatchedEntries", "clampedEntries"):
+            merged[key] += report.get(key, 0)
+        merged["hintFeasible"] = merged["hintFeasible"] and report.get("hintFeasible", False)
+    return merged
+
+
+def solve_decomposed(data, mask, stock_holding_rate_yearly, objective_mode, criteria,
+                     max_workers=None, hint_plan_id=None, hint_plan=None, progress=None, formulation=DEFAULT_FORMULATION,
+                     backend=DEFAULT_SOLVER_BACKEND):
+    """Solves every connected component as its own model and merges the plans.
+
+    Returns the same shape as planning_model.solve_model plus a "decomposition"
+    summary. ``criteria`` are the anytime stop criteria; each component gets a
+    size-proportional share of the time budget, cut short where it would run past
+    the deadline (or the end of the budget when there is none). ``hint_plan`` is a stored production plan used to warm-start each component.
+    ``progress(event)`` is called as each component finishes. ``backend`` is one of
+    solver_backends.SOLVER_BACKENDS; "auto" chooses per component.
+    """
+    components = connected_components(mask)
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(components)))
+    solver_workers = max(1, cpu_count // max_workers)
+    total_pairs = max(int(mask.sum()), 1)
+    max_time_in_seconds = criteria["max_time_in_seconds"]
+    # Without a deadline the time budget still caps the whole run, however many components queue for the workers
+    deadline = criteria["deadline"] if criteria.get("deadline") is not None else time.time() + max_time_in_seconds
+    hint_entries = (hint_plan or {}).get("plan") if hint_plan is not None else None
+
+    tasks = []
+    for item_idx, machine_idx in components:
+        component_mask = mask[np.ix_(item_idx, machine_idx)]
+        share = component_mask.sum() / total_pairs
+        component_data = subset_data(data, item_idx, machine_idx)
+        task = {
+            "data": component_data,
+            "mask": component_mask,
+            "stock_holding_rate_yearly": stock_holding_rate_yearly,
+            "objective_mode": objective_mode,
+            "formulation": formulation,
+            "backend": backend,
+            "criteria": {**criteria, "max_time_in_seconds": min(max_time_in_seconds, max(MIN_COMPONENT_TIME_SECONDS, max_time_in_seconds * max_workers * share))},
+            "deadline": deadline,
+            "num_workers": solver_workers,
+            "hint_plan_id": hint_plan_id,
+            "hint_plan": None,
+        }
+        if isinstance(hint_entries, list):
+            component_items = set(component_data["item_ids"].tolist())
+            task["hint_plan"] = {"plan": [e for e in hint_entries if str(e.get("itemId")) in component_items]}
+        tasks.append(task)
+    # Largest components first so the pool is not left waiting on a big one at the end
+    order = sorted(range(len(tasks)), key=lambda t: -int(tasks[t]["mask"].sum()))
+
+    results = {}
+
+    def component_done(t, result):
+        results[t] = result
+        if progress is not None:
+            progress({"type": "component", "componentsDone": len(results), "components": len(tasks)})
+
+    if max_workers == 1:
+        for t in order:
+            component_done(t, solve_component(tasks[t]))
+    else:
+        # spawn: forking a process that already holds gRPC/Firestore threads is unsafe
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(solve_component, tasks[t]): t for t in order}
+            for future in as_completed(futures):
+                component_done(futures[future], future.result())
+    results = [results[t] for t in range(len(tasks))]
+
+    status_name = _merge_status([r["statusName"] for r in results])
+    merged = {
+        "statusName": status_name,
+        "wallTime": max(r["wallTime"] for r in results) if results else 0.0,
+        "warmStart": _merge_warm_start([r["warmStart"] for r in results], hint_plan is not None),
+        "anytime": {
+            "stopReasons": _count([r["anytime"]["stopReason"] for r in results]),
+            "relativeGap": None,
+            "criteria": criteria,
+        },
+        "decomposition": {
+            "components": len(components),
+            "workers": max_workers,
+            "largestComponentItems": max((len(item_idx) for item_idx, _ in components), default=0),
+            "componentStatuses": _count([r["statusName"] for r in results]),
+        },
+        "backend": {"selections": _count([r["backend"]["selected"] for r in results])},
+        "stats": merge_solver_stats([r["stats"] for r in results]),
+    }
+    if status_name in ("OPTIMAL", "FEASIBLE"):
+        merged["objective"] = sum(r["objective"] for r in results)
+        merged["bestBound"] = sum(r["bestBound"] for r in results)
+        merged["anytime"]["relativeGap"] = relative_gap(merged["objective"], merged["bestBound"])
+        merged["totalOptimizedMachiningCostSEK"] = sum(r["totalOptimizedMachiningCostSEK"] for r in results)
+        merged["totalOptimizedStockCostEUR"] = sum(r["totalOptimizedStockCostEUR"] for r in results)
+        # Restore the monolithic ordering: item, then period, then machine
+        item_position = {item_id: i for i, item_id in enumerate(data["item_ids"].tolist())}
+        machine_position = {machine_id: m for m, machine_id in enumerate(data["machine_ids"].tolist())}
+        period_position = {label or month: idx for idx, (label, month) in enumerate(period_labels(data))}
+        plan = [entry for r in results for entry in r["plan"]]
+        plan.sort(key=lambda e: (item_position[e["itemId"]], period_position[e.get("period", e["month"])], machine_position[e["machineId"]]))
+        merged["plan"] = plan
+    return merged
@@ -0,0 +1,101 @@
+# diagnostics.py
+# Per-request timing spans, solver statistics and memory high-water marks. They are
+# returned in the "diagnostics" block of every optimizer response and saved with the
+# plan document. With structured logging on (payload "diagnostics_log", or
+# DIAGNOSTICS_JSON_LOGS=1 for the instance) every span is also printed as one JSON
+# line, which Cloud Logging turns into a jsonPayload entry.
+import json
+import os
+import resource
+import time
+from contextlib import contextmanager
+
+DIAGNOSTICS_LOG_DEFAULT = os.environ.get("DIAGNOSTICS_JSON_LOGS", "") == "1"
+
+
+def _status_mb(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    """High-water mark of this process's resident memory in MB (VmHWM, else ru_maxrss)."""
+    peak = _status_mb('VmHWM')
+    return peak if peak is not None else round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def rss_mb():
+    return _status_mb('VmRSS')
+
+
+def merge_solver_stats(stats):
+    """Sums the solver "stats" of several models (decomposition components, horizon windows).
+
+    Times are summed too, so with parallel components they exceed the wall time.
+    """
+    merged = {}
+    for entry in stats:
+        for key, value in (entry or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+    return merged
+
+
+class Diagnostics:
+    """Collects the timing spans of one request; ``report`` returns the response block.
+
+    Spans are recorded in the order they finish. ``parent`` nests a span under
+    another by name, for the build, search and extraction phases measured inside
+    the solve.
+    """
+
+    def __init__(self, request_kind, structured_log=DIAGNOSTICS_LOG_DEFAULT):
+        self.request_kind = request_kind
+        self.structured_log = structured_log
+        self.spans = []
+        self.solver = None
+        self._start = time.perf_counter()
+
+    def add(self, name, seconds, parent=None, **fields):
+        span = {"name": name, "seconds": round(seconds, 4)}
+        if parent is not None:
+            span["parent"] = parent
+        span.update(fields)
+        span.update({"rssMB": rss_mb(), "peakRssMB": peak_rss_mb()})
+        self.spans.append(span)
+        if self.structured_log:
+            print(json.dumps({"severity": "INFO", "message": f"{self.request_kind} span {name}", "span": span}))
+        return span
+
+    @contextmanager
+    def span(self, name, **fields):
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.add(name, time.perf_counter() - start, **fields)
+
+    def add_solver(self, solve_result):
+        """Records the solver statistics of ``solve_result`` and its build/search/extract phases as child spans of "solve"."""
+        stats = {key: round(value, 4) if isinstance(value, float) else value for key, value in (solve_result.get("stats") or {}).items()}
+        stats["bestBound"] = solve_result.get("bestBound")
+        self.solver = stats
+        if self.structured_log:
+            print(json.dumps({"severity": "INFO", "message": f"{self.request_kind} solver", "solver": stats}))
+        for name, key in (("build_model", "buildSeconds"), ("search", "wallTime"), ("extract_plan", "extractSeconds")):
+            if key in stats:
+                self.add(name, stats[key], parent="solve")
+
+    def report(self):
+        return {
+            "totalSeconds": round(time.perf_counter() - self._start, 4),
+            "spans": list(self.spans),
+            "solver": self.solver,
+            "peakRssMB": peak_rss_mb(),
+        }
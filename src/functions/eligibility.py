@@ -0,0 +1,61 @@
+# eligibility.py
+# Decides which (item, machine) pairs get production variables. Items carry the
+# machine they currently run on (currentMachineId) and machines carry their
+# machineType, so an item is eligible for every machine of its current machine's type.
+import numpy as np
+
+ELIGIBILITY_POLICIES = ("machine_type", "current_machine", "all")
+DEFAULT_ELIGIBILITY_POLICY = "machine_type"
+
+
+def normalize_machine_id(machine_id):
+    # Machine ids read from Excel/CSV columns with blanks come through as floats ("55235206.0")
+    machine_id = str(machine_id).strip()
+    if machine_id.endswith(".0") and machine_id[:-2].isdigit():
+        machine_id = machine_id[:-2]
+    return machine_id
+
+
+def current_machine_index(data):
+    """Position in ``machine_ids`` of each item's current machine, -1 where it is missing or unknown."""
+    machine_index = {normalize_machine_id(m): idx for idx, m in enumerate(data["machine_ids"].tolist())}
+    # Items share few current machines; normalize each distinct id once
+    current_ids, inverse = np.unique(data["current_machine"], return_inverse=True)
+    positions = np.array([machine_index.get(normalize_machine_id(m), -1) for m in current_ids.tolist()], dtype=np.int64)
+    return positions[inverse.reshape(-1)]
+
+
+def build_eligibility(data, policy=DEFAULT_ELIGIBILITY_POLICY):
+    """Returns an (items x machines) boolean matrix of the pairs allowed to produce.
+
+    Items whose current machine is missing or unknown stay eligible everywhere,
+    so pruning never removes the only way to meet an item's demand. Under
+    "machine_type" the same holds when that machine has no machineType: a blank
+    type is unknown, not a type shared by every untyped machine.
+    """
+    if policy not in ELIGIBILITY_POLICIES:
+        raise ValueError(f"Unknown eligibility policy '{policy}'. Expected one of {ELIGIBILITY_POLICIES}.")
+    num_items, num_machines = len(data["item_ids"]), len(data["machine_ids"])
+    if policy == "all" or num_machines == 0:
+        return np.ones((num_items, num_machines), dtype=bool)
+
+    current = current_machine_index(data)
+    known = current >= 0
+
+    if policy == "current_machine":
+        mask = np.zeros((num_items, num_machines), dtype=bool)
+        mask[np.flatnonzero(known), current[known]] = True
+    else:
+        _, machine_type_code = np.unique(data["machine_type"], return_inverse=True)
+        item_type_code = np.where(known, machine_type_code[np.maximum(current, 0)], -1)
+        mask = item_type_code[:, None] == machine_type_code[None, :]
+        known &= data["machine_type"][np.maximum(current, 0)] != ""
+    mask[~known] = True
+    return mask
+
+
+def eligible_pairs(mask):
+    """(pair_item, pair_machine) index arrays of the eligible pairs, item-major like planning_model.all_pairs."""
+    pair_item, pair_machine = np.nonzero(mask)
+    return pair_item, pair_machine
+
@@ -0,0 +1,218 @@
+# horizon.py
+# Planning periods other than the twelve calendar months, and rolling-horizon solving.
+# A period grid is a list of buckets on a month axis (0 = start of January, 12 = end
+# of December): the months, 52 equal weeks, or a mixed grid that is weekly for the
+# first weeks and monthly after. Monthly demand and capacity are spread evenly over
+# each month and summed per bucket. The rolling solver builds a model for a window of
+# buckets only, freezes the first buckets of its plan and moves the window on, so the
+# model size follows the window instead of the whole year.
+import time
+
+import numpy as np
+
+from planning_data import MONTHS, NUM_MONTHS, ITEM_FIELDS, MACHINE_FIELDS
+from planning_model import DEFAULT_FORMULATION, cost_tables, period_labels, period_months
+from decomposition import solve_decomposed
+from solver_backends import DEFAULT_SOLVER_BACKEND, solve_problem
+from diagnostics import merge_solver_stats
+
+PERIOD_GRIDS = ("monthly", "weekly", "mixed")
+DEFAULT_PERIOD_GRID = "monthly"
+WEEKS_PER_YEAR = 52
+DEFAULT_MIXED_WEEKS = 8
+# Each window gets an equal share of the remaining time budget, but at least this
+MIN_WINDOW_TIME_SECONDS = 2.0
+
+
+def _positive_int(options, key, default):
+    value = options.get(key, default)
+    if value is None or (isinstance(value, int) and not isinstance(value, bool) and value > 0):
+        return value
+    print(f"Warning: Invalid horizon.{key} in payload: {value}. Using default.")
+    return default
+
+
+def parse_horizon(options):
+    """Horizon settings from the payload's "horizon" section, or None to plan the twelve months at once.
+
+    Recognized keys: grid ("monthly", "weekly" or "mixed"), weeks (weekly buckets at
+    the start of a mixed grid), window (periods per model, default all) and freeze
+    (periods kept from each window before it moves on, default the whole window).
+    """
+    if not isinstance(options, dict):
+        return None
+    grid = options.get("grid", DEFAULT_PERIOD_GRID)
+    if grid not in PERIOD_GRIDS:
+        print(f"Warning: Invalid horizon.grid in payload: {grid}. Using default.")
+        grid = DEFAULT_PERIOD_GRID
+    weeks = min(_positive_int(options, "weeks", DEFAULT_MIXED_WEEKS), WEEKS_PER_YEAR)
+    boundaries, _ = grid_buckets(grid, weeks)
+    num_periods = len(boundaries) - 1
+    window = min(_positive_int(options, "window", None) or num_periods, num_periods)
+    freeze = min(_positive_int(options, "freeze", None) or window, window)
+    return {"grid": grid, "weeks": weeks if grid == "mixed" else None, "periods": num_periods, "window": window, "freeze": freeze}
+
+
+def grid_buckets(grid, weeks=DEFAULT_MIXED_WEEKS):
+    """Returns (boundaries, labels): bucket edges on the month axis and one label per bucket."""
+    week_edges = np.arange(WEEKS_PER_YEAR + 1) * NUM_MONTHS / WEEKS_PER_YEAR
+    if grid == "monthly":
+        return np.arange(NUM_MONTHS + 1, dtype=np.float64), list(MONTHS)
+    if grid == "weekly":
+        return week_edges, [f"W{week + 1:02d}" for week in range(WEEKS_PER_YEAR)]
+    if grid == "mixed":
+        # Weekly buckets, then the rest of the month they end in, then whole months
+        weekly_end = week_edges[weeks]
+        month_edges = np.arange(int(np.ceil(weekly_end - 1e-9)), NUM_MONTHS + 1, dtype=np.float64)
+        month_edges = month_edges[month_edges > weekly_end + 1e-9]
+        boundaries = np.concatenate([week_edges[:weeks + 1], month_edges])
+        labels = [f"W{week + 1:02d}" for week in range(weeks)] + [MONTHS[int(start + 1e-9)] for start in boundaries[weeks:-1]]
+        return boundaries, labels
+    raise ValueError(f"Unknown period grid '{grid}'. Expected one of {PERIOD_GRIDS}.")
+
+
+def _cumulative_demand(demand, positions):
+    # Demand due up to each position on the month axis, spread evenly within a month
+    cumulative = np.concatenate([np.zeros((demand.shape[0], 1), dtype=np.int64), np.cumsum(demand, axis=1)], axis=1)
+    month = np.minimum(np.floor(positions + 1e-9).astype(np.int64), NUM_MONTHS - 1)
+    fraction = positions - month
+    return cumulative[:, month] + demand[:, month] * fraction[None, :]
+
+
+def to_period_data(data, horizon):
+    """Normalized monthly data re-bucketed onto the horizon's period grid.
+
+    Bucket demand is rounded on the cumulative curve, so every item's yearly demand
+    is preserved exactly; capacity and holding cost scale with ``period_months``.
+    """
+    boundaries, labels = grid_buckets(horizon["grid"], horizon.get("weeks") or DEFAULT_MIXED_WEEKS)
+    cumulative = np.rint(_cumulative_demand(data["demand"], boundaries)).astype(np.int64)
+    period_data = dict(data)
+    period_data.update({
+        "demand": np.diff(cumulative, axis=1),
+        "period_months": np.diff(boundaries),
+        "period_labels": labels,
+        "period_month_names": [MONTHS[int(start + 1e-9)] for start in boundaries[:-1]],
+    })
+    return period_data
+
+
+def window_data(data, start, stop, initial_inventory):
+    """The periods [start, stop) of period data, starting from the given per-item stock."""
+    window = {key: data[key] for key in ITEM_FIELDS + MACHINE_FIELDS}
+    window.update({
+        "demand": data["demand"][:, start:stop],
+        "period_months": period_months(data)[start:stop],
+        "period_labels": [label for label, _ in period_labels(data)][start:stop],
+        "period_month_names": [month for _, month in period_labels(data)][start:stop],
+        "initial_inventory": initial_inventory,
+    })
+    return window
+
+
+def _window_starts(num_periods, window, freeze):
+    starts = [0]
+    while starts[-1] + window < num_periods:
+        starts.append(starts[-1] + freeze)
+    return starts
+
+
+def solve_rolling(data, mask, stock_holding_rate_yearly, objective_mode, criteria, horizon,
+                  decompose=False, progress=None, formulation=DEFAULT_FORMULATION,
+                  backend=DEFAULT_SOLVER_BACKEND):
+    """Plans the horizon window by window and returns the same shape as planning_model.solve_model.
+
+    Each window of ``horizon["window"]`` periods is solved from the stock left by the
+    periods frozen so far; its first ``horizon["freeze"]`` periods are then frozen (the
+    last window keeps all of its periods). ``data`` is period data from to_period_data.
+    The result gains a "horizon" summary; it has no single objective or bound. With
+    several windows the plan is FEASIBLE at best, and "anytime" says so ("stopReason"
+    "rolling_horizon" and a "note").
+    """
+    num_items = len(data["item_ids"])
+    num_periods = data["demand"].shape[1]
+    window, freeze = horizon["window"], horizon["freeze"]
+    starts = _window_starts(num_periods, window, freeze)
+    item_position = {item_id: i for i, item_id in enumerate(data["item_ids"].tolist())}
+    machine_position = {machine_id: m for m, machine_id in enumerate(data["machine_ids"].tolist())}
+    tables = cost_tables(data, stock_holding_rate_yearly)
+    budget_end = time.monotonic() + criteria["max_time_in_seconds"]
+
+    inventory = np.asarray(data.get("initial_inventory", np.zeros(num_items, dtype=np.int64)), dtype=np.int64)
+    plan, window_statuses, stop_reasons, backends, stats = [], [], [], {}, []
+    machining_cost, stock_cost, wall_time = 0.0, 0.0, 0.0
+    status_name = "OPTIMAL"
+    for w, start in enumerate(starts):
+        stop = min(start + window, num_periods)
+        frozen = stop - start if w == len(starts) - 1 else freeze
+        seconds = max(MIN_WINDOW_TIME_SECONDS, (budget_end - time.monotonic()) / (len(starts) - w))
+        window_criteria = {**criteria, "max_time_in_seconds": min(seconds, criteria["max_time_in_seconds"])}
+        current = window_data(data, start, stop, inventory)
+        if decompose:
+            result = solve_decomposed(current, mask, stock_holding_rate_yearly, objective_mode, window_criteria, formulation=formulation,
+                                      backend=backend)
+            stop_reasons.extend(reason for reason, count in result["anytime"]["stopReasons"].items() for _ in range(count))
+        else:
+            result = solve_problem(current, mask, stock_holding_rate_yearly, objective_mode, window_criteria, backend=backend,
+                                   formulation=formulation, log_search_progress=False)
+            stop_reasons.append(result["anytime"]["stopReason"])
+        for selected, count in result["backend"].get("selections", {result["backend"].get("selected"): 1}).items():
+            backends[selected] = backends.get(selected, 0) + count
+        window_statuses.append(result["statusName"])
+        stats.append(result["stats"])
+        wall_time += result["wallTime"]
+        if result["statusName"] not in ("OPTIMAL", "FEASIBLE"):
+            status_name = result["statusName"]
+            break
+        if result["statusName"] == "FEASIBLE" or len(starts) > 1:
+            # A rolling plan is only optimal per window
+            status_name = "FEASIBLE"
+
+        frozen_labels = {label or month: start + t for t, (label, month) in enumerate(period_labels(current)[:frozen])}
+        produced = np.zeros((num_items, frozen), dtype=np.int64)
+        for entry in result["plan"]:
+            period = frozen_labels.get(entry.get("period", entry["month"]))
+            if period is None:
+                continue
+            plan.append(entry)
+            produced[item_position[entry["itemId"]], period - start] += entry["quantity"]
+            machining_cost += entry["quantity"] * tables["cost_per_piece"][item_position[entry["itemId"]], machine_position[entry["machineId"]]]
+        levels = inventory[:, None] + np.cumsum(produced - data["demand"][:, start:start + frozen], axis=1)
+        stock_cost += float(np.sum(levels * tables["holding_per_unit"][:, start:start + frozen]))
+        inventory = levels[:, -1]
+        if progress is not None:
+            progress({"type": "window", "windowsDone": w + 1, "windows": len(starts), "periodsFrozen": start + frozen})
+
+    period_position = {label or month: idx for idx, (label, month) in enumerate(period_labels(data))}
+    plan.sort(key=lambda e: (item_position[e["itemId"]], period_position[e.get("period", e["month"])], machine_position[e["machineId"]]))
+    pairs = int(mask.sum())
+    merged = {
+        "statusName": status_name,
+        "wallTime": wall_time,
+        "anytime": {
+            "stopReasons": {reason: stop_reasons.count(reason) for reason in sorted(set(stop_reasons))},
+            "relativeGap": None,
+            "criteria": criteria,
+        },
+        "backend": {"selections": dict(sorted(backends.items()))},
+        "stats": merge_solver_stats(stats),
+        "horizon": {
+            **horizon,
+            "windowsSolved": len(window_statuses),
+            "windows": len(starts),
+            "windowStatuses": {s: window_statuses.count(s) for s in sorted(set(window_statuses))},
+            "productionVariablesPerWindow": pairs * min(window, num_periods),
+            "productionVariablesFullHorizon": pairs * num_periods,
+        },
+    }
+    if status_name == "FEASIBLE" and len(starts) > 1:
+        # FEASIBLE here need not mean a window ran out of time: say why there is no bound
+        early = len(window_statuses) - window_statuses.count("OPTIMAL")
+        merged["anytime"].update({
+            "stopReason": "rolling_horizon",
+            "note": "Rolling horizon: optimal per window only; the whole horizon has no bound or gap."
+                    + (f" {early} of {len(window_statuses)} windows stopped before optimality (see stopReasons)." if early else ""),
+        })
+    if status_name in ("OPTIMAL", "FEASIBLE"):
+        merged.update({"plan": plan, "totalOptimizedMachiningCostSEK": machining_cost, "totalOptimizedStockCostEUR": stock_cost})
+    return merged
@@ -0,0 +1,264 @@
+# incremental.py
+# Incremental re-solves of a what-if. Per dataset version (and eligibility policy,
+# objective and formulation) a function instance keeps the CP-SAT model of the base
+# data (scenarios.BaseModel), the plan of the base data and the last plan solved with
+# it. A request's data is compared with the data of the closer of these plans: the
+# items and machines whose values differ are "touched". A copy of the base model is
+# patched to the request's data and every production quantity outside the touched
+# neighbourhood is fixed to that plan, so CP-SAT's presolve removes most of the model
+# and only the neighbourhood is searched. If the neighbourhood has no feasible plan,
+# it is widened once and then the whole model is solved, hinted with the plan.
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from planning_data import NUM_MONTHS
+from eligibility import build_eligibility, eligible_pairs
+from planning_model import build_model, hint_production
+from anytime import solve_anytime
+from scenarios import BaseModel
+from solver_backends import solve_problem
+from warm_start import apply_warm_start, plan_to_hint_matrix
+
+INCREMENTAL_DEFAULT = False
+# Base models kept per instance; each holds a full CpModel, so only a few
+INCREMENTAL_MAX_ENTRIES = 2
+# Above this share of free items a neighbourhood solve saves little over the whole model
+INCREMENTAL_MAX_FREE_FRACTION = 0.5
+# Item and machine arrays whose changes touch an item or machine (see touched)
+TOUCH_ITEM_FIELDS = ("op_time", "base_cost", "fixed_lot_size", "min_lot_size", "demand")
+TOUCH_MACHINE_FIELDS = ("hourly_cost", "capacity_minutes", "tool_change_minutes", "material_change_minutes")
+
+
+def touched(data, reference_data):
+    """(items, machines) positions whose values in ``data`` differ from ``reference_data``."""
+    items = np.zeros(len(data["item_ids"]), dtype=bool)
+    for key in TOUCH_ITEM_FIELDS:
+        difference = data[key] != reference_data[key]
+        items |= difference.any(axis=1) if difference.ndim == 2 else difference
+    machines = np.zeros(len(data["machine_ids"]), dtype=bool)
+    for key in TOUCH_MACHINE_FIELDS:
+        machines |= data[key] != reference_data[key]
+    return items, machines
+
+
+def neighbourhood(touched_items, touched_machines, reference_qty, pair_item, pair_machine, widen=False):
+    """Items whose quantities are re-optimized: the touched ones and those the last plan runs on touched machines.
+
+    ``widen`` adds every item the last plan runs on a machine that one of those items may use.
+    """
+    free = touched_items.copy()
+    producing = reference_qty.any(axis=1)
+    on_touched = producing & touched_machines[pair_machine]
+    free[pair_item[on_touched]] = True
+    if widen:
+        reachable = np.zeros(len(touched_machines), dtype=bool)
+        reachable[pair_machine[free[pair_item]]] = True
+        free[pair_item[producing & reachable[pair_machine]]] = True
+    return free
+
+
+def fix_outside(handle, base_model, free_items, reference_qty):
+    """Fixes the quantities and producing flags of every pair of a non-free item to ``reference_qty``.
+
+    The free pairs are hinted with it instead. Works on the handle's (copied) model in
+    place; returns the number of fixed pairs.
+    """
+    model = handle["model"]
+    proto = model.Proto()
+    model.ClearHints()
+    is_free = free_items[handle["pair_item"]]
+    for p, (qty_row, flag_row, values) in enumerate(zip(base_model.qty_index, base_model.flag_index, reference_qty.tolist())):
+        if is_free[p]:
+            for qty, flag, value in zip(handle["production_qty"][p], handle["is_producing"][p], values):
+                model.AddHint(qty, value)
+                model.AddHint(flag, value > 0)
+            continue
+        for qty, flag, value in zip(qty_row, flag_row, values):
+            domain = proto.variables[qty].domain
+            domain[0] = domain[1] = value
+            domain = proto.variables[flag].domain
+            domain[0] = domain[1] = int(value > 0)
+    return int(len(is_free) - is_free.sum())
+
+
+class IncrementalEntry:
+    """The base model of one dataset version and the plans solved with it (as pairs x months matrices).
+
+    Two plans are kept: the one of the base data itself (without overrides) and the
+    last one solved. A what-if is compared with whichever of them it touches less.
+    """
+
+    def __init__(self, base_model, base_data, base_rate, mask):
+        self.base_model = base_model
+        self.base_data = base_data
+        self.base_rate = base_rate
+        self.mask = mask
+        self._plans = {}
+        self._lock = threading.Lock()
+
+    def has_plan(self):
+        with self._lock:
+            return bool(self._plans)
+
+    def closest_plan(self, data, stock_holding_rate_yearly):
+        """(qty, touched_items, touched_machines) of the kept plan with the fewest touched items and machines.
+
+        Only plans solved at the same stock holding rate qualify (the rate changes every
+        item's holding cost); returns None when there is none.
+        """
+        with self._lock:
+            plans = list(self._plans.values())
+        best = None
+        for plan_data, plan_rate, qty in plans:
+            if plan_rate != stock_holding_rate_yearly:
+                continue
+            touched_items, touched_machines = touched(data, plan_data)
+            if best is None or touched_items.sum() + touched_machines.sum() < best[1].sum() + best[2].sum():
+                best = (qty, touched_items, touched_machines)
+        return best
+
+    def remember(self, data, stock_holding_rate_yearly, qty):
+        plan = (data, stock_holding_rate_yearly, qty)
+        is_base = stock_holding_rate_yearly == self.base_rate and not any(mask.any() for mask in touched(data, self.base_data))
+        with self._lock:
+            self._plans["last"] = plan
+            if is_base:
+                self._plans["base"] = plan
+
+
+class IncrementalStore:
+    """IncrementalEntry per (dataset version, eligibility policy, objective mode, formulation), least recently used first out."""
+
+    def __init__(self, max_entries=INCREMENTAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(dataset_version, eligibility_policy, objective_mode, formulation):
+        return (dataset_version, eligibility_policy, objective_mode, formulation)
+
+    def has_plan(self, key):
+        """Whether the entry under ``key`` holds a solved plan (so no stored plan is needed to hint from)."""
+        entry = self.get(key)
+        return entry is not None and entry.has_plan()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def solve_incremental(store, dataset_version, base_data, base_rate, data, stock_holding_rate_yearly, eligibility_policy,
+                      objective_mode, formulation, criteria, backend="auto", hint_plan_id=None, hint_plan=None, listener=None,
+                      num_workers=None, log_search_progress=True):
+    """Solves ``data`` (the base data with the request's overrides) against the instance's kept plans.
+
+    Returns the result shape of solver_backends.solve_problem plus an "incremental"
+    report: "mode" is "neighbourhood" (only the touched part re-optimized), "full"
+    (whole model, hinted with the closest kept plan) or "off" (solved by solve_problem,
+    e.g. for another backend), with the reason and the touched and fixed counts.
+    """
+    start = time.perf_counter()
+    mask = build_eligibility(data, eligibility_policy)
+
+    def solve_off(off_reason):
+        result = solve_problem(data, mask, stock_holding_rate_yearly, objective_mode, criteria, backend=backend,
+                               formulation=formulation, hint_plan_id=hint_plan_id, hint_plan=hint_plan, listener=listener,
+                               num_workers=num_workers, log_search_progress=log_search_progress)
+        result["incremental"] = {"mode": "off", "reason": off_reason}
+        return result
+
+    # "auto" sizes the backend for the whole model; a neighbourhood is small, so it stays on CP-SAT
+    if backend not in ("auto", "cpsat"):
+        return solve_off(f"Backend {backend} requested; only the CP-SAT model is patched.")
+    if objective_mode != "linear":
+        return solve_off("Only the linear objective is patched.")
+    if dataset_version is None:
+        return solve_off("The dataset has no version to keep a model for.")
+    if data["demand"].shape[1] != NUM_MONTHS:
+        return solve_off("Only the monthly grid is solved incrementally.")
+
+    key = store.key(dataset_version, eligibility_policy, objective_mode, formulation)
+    entry = store.get(key)
+    if entry is None:
+        base_mask = build_eligibility(base_data, eligibility_policy)
+        base_handle = build_model(base_data, base_rate, pairs=eligible_pairs(base_mask), objective_mode=objective_mode,
+                                  formulation=formulation)
+        entry = IncrementalEntry(BaseModel(base_handle, base_data), base_data, base_rate, base_mask)
+        store.put(key, entry)
+    if not np.array_equal(mask, entry.mask):
+        # Overrides cannot change eligibility today; rebuild rather than patch if they ever do
+        return solve_off("Eligibility differs from the base model.")
+    handle, patched = entry.base_model.patch(data, stock_holding_rate_yearly)
+    if handle is None:
+        return solve_off(patched)
+    report = {"mode": "full", "datasetVersion": dataset_version, "patchedEntries": patched}
+    build_seconds = time.perf_counter() - start
+
+    closest = entry.closest_plan(data, stock_holding_rate_yearly)
+    reference_qty = None
+    result, warm_start_report = None, None
+    if closest is None:
+        report["reason"] = "No plan solved for this dataset version and stock holding rate yet."
+    else:
+        reference_qty, touched_items, touched_machines = closest
+        report.update({"touchedItems": int(touched_items.sum()), "touchedMachines": int(touched_machines.sum())})
+        for widen in (False, True):
+            free = neighbourhood(touched_items, touched_machines, reference_qty, handle["pair_item"], handle["pair_machine"],
+                                 widen=widen)
+            if free.sum() > INCREMENTAL_MAX_FREE_FRACTION * len(free):
+                report["reason"] = f"{int(free.sum())} of {len(free)} items in the neighbourhood."
+                break
+            # Fixing works on the patched copy itself; a further attempt patches a fresh one
+            local = handle if handle is not None else entry.base_model.patch(data, stock_holding_rate_yearly)[0]
+            handle = None
+            fixed = fix_outside(local, entry.base_model, free, reference_qty)
+            local_result = solve_anytime(local, data, criteria, listener=listener, num_workers=num_workers,
+                                         log_search_progress=log_search_progress)
+            report.update({"freeItems": int(free.sum()), "fixedPairs": fixed, "widened": widen})
+            if local_result["statusName"] in ("OPTIMAL", "FEASIBLE"):
+                result, handle = local_result, local
+                report["mode"] = "neighbourhood"
+                report.pop("reason", None)
+                break
+            report["reason"] = f"Neighbourhood {local_result['statusName']}."
+
+    if result is None:
+        # The whole patched model, hinted with the closest kept plan or else the stored one
+        if handle is None:
+            handle, _ = entry.base_model.patch(data, stock_holding_rate_yearly)
+        if reference_qty is not None:
+            handle["model"].ClearHints()
+            hint_production(handle, data, reference_qty)
+        elif hint_plan is not None:
+            warm_start_report = apply_warm_start(handle, data, hint_plan_id, hint_plan)
+        result = solve_anytime(handle, data, criteria, listener=listener, num_workers=num_workers,
+                               log_search_progress=log_search_progress)
+    if report["mode"] == "neighbourhood":
+        # Optimal only with everything outside the neighbourhood fixed, like a rolling window;
+        # the bound is one of that restricted model and says nothing about the whole problem
+        if result["statusName"] == "OPTIMAL":
+            result["statusName"] = "FEASIBLE"
+        result.pop("bestBound", None)
+        result["anytime"]["relativeGap"] = None
+    if result["statusName"] in ("OPTIMAL", "FEASIBLE"):
+        qty, _ = plan_to_hint_matrix(result["plan"], handle, data)
+        entry.remember(data, stock_holding_rate_yearly, qty)
+    result["stats"]["buildSeconds"] = build_seconds
+    result["backend"] = {"selected": "cpsat", "reason": "Incremental solve of the patched base model.", "solver": "CP-SAT"}
+    result["warmStart"] = warm_start_report
+    result["incremental"] = report
+    return result
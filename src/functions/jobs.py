@@ -0,0 +1,182 @@
+# jobs.py
+# Asynchronous optimization jobs: a submitted payload gets a job id immediately,
+# a worker runs the solve and records progress (intermediate objectives and the best
+# plan so far) in a job store that the status endpoint reads back. Deployed, the
+# worker is a Cloud Tasks task-queue function: Cloud Run throttles the CPU of an
+# instance once its response is sent and may scale it in, so a solve must hold a
+# request of its own. Locally (emulator, tests) daemon threads drain an in-process queue.
+import datetime
+import os
+import queue
+import threading
+import traceback
+import uuid
+
+from plan_storage import parse_plan_view, plan_view
+
+JOB_QUEUED, JOB_RUNNING, JOB_SUCCEEDED, JOB_FAILED = "queued", "running", "succeeded", "failed"
+JOBS_COLLECTION = "optimization_jobs"
+# Only the most recent intermediate solutions are kept on the job record
+MAX_PROGRESS_SOLUTIONS = 50
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 1))
+# The task-queue function that runs deployed jobs (main.runOptimizationJob) and how many run at once
+JOB_TASK_FUNCTION = "locations/europe-west1/functions/runOptimizationJob"
+JOB_MAX_CONCURRENT_TASKS = 10
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class InMemoryJobStore:
+    """Job records in a dict; only visible to the process that runs the worker."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def create(self, job_id, record):
+        with self._lock:
+            self._jobs[job_id] = dict(record)
+
+    def update(self, job_id, fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+
+class FirestoreJobStore:
+    """Job records in the optimization_jobs collection, readable from any function instance."""
+
+    def __init__(self, client_factory):
+        self._client_factory = client_factory
+
+    def _doc(self, job_id):
+        return self._client_factory().collection(JOBS_COLLECTION).document(job_id)
+
+    def create(self, job_id, record):
+        self._doc(job_id).set(record)
+
+    def update(self, job_id, fields):
+        try:
+            self._doc(job_id).set(fields, merge=True)
+        except Exception as e:
+            # Progress writes are best effort; a failed update must not abort the solve
+            print(f"Warning: Could not update job {job_id}: {e}")
+
+    def get(self, job_id):
+        snapshot = self._doc(job_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+
+def _queued_record(job_id):
+    return {"jobId": job_id, "status": JOB_QUEUED, "submittedAt": _now(), "progress": {"solutions": []}}
+
+
+def run_job(store, runner, job_id, payload):
+    """Runs one job: marks it running, records the progress events and stores the result or the error.
+
+    ``runner(payload, progress)`` performs the solve and returns (http_status, response_data);
+    ``progress(event)`` receives the events emitted while solving.
+    """
+    store.update(job_id, {"status": JOB_RUNNING, "startedAt": _now()})
+    progress_state = {"solutions": []}
+
+    def progress(event):
+        if event["type"] == "solution":
+            progress_state["solutions"] = (progress_state["solutions"] + [
+                {key: event[key] for key in ("objective", "bestBound", "wallTime")}])[-MAX_PROGRESS_SOLUTIONS:]
+            # Only the first page of the plan so far, like the final result
+            plan, page_info = plan_view(event["bestSolution"]["plan"], parse_plan_view(None))
+            fields = {"progress": dict(progress_state), "bestSolution": {**event["bestSolution"], "plan": plan, "planPage": page_info}}
+        else:
+            progress_state.update({key: value for key, value in event.items() if key != "type"})
+            fields = {"progress": dict(progress_state)}
+        store.update(job_id, fields)
+
+    try:
+        status_code, response_data = runner(payload, progress)
+        store.update(job_id, {
+            "status": JOB_SUCCEEDED if status_code == 200 else JOB_FAILED,
+            "finishedAt": _now(), "result": response_data,
+        })
+    except Exception as e:
+        print(f"Error in optimization job {job_id}: {e}")
+        store.update(job_id, {
+            "status": JOB_FAILED, "finishedAt": _now(),
+            "result": {"status": "error", "message": str(e), "trace": traceback.format_exc()},
+        })
+
+
+class LocalJobQueue:
+    """In-process queue drained by daemon worker threads (see run_job for ``runner``)."""
+
+    def __init__(self, store, runner, workers=JOB_WORKERS):
+        self.store = store
+        self.runner = runner
+        self._queue = queue.Queue()
+        self._threads = [threading.Thread(target=self._work, daemon=True, name=f"job-worker-{n}") for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, _queued_record(job_id))
+        self._queue.put((job_id, payload))
+        return job_id
+
+    def _work(self):
+        while True:
+            job_id, payload = self._queue.get()
+            try:
+                run_job(self.store, self.runner, job_id, payload)
+            finally:
+                self._queue.task_done()
+
+
+class TaskQueueDispatcher:
+    """Enqueues every job as a Cloud Task for JOB_TASK_FUNCTION, which runs it with run_job.
+
+    ``queue_factory()`` returns the firebase_admin.functions task queue. The job record
+    is created first; a job that cannot be enqueued is marked failed.
+    """
+
+    def __init__(self, store, queue_factory):
+        self.store = store
+        self._queue_factory = queue_factory
+
+    def submit(self, payload):
+        job_id = uuid.uuid4().hex
+        self.store.create(job_id, _queued_record(job_id))
+        try:
+            self._queue_factory().enqueue({"jobId": job_id, "payload": payload})
+        except Exception as e:
+            self.store.update(job_id, {"status": JOB_FAILED, "finishedAt": _now(),
+                                       "result": {"status": "error", "message": f"Could not enqueue the job: {e}"}})
+            raise
+        return job_id
+
+
+def _deployed():
+    # Cloud Run sets K_SERVICE; the functions emulator sets FUNCTIONS_EMULATOR
+    return bool(os.environ.get("K_SERVICE")) and not os.environ.get("FUNCTIONS_EMULATOR")
+
+
+def build_job_queue(store, runner, queue_factory):
+    """TaskQueueDispatcher when deployed (JOB_DISPATCH=tasks), else a LocalJobQueue running ``runner``."""
+    dispatch = os.environ.get("JOB_DISPATCH", "tasks" if _deployed() else "local")
+    if dispatch == "tasks":
+        return TaskQueueDispatcher(store, queue_factory)
+    return LocalJobQueue(store, runner)
+
+
+def build_job_store(client_factory):
+    # Cloud Run sets K_SERVICE; locally (emulator, tests) keep jobs in memory
+    backend = os.environ.get("JOB_STORE_BACKEND", "firestore" if os.environ.get("K_SERVICE") else "memory")
+    if backend == "firestore":
+        return FirestoreJobStore(client_factory)
+    return InMemoryJobStore()
@@ -0,0 +1,330 @@
+# linear_model.py
+# The planning model for OR-Tools' linear solver wrapper (pywraplp), used by the "mip"
+# and "lp" backends of solver_backends.py. Bounds and objective coefficients come from
+# planning_model.model_coefficients, so objectives and bounds are in the same units as
+# the CP-SAT model's and compare directly. In the basic formulation the producing
+# flags carry no cost and constrain nothing, so only the setup formulation has them.
+# The LP backend solves the continuous relaxation: its objective is a lower bound, and
+# its quantities are rounded up on each pair's cumulative production to give a plan.
+import time
+
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from planning_data import COST_SCALE
+from planning_model import (
+    DEFAULT_FORMULATION, batched_lot_quantities, changeover_cost, changeover_groups, extract_plan, model_coefficients,
+    variable_indices,
+)
+
+# First available solver is used
+MIP_SOLVERS = ("SCIP", "CBC")
+LP_SOLVERS = ("GLOP", "CLP")
+# The solvers see the objective in SEK: CP-SAT's integer units (1/COST_SCALE SEK) reach
+# 1e10 and more, which leaves SCIP's LP with numerical trouble and no usable bound
+OBJECTIVE_SCALE = 1.0 / COST_SCALE
+
+# CP-SAT's names where they exist; pywraplp's UNBOUNDED and ABNORMAL are kept, not folded into MODEL_INVALID
+_STATUS_NAMES = {
+    pywraplp.Solver.OPTIMAL: "OPTIMAL",
+    pywraplp.Solver.FEASIBLE: "FEASIBLE",
+    pywraplp.Solver.INFEASIBLE: "INFEASIBLE",
+    pywraplp.Solver.UNBOUNDED: "UNBOUNDED",
+    pywraplp.Solver.ABNORMAL: "ABNORMAL",
+    pywraplp.Solver.MODEL_INVALID: "MODEL_INVALID",
+    pywraplp.Solver.NOT_SOLVED: "UNKNOWN",
+}
+
+
+def create_solver(relaxed):
+    for name in LP_SOLVERS if relaxed else MIP_SOLVERS:
+        solver = pywraplp.Solver.CreateSolver(name)
+        if solver is not None:
+            return name, solver
+    raise RuntimeError(f"None of the solvers {LP_SOLVERS if relaxed else MIP_SOLVERS} is available in this OR-Tools build.")
+
+
+def build_linear_model(data, stock_holding_rate_yearly, pairs=None, formulation=DEFAULT_FORMULATION, relaxed=False):
+    """Builds the planning model as a MIP, or as its LP relaxation when ``relaxed``.
+
+    Takes the same arguments as planning_model.build_model except ``objective_mode``:
+    both objective modes are the same weighted sum here. Returns a handle with the
+    same keys extract_plan and the warm start read, plus the pywraplp solver.
+    """
+    coefficients = model_coefficients(data, stock_holding_rate_yearly, pairs, formulation)
+    solver_name, solver = create_solver(relaxed)
+    infinity = solver.infinity()
+    num_items, num_machines = len(data["item_ids"]), len(data["machine_ids"])
+    pair_item, pair_machine = coefficients["pair_item"], coefficients["pair_machine"]
+    num_periods = coefficients["num_periods"]
+    setup = formulation == "setup"
+    pair_max_prod, pair_min_lot = coefficients["pair_max_prod"], coefficients["pair_min_lot"]
+    stock_to_sek, holding, pair_cost = coefficients["stock_to_sek"], coefficients["holding"], coefficients["pair_cost"]
+    objective = solver.Objective()
+    new_qty = solver.NumVar if relaxed else solver.IntVar
+    new_flag = (lambda name: solver.NumVar(0, 1, name)) if relaxed else solver.BoolVar
+
+    production_qty, is_producing = [], []
+    for p, upper_row in enumerate(pair_max_prod.tolist()):
+        qty_row = [new_qty(0, upper_row[t], f"prod_{p}_m{t}") for t in range(num_periods)]
+        for qty in qty_row:
+            objective.SetCoefficient(qty, pair_cost[p] * OBJECTIVE_SCALE)
+        production_qty.append(qty_row)
+        if setup:
+            flag_row = [new_flag(f"isprod_{p}_m{t}") for t in range(num_periods)]
+            for t in range(num_periods):
+                # Big-M link: a producing pair makes at least its minimum lot
+                upper_link = solver.Constraint(-infinity, 0)
+                upper_link.SetCoefficient(qty_row[t], 1)
+                upper_link.SetCoefficient(flag_row[t], -upper_row[t])
+                lower_link = solver.Constraint(0, infinity)
+                lower_link.SetCoefficient(qty_row[t], 1)
+                lower_link.SetCoefficient(flag_row[t], -pair_min_lot[p][t])
+            is_producing.append(flag_row)
+
+    # Inventory is integral whenever the quantities are, so it never needs to be an integer variable
+    inventory_level = []
+    demand_rows = data["demand"].tolist()
+    for i in range(num_items):
+        inv_row = [solver.NumVar(0, coefficients["inventory_upper"][i], f"inv_{i}_m{t}") for t in range(num_periods)]
+        for t in range(num_periods):
+            objective.SetCoefficient(inv_row[t], holding[i][t] * stock_to_sek * OBJECTIVE_SCALE)
+            # inv[t] - inv[t-1] - produced[t] == -demand[t]
+            rhs = -demand_rows[i][t] + (coefficients["initial_inventory"][i] if t == 0 else 0)
+            balance = solver.Constraint(rhs, rhs)
+            balance.SetCoefficient(inv_row[t], 1)
+            if t > 0:
+                balance.SetCoefficient(inv_row[t - 1], -1)
+            for p in coefficients["pairs_of_item"][i]:
+                balance.SetCoefficient(production_qty[p][t], -1)
+        inventory_level.append(inv_row)
+
+    pair_scaled_op_time = coefficients["scaled_op_time"][pair_item].tolist()
+    hourly_cost = data["hourly_cost"].tolist()
+    material_loaded = []
+    for m in range(num_machines):
+        machine_pairs = coefficients["pairs_of_machine"][m]
+        if not machine_pairs:
+            continue
+        groups = changeover_groups(coefficients, data, m) if setup else []
+        for t in range(num_periods):
+            capacity = solver.Constraint(-infinity, coefficients["scaled_capacity"][m][t])
+            for p in machine_pairs:
+                capacity.SetCoefficient(production_qty[p][t], pair_scaled_op_time[p])
+            for group, tool_change, material_change in groups:
+                if len(group) == 1:
+                    changeovers = [(is_producing[group[0]][t], tool_change + material_change)]
+                else:
+                    loaded = new_flag(f"material_{m}_{group[0]}_m{t}")
+                    for p in group:
+                        implication = solver.Constraint(-infinity, 0)
+                        implication.SetCoefficient(is_producing[p][t], 1)
+                        implication.SetCoefficient(loaded, -1)
+                    material_loaded.append((loaded, t, group))
+                    changeovers = [(is_producing[p][t], tool_change) for p in group] + [(loaded, material_change)]
+                for var, minutes in changeovers:
+                    capacity.SetCoefficient(var, minutes)
+                    objective.SetCoefficient(var, changeover_cost(minutes, hourly_cost[m]) * OBJECTIVE_SCALE)
+    objective.SetMinimization()
+
+    handle = {
+        "solver": solver,
+        "solverName": solver_name,
+        "relaxed": relaxed,
+        "coefficients": coefficients,
+        "production_qty": production_qty,
+        "is_producing": is_producing,
+        "material_loaded": material_loaded,
+        "inventory_level": inventory_level,
+        "qty_index": variable_indices(production_qty, index=lambda var: var.index()),
+        "inv_index": variable_indices(inventory_level, index=lambda var: var.index()),
+        "pair_item": pair_item,
+        "pair_machine": pair_machine,
+        "pair_max_prod": pair_max_prod,
+        "pairs_of_item": coefficients["pairs_of_item"],
+        "stock_holding_rate_yearly": stock_holding_rate_yearly,
+        "formulation": formulation,
+    }
+    if setup and not relaxed:
+        # Same batched greedy start as the CP-SAT setup model
+        hint_qty = batched_lot_quantities(data, pair_item, pair_machine, coefficients["pairs_of_item"], pair_max_prod, pair_min_lot,
+                                          pair_cost, [[cost * stock_to_sek for cost in row] for row in holding],
+                                          coefficients["scaled_capacity"], coefficients["scaled_tool_change"],
+                                          coefficients["scaled_material_change"])
+        hint_linear_production(handle, hint_qty)
+    return handle
+
+
+def hint_linear_production(handle, hint_qty):
+    """Sets a (pairs x periods) plan as the MIP start, replacing any earlier one. Returns the number of hinted variables."""
+    variables, values = [], []
+    for p, qty_row in enumerate(handle["production_qty"]):
+        for t, qty in enumerate(hint_qty[p].tolist()):
+            variables.append(qty_row[t])
+            values.append(float(qty))
+            if handle["is_producing"]:
+                variables.append(handle["is_producing"][p][t])
+                values.append(1.0 if qty > 0 else 0.0)
+    for loaded, t, group in handle["material_loaded"]:
+        variables.append(loaded)
+        values.append(1.0 if any(hint_qty[p, t] > 0 for p in group) else 0.0)
+    handle["solver"].SetHint(variables, values)
+    return len(variables)
+
+
+def _machine_load(qty, coefficients, data):
+    # Scaled minutes used per machine and period, changeovers included; returns (load, changeover cost)
+    pair_item = coefficients["pair_item"]
+    load = np.zeros((len(data["machine_ids"]), qty.shape[1]))
+    np.add.at(load, coefficients["pair_machine"], qty * coefficients["scaled_op_time"][pair_item][:, None])
+    setup_cost = 0.0
+    if coefficients["formulation"] == "setup":
+        producing = qty > 0
+        hourly_cost = data["hourly_cost"].tolist()
+        for m in range(len(data["machine_ids"])):
+            if not coefficients["pairs_of_machine"][m]:
+                continue
+            for group, tool_change, material_change in changeover_groups(coefficients, data, m):
+                tools = producing[group].sum(axis=0)
+                materials = producing[group].any(axis=0)
+                load[m] += tools * tool_change + materials * material_change
+                setup_cost += float(np.sum(tools * changeover_cost(tool_change, hourly_cost[m])
+                                           + materials * changeover_cost(material_change, hourly_cost[m])))
+    return load, setup_cost
+
+
+def _repair_overload(qty, load, coefficients):
+    # Moves pieces out of overloaded machine periods: to the item's other machines in the
+    # same period, else to earlier periods of the same pair (held as stock until due).
+    # With setups only cells that already produce take pieces, so no changeover is added.
+    pair_item, pair_machine = coefficients["pair_item"].tolist(), coefficients["pair_machine"].tolist()
+    op_time = coefficients["scaled_op_time"][coefficients["pair_item"]].tolist()
+    upper = coefficients["pair_max_prod"]
+    capacity = np.asarray(coefficients["scaled_capacity"], dtype=np.float64)
+    setup = coefficients["formulation"] == "setup"
+    for m, t in zip(*(axis.tolist() for axis in np.nonzero(load > capacity))):
+        for p in sorted(coefficients["pairs_of_machine"][m], key=lambda p: -qty[p, t]):
+            targets = [(other, t) for other in coefficients["pairs_of_item"][pair_item[p]] if other != p]
+            targets += [(p, earlier) for earlier in range(t - 1, -1, -1)]
+            for target, period in targets:
+                if load[m, t] <= capacity[m, t] or qty[p, t] <= 0:
+                    break
+                if setup and qty[target, period] <= 0:
+                    continue
+                target_machine = pair_machine[target]
+                room = min((capacity[target_machine, period] - load[target_machine, period]) // max(op_time[target], 1),
+                           upper[target, period] - qty[target, period])
+                moved = min(room, np.ceil((load[m, t] - capacity[m, t]) / max(op_time[p], 1)), qty[p, t])
+                if moved <= 0:
+                    continue
+                qty[p, t] -= moved
+                qty[target, period] += moved
+                load[m, t] -= moved * op_time[p]
+                load[target_machine, period] += moved * op_time[target]
+            if load[m, t] <= capacity[m, t]:
+                break
+
+
+def round_relaxation(handle, data, values):
+    """Rounds the LP quantities to whole pieces and checks the resulting plan.
+
+    Each item's cumulative production is rounded up, so its demand stays covered,
+    and the extra pieces of a period go to the pairs that already make the most of
+    it. Machine periods the rounding overloads are repaired where another machine or
+    an earlier period has room, and the plan is checked again for capacity and
+    minimum lots. Updates ``values`` in place and returns the plan's objective and
+    its number of violations.
+    """
+    coefficients = handle["coefficients"]
+    qty_index, inv_index = handle["qty_index"], handle["inv_index"]
+    relaxed_qty = values[qty_index]
+    relaxed_produced = np.zeros(inv_index.shape)
+    np.add.at(relaxed_produced, coefficients["pair_item"], relaxed_qty)
+    target = np.diff(np.ceil(np.cumsum(relaxed_produced, axis=1) - 1e-6), axis=1, prepend=0.0).tolist()
+    relaxed_ceil = np.ceil(relaxed_qty - 1e-6)
+    qty = np.zeros_like(relaxed_qty)
+    for i, pairs in enumerate(coefficients["pairs_of_item"]):
+        for t, need in enumerate(target[i]):
+            if need <= 0:
+                continue
+            order = sorted(pairs, key=lambda p: -relaxed_qty[p, t])
+            for p in order:
+                qty[p, t] = min(relaxed_ceil[p, t], need)
+                need -= qty[p, t]
+            qty[order[0], t] += need
+    load, _ = _machine_load(qty, coefficients, data)
+    if (load > np.asarray(coefficients["scaled_capacity"])).any():
+        _repair_overload(qty, load, coefficients)
+    load, setup_cost = _machine_load(qty, coefficients, data)
+
+    produced = np.zeros(inv_index.shape)
+    np.add.at(produced, coefficients["pair_item"], qty)
+    initial_inventory = np.asarray(coefficients["initial_inventory"], dtype=np.float64)
+    inventory = initial_inventory[:, None] + np.cumsum(produced - data["demand"], axis=1)
+    values[qty_index] = qty
+    values[inv_index] = inventory
+    objective = float(np.sum(qty * np.asarray(coefficients["pair_cost"])[:, None])) + setup_cost
+    objective += float(np.sum(inventory * np.asarray(coefficients["holding"]) * coefficients["stock_to_sek"]))
+    min_lot_violations = 0
+    if handle["is_producing"]:
+        producing = qty > 0
+        flag_index = variable_indices(handle["is_producing"], index=lambda var: var.index())
+        values[flag_index] = producing
+        min_lot_violations = int(np.sum(producing & (qty < np.asarray(coefficients["pair_min_lot"]))))
+        for loaded, t, group in handle["material_loaded"]:
+            values[loaded.index()] = producing[group, t].any()
+    return {
+        "objective": objective,
+        "capacityViolations": int(np.sum(load > np.asarray(coefficients["scaled_capacity"]))),
+        "minLotViolations": min_lot_violations,
+        "negativeInventory": int(np.sum(inventory < 0)),
+    }
+
+
+def solve_linear_model(handle, data, max_time_in_seconds=120.0, relative_gap=None):
+    """Solves a built linear model; returns the same shape as planning_model.solve_model.
+
+    For the relaxation, "bestBound" is the LP objective and the plan is the rounded
+    one; the status is FEASIBLE when that plan passes every check and UNKNOWN when it
+    does not (the rounded quantities stay in the handle's "rounded_qty"). The result gains a "relaxation" report either way. "stats" holds the
+    model size, the simplex iterations (and branch-and-bound nodes for the MIP) and the
+    time spent reading and rounding the solution.
+    """
+    solver = handle["solver"]
+    solver.SetTimeLimit(int(max_time_in_seconds * 1000))
+    parameters = pywraplp.MPSolverParameters()
+    if relative_gap is not None and not handle["relaxed"]:
+        parameters.SetDoubleParam(pywraplp.MPSolverParameters.RELATIVE_MIP_GAP, relative_gap)
+    status = solver.Solve(parameters)
+
+    result = {"statusName": _STATUS_NAMES.get(status, "UNKNOWN"), "wallTime": solver.wall_time() / 1000.0}
+    result["stats"] = {
+        "models": 1, "variables": solver.NumVariables(), "constraints": solver.NumConstraints(),
+        "iterations": solver.iterations(), "wallTime": result["wallTime"],
+    }
+    if not handle["relaxed"]:
+        result["stats"]["nodes"] = solver.nodes()
+    if status not in (pywraplp.Solver.OPTIMAL, pywraplp.Solver.FEASIBLE):
+        return result
+    start = time.perf_counter()
+    values = np.array([var.solution_value() for var in solver.variables()])
+    if handle["relaxed"]:
+        lower_bound = solver.Objective().Value() / OBJECTIVE_SCALE
+        rounded = round_relaxation(handle, data, values)
+        # Kept for solver_backends' fallback, which hints CP-SAT with a rejected plan
+        handle["rounded_qty"] = np.rint(values[handle["qty_index"]]).astype(np.int64)
+        feasible = rounded["capacityViolations"] == 0 and rounded["minLotViolations"] == 0 and rounded["negativeInventory"] == 0
+        result["relaxation"] = {"lowerBound": lower_bound, "roundedObjective": rounded["objective"], "planFeasible": feasible,
+                                "capacityViolations": rounded["capacityViolations"], "minLotViolations": rounded["minLotViolations"]}
+        if not feasible:
+            result["statusName"] = "UNKNOWN"
+            result["stats"]["extractSeconds"] = time.perf_counter() - start
+            return result
+        result.update({"statusName": "FEASIBLE", "objective": rounded["objective"], "bestBound": lower_bound})
+    else:
+        result.update({"objective": round(solver.Objective().Value() / OBJECTIVE_SCALE),
+                       "bestBound": solver.Objective().BestBound() / OBJECTIVE_SCALE})
+    # Solved or rounded values, read as whole pieces
+    result.update(extract_plan(np.rint(values).astype(np.int64), handle, data))
+    result["stats"]["extractSeconds"] = time.perf_counter() - start
+    return result
@@ -1,19 +1,385 @@
-from firebase_functions import https_fn
-from firebase_admin import initialize_app, firestore
-import google.cloud.firestore # Required for SERVER_TIMESTAMP
-from ortools.sat.python import cp_model
+from firebase_functions import https_fn, tasks_fn
+from firebase_functions.options import RateLimits, RetryConfig
 import json
-import random
+import threading
+import time
 import traceback
-import datetime 
 
-initialize_app()
+from diagnostics import DIAGNOSTICS_LOG_DEFAULT, Diagnostics
+from plan_storage import load_latest_header, load_latest_plan, parse_plan_view, plan_view, save_plan, stored_plan_view
+from jobs import JOB_MAX_CONCURRENT_TASKS, JOB_QUEUED, JOB_TASK_FUNCTION, build_job_queue, build_job_store, run_job
+from solve_cache import SOLVE_CACHE_DEFAULT, build_default_cache, make_cache_key
 
-# Helper function to get a random base cost for an item if not present
-def get_base_cost(item_doc):
-    if "baseCostPerItem" in item_doc and isinstance(item_doc["baseCostPerItem"], (int, float)):
-        return item_doc["baseCostPerItem"]
-    return random.uniform(1.5, 3.0)
+# Module scope only holds what every request path needs. The solver modules (OR-Tools,
+# numpy) are imported on the first solve, and the Firebase app and Firestore client are
+# created on the first request that reads or writes data; preflight and health requests
+# touch neither.
+INSTANCE_STARTED = time.time()
+_instance_lock = threading.Lock()
+_db = None
+_dataset_cache = None
+_incremental_store = None
+
+# Solve results of this (warm) instance, keyed by a hash of the normalized inputs and overrides
+solve_cache = build_default_cache()
+
+
+def get_db():
+    """The Firestore client of this instance, created (with the Firebase app) on first use and then reused."""
+    global _db
+    if _db is None:
+        with _instance_lock:
+            if _db is None:
+                from firebase_admin import initialize_app, firestore
+                initialize_app()
+                _db = firestore.client()
+    return _db
+
+
+def get_dataset_cache():
+    """Planning data of this (warm) instance, reloaded when meta/dataset_version changes."""
+    global _dataset_cache
+    if _dataset_cache is None:
+        with _instance_lock:
+            if _dataset_cache is None:
+                from dataset_cache import DatasetCache
+                _dataset_cache = DatasetCache()
+    return _dataset_cache
+
+
+def get_incremental_store():
+    """Base models and last plans of this (warm) instance for incremental re-solves."""
+    global _incremental_store
+    if _incremental_store is None:
+        with _instance_lock:
+            if _incremental_store is None:
+                from incremental import IncrementalStore
+                _incremental_store = IncrementalStore()
+    return _incremental_store
+
+
+def get_job_task_queue():
+    """The Cloud Tasks queue of runOptimizationJob (the Firebase app is created with the Firestore client)."""
+    get_db()
+    from firebase_admin import functions
+    return functions.task_queue(JOB_TASK_FUNCTION)
+
+
+def run_job_payload(payload, progress):
+    return run_optimization(get_db(), payload, progress)
+
+
+# Asynchronous jobs: deployed, optimizationJobs enqueues each solve for runOptimizationJob;
+# locally they run on this instance's worker thread(s)
+job_store = build_job_store(get_db)
+job_queue = build_job_queue(job_store, run_job_payload, get_job_task_queue)
+
+def parse_solver_options(payload):
+    """Solver options of an optimizeProduction (or optimizeScenarios) payload; invalid values fall back to the defaults."""
+    from planning_model import OBJECTIVE_MODES, DEFAULT_OBJECTIVE_MODE, FORMULATIONS, DEFAULT_FORMULATION
+    from eligibility import ELIGIBILITY_POLICIES, DEFAULT_ELIGIBILITY_POLICY
+    from warm_start import WARM_START_DEFAULT
+    from decomposition import DECOMPOSE_DEFAULT
+    from anytime import parse_stop_criteria
+    from solver_backends import SOLVER_BACKENDS, DEFAULT_SOLVER_BACKEND
+    from horizon import parse_horizon
+    from incremental import INCREMENTAL_DEFAULT
+    objective_mode = DEFAULT_OBJECTIVE_MODE
+    formulation = DEFAULT_FORMULATION
+    backend = DEFAULT_SOLVER_BACKEND
+    eligibility_policy = DEFAULT_ELIGIBILITY_POLICY
+    warm_start = WARM_START_DEFAULT
+    decompose = DECOMPOSE_DEFAULT
+    incremental = INCREMENTAL_DEFAULT
+    use_cache = SOLVE_CACHE_DEFAULT
+    stop_criteria = parse_stop_criteria(None)
+    horizon = None
+    diagnostics_log = DIAGNOSTICS_LOG_DEFAULT
+    plan_view_options = None
+    if payload and isinstance(payload, dict):
+        objective_mode = payload.get("objective_mode", DEFAULT_OBJECTIVE_MODE)
+        if objective_mode not in OBJECTIVE_MODES:
+            print(f"Warning: Invalid objective_mode in payload: {objective_mode}. Using default.")
+            objective_mode = DEFAULT_OBJECTIVE_MODE
+        formulation = payload.get("formulation", DEFAULT_FORMULATION)
+        if formulation not in FORMULATIONS:
+            print(f"Warning: Invalid formulation in payload: {formulation}. Using default.")
+            formulation = DEFAULT_FORMULATION
+        backend = payload.get("backend", DEFAULT_SOLVER_BACKEND)
+        if backend not in SOLVER_BACKENDS:
+            print(f"Warning: Invalid backend in payload: {backend}. Using default.")
+            backend = DEFAULT_SOLVER_BACKEND
+        eligibility_policy = payload.get("eligibility", DEFAULT_ELIGIBILITY_POLICY)
+        if eligibility_policy not in ELIGIBILITY_POLICIES:
+            print(f"Warning: Invalid eligibility in payload: {eligibility_policy}. Using default.")
+            eligibility_policy = DEFAULT_ELIGIBILITY_POLICY
+        warm_start = payload.get("warm_start", WARM_START_DEFAULT)
+        if not isinstance(warm_start, bool):
+            print(f"Warning: Invalid warm_start in payload: {warm_start}. Using default.")
+            warm_start = WARM_START_DEFAULT
+        decompose = payload.get("decompose", DECOMPOSE_DEFAULT)
+        if not isinstance(decompose, bool):
+            print(f"Warning: Invalid decompose in payload: {decompose}. Using default.")
+            decompose = DECOMPOSE_DEFAULT
+        incremental = payload.get("incremental", INCREMENTAL_DEFAULT)
+        if not isinstance(incremental, bool):
+            print(f"Warning: Invalid incremental in payload: {incremental}. Using default.")
+            incremental = INCREMENTAL_DEFAULT
+        use_cache = payload.get("use_cache", SOLVE_CACHE_DEFAULT)
+        if not isinstance(use_cache, bool):
+            print(f"Warning: Invalid use_cache in payload: {use_cache}. Using default.")
+            use_cache = SOLVE_CACHE_DEFAULT
+        diagnostics_log = payload.get("diagnostics_log", DIAGNOSTICS_LOG_DEFAULT)
+        if not isinstance(diagnostics_log, bool):
+            print(f"Warning: Invalid diagnostics_log in payload: {diagnostics_log}. Using default.")
+            diagnostics_log = DIAGNOSTICS_LOG_DEFAULT
+        stop_criteria = parse_stop_criteria(payload.get("anytime"))
+        horizon = parse_horizon(payload.get("horizon"))
+        plan_view_options = payload.get("plan_view")
+    return {
+        "objective_mode": objective_mode, "formulation": formulation, "backend": backend,
+        "eligibility_policy": eligibility_policy, "warm_start": warm_start, "decompose": decompose, "incremental": incremental,
+        "use_cache": use_cache, "stop_criteria": stop_criteria, "horizon": horizon, "diagnostics_log": diagnostics_log,
+        "plan_view": parse_plan_view(plan_view_options),
+    }
+
+def with_plan_view(response_data, view, diagnostics):
+    """The response with only the page of its full "plan" that ``view`` selects, plus "planPage" and the diagnostics."""
+    plan, page_info = plan_view(response_data["plan"], view, response_data.get("planId"))
+    return {**response_data, "plan": plan, "planPage": page_info, "diagnostics": diagnostics.report()}
+
+def run_optimization(db, payload, progress=None):
+    """Loads the planning data, applies the payload overrides and options, solves and stores the plan.
+
+    Returns (http_status, response_data); shared by the synchronous endpoint and the job worker.
+    ``progress(event)`` receives intermediate solutions while solving.
+    """
+    import google.cloud.firestore # Required for SERVER_TIMESTAMP
+    from planning_data import normalize_columns
+    from eligibility import build_eligibility
+    from planning_model import cost_summary, setup_summary
+    from overrides import STOCK_HOLDING_RATE_YEARLY_DEFAULT, apply_overrides, writable_columns
+    from decomposition import solve_decomposed
+    from solver_backends import solve_problem
+    from horizon import to_period_data, solve_rolling
+    from incremental import IncrementalStore, solve_incremental
+    from warm_start import WARM_START_CANDIDATES, plan_is_compatible
+
+    # --- Solver Options from Payload ---
+    options = parse_solver_options(payload)
+    objective_mode, formulation, backend = options["objective_mode"], options["formulation"], options["backend"]
+    eligibility_policy, warm_start, decompose = options["eligibility_policy"], options["warm_start"], options["decompose"]
+    use_cache, stop_criteria, horizon = options["use_cache"], options["stop_criteria"], options["horizon"]
+    incremental = options["incremental"]
+    # --- End Solver Options ---
+    diagnostics = Diagnostics("optimizeProduction", structured_log=options["diagnostics_log"])
+
+    # 1. Load the planning data: cached in this instance, else the current columnar snapshot or the items/machines collections
+    with diagnostics.span("load_dataset") as span:
+        dataset, dataset_cache_report = get_dataset_cache().get(db)
+        span["cacheHit"] = dataset_cache_report["hit"]
+    dataset_info = {**dataset.info, "cache": dataset_cache_report}
+    print(f"Dataset cache {'hit' if dataset_cache_report['hit'] else 'miss'}: {dataset_cache_report}")
+
+    if not len(dataset.columns["item_ids"]):
+         return 400, {"status": "error", "message": "No data found in items collection.", "diagnostics": diagnostics.report()}
+    if not len(dataset.columns["machine_ids"]):
+        return 400, {"status": "error", "message": "No data found in machines collection.", "diagnostics": diagnostics.report()}
+
+    # --- Parameter Overrides from Payload ---
+    with diagnostics.span("apply_overrides"):
+        # Copy the columns that overrides may write into (the cached columns are read-only)
+        columns = writable_columns(dataset.columns)
+        STOCK_HOLDING_RATE_YEARLY, columns_overridden = apply_overrides(columns, payload)
+        planning_data = normalize_columns(columns) if columns_overridden else dataset.planning_data
+    # --- End Parameter Overrides ---
+
+    with diagnostics.span("eligibility"):
+        eligibility_mask = build_eligibility(planning_data, eligibility_policy)
+
+    cache_key = None
+    if use_cache and incremental:
+        # An incremental result depends on the plans this instance has kept, not only on the request
+        print("Solve cache not used for an incremental solve.")
+    elif use_cache:
+        override_payload = {key: payload.get(key) for key in ("global_overrides", "item_overrides", "machine_overrides")} if isinstance(payload, dict) else {}
+        with diagnostics.span("cache_lookup"):
+            cache_key = make_cache_key(planning_data, override_payload, {
+                "stock_holding_rate_yearly": STOCK_HOLDING_RATE_YEARLY,
+                "objective_mode": objective_mode,
+                "formulation": formulation,
+                "backend": backend,
+                "eligibility": eligibility_policy,
+                "relative_gap": stop_criteria["relative_gap"],
+                "horizon": horizon,
+            })
+            cached_response = solve_cache.get(cache_key)
+        if cached_response is not None:
+            print(f"Solve cache hit: {cache_key}")
+            cached_response = {**cached_response, "dataset": dataset_info, "cache": {"hit": True, "key": cache_key}}
+            return 200, with_plan_view(cached_response, options["plan_view"], diagnostics)
+
+    incremental_report = None
+    incremental_key = IncrementalStore.key(dataset.info.get("version"), eligibility_policy, objective_mode, formulation)
+    if incremental and horizon is not None:
+        incremental_report = {"mode": "off", "reason": "Not used with a planning horizon."}
+        incremental = False
+
+    previous_plan_id, previous_plan = None, None
+    warm_start_report = {"enabled": False}
+    if warm_start and horizon is not None:
+        # Stored plans are monthly and windows start from frozen stock, so there is nothing to hint
+        warm_start_report = {"enabled": True, "applied": False, "reason": "Not used with a planning horizon."}
+    elif warm_start and incremental and get_incremental_store().has_plan(incremental_key):
+        # The instance's last plan hints the incremental solve; no need to read the stored one
+        warm_start_report = {"enabled": True, "applied": False, "reason": "Hinted with the instance's last incremental plan."}
+    elif warm_start:
+        with diagnostics.span("load_warm_start"):
+            try:
+                # Only the pages of a plan solved for this dataset version, grid, formulation and eligibility are read
+                def compatible(header):
+                    return plan_is_compatible(header, dataset.info.get("version"), formulation, eligibility_policy)
+                previous_plan_id, previous_plan = load_latest_plan(db, compatible, WARM_START_CANDIDATES)
+                if previous_plan is None:
+                    warm_start_report = {"enabled": True, "applied": False,
+                                         "reason": f"No compatible plan among the {WARM_START_CANDIDATES} newest stored plans."}
+            except Exception as e_warm:
+                print(f"Error loading previous plan for warm start: {e_warm}")
+                warm_start_report = {"enabled": True, "applied": False, "reason": str(e_warm)}
+
+    decomposition_report = None
+    horizon_report = None
+    with diagnostics.span("solve"):
+        if horizon is not None:
+            solve_result = solve_rolling(to_period_data(planning_data, horizon), eligibility_mask, STOCK_HOLDING_RATE_YEARLY,
+                                         objective_mode, stop_criteria, horizon, decompose=decompose, progress=progress,
+                                         formulation=formulation, backend=backend)
+            horizon_report = solve_result["horizon"]
+            print(f"Rolling-horizon solve: {horizon_report}")
+        elif incremental:
+            # Takes precedence over decompose: only the touched neighbourhood is searched anyway
+            solve_result = solve_incremental(get_incremental_store(), dataset.info.get("version"), dataset.planning_data,
+                                             STOCK_HOLDING_RATE_YEARLY_DEFAULT, planning_data, STOCK_HOLDING_RATE_YEARLY,
+                                             eligibility_policy, objective_mode, formulation, stop_criteria, backend=backend,
+                                             hint_plan_id=previous_plan_id, hint_plan=previous_plan, listener=progress)
+            incremental_report = solve_result["incremental"]
+            if solve_result["warmStart"] is not None:
+                warm_start_report = solve_result["warmStart"]
+            print(f"Incremental solve: {incremental_report}")
+        elif decompose:
+            solve_result = solve_decomposed(planning_data, eligibility_mask, STOCK_HOLDING_RATE_YEARLY, objective_mode,
+                                            stop_criteria, hint_plan_id=previous_plan_id, hint_plan=previous_plan,
+                                            progress=progress, formulation=formulation, backend=backend)
+            decomposition_report = solve_result["decomposition"]
+            if solve_result["warmStart"]["enabled"]:
+                warm_start_report = solve_result["warmStart"]
+            print(f"Decomposed solve: {decomposition_report}")
+        else:
+            solve_result = solve_problem(planning_data, eligibility_mask, STOCK_HOLDING_RATE_YEARLY, objective_mode, stop_criteria,
+                                         backend=backend, formulation=formulation, hint_plan_id=previous_plan_id,
+                                         hint_plan=previous_plan, listener=progress)
+            if solve_result["warmStart"] is not None:
+                warm_start_report = solve_result["warmStart"]
+    diagnostics.add_solver(solve_result)
+    if warm_start:
+        print(f"Warm start: {warm_start_report}")
+    print(f"Solver backend: {solve_result['backend']}")
+    status_name = solve_result["statusName"]
+
+    if status_name in ("OPTIMAL", "FEASIBLE"):
+        optimized_plan_details = solve_result["plan"]
+        # Savings against the original plan, with the potentially overridden STOCK_HOLDING_RATE_YEARLY
+        costs = cost_summary(planning_data, solve_result, STOCK_HOLDING_RATE_YEARLY)
+
+        response_data = {
+            "status": "success" if status_name == "OPTIMAL" else "feasible",
+            "message": status_name,
+            **{key: round(value, 2) for key, value in costs.items()},
+            "plan": optimized_plan_details,
+            "eligibility": {
+                "policy": eligibility_policy,
+                "eligiblePairs": int(eligibility_mask.sum()),
+                "totalPairs": int(eligibility_mask.size),
+            },
+            "warmStart": warm_start_report,
+            "decomposition": decomposition_report,
+            "anytime": solve_result["anytime"],
+            "horizon": horizon_report,
+            "incremental": incremental_report,
+            "setup": {"formulation": formulation, **setup_summary(optimized_plan_details, planning_data)},
+            "backend": {"requested": backend, **solve_result["backend"], "bestBound": solve_result.get("bestBound"),
+                        "relaxation": solve_result.get("relaxation")},
+            "dataset": dataset_info,
+            "diagnostics": diagnostics.report(),
+        }
+        # The plan is stored as a summary header plus compressed pages of entries
+        plan_to_save = {key: value for key, value in response_data.items() if key != "plan"}
+        plan_to_save['createdAt'] = google.cloud.firestore.SERVER_TIMESTAMP
+        if payload: # Log that this plan was generated with overrides
+            plan_to_save['overrides_applied'] = True 
+
+        plan_id = None
+        with diagnostics.span("save_plan", entries=len(optimized_plan_details)) as span:
+            try:
+                plan_id = save_plan(db, plan_to_save, optimized_plan_details)
+                print(f"Production plan {plan_id} successfully saved to Firestore.")
+            except Exception as e_save:
+                print(f"Error saving production plan to Firestore: {e_save}")
+                span["error"] = str(e_save)
+        response_data["planId"] = plan_id
+
+        if cache_key is not None:
+            # Only proven optima: a plan cut short by the time budget or deadline (which are not part
+            # of the key) must not be served to a later request with more time
+            if status_name == "OPTIMAL":
+                solve_cache.put(cache_key, response_data)
+            response_data = {**response_data, "cache": {"hit": False, "key": cache_key, "stored": status_name == "OPTIMAL"}}
+
+        # The saved document has the diagnostics up to the write; the response adds the write itself
+        return 200, with_plan_view(response_data, options["plan_view"], diagnostics)
+    else:
+        return 500, {"status": "error", "message": f"Optimization failed. Status: {status_name}", "diagnostics": diagnostics.report()}
+
+def run_scenarios(db, payload):
+    """Solves the payload's "scenarios" against the shared planning data; returns (http_status, response_data).
+
+    The payload's own overrides and solver options are the base every scenario starts
+    from. Scenario plans are compared, not stored; warm_start, decompose, use_cache
+    and horizon do not apply to a batch.
+    """
+    from overrides import apply_overrides, writable_columns
+    from scenarios import parse_scenarios, solve_scenarios
+
+    if not isinstance(payload, dict):
+        return 400, {"status": "error", "message": "Expected a JSON payload with a \"scenarios\" list."}
+    options = parse_solver_options(payload)
+    diagnostics = Diagnostics("optimizeScenarios", structured_log=options["diagnostics_log"])
+    scenarios = parse_scenarios(payload.get("scenarios"))
+    if not scenarios:
+        return 400, {"status": "error", "message": "No valid scenarios in payload.", "diagnostics": diagnostics.report()}
+
+    with diagnostics.span("load_dataset") as span:
+        dataset, dataset_cache_report = get_dataset_cache().get(db)
+        span["cacheHit"] = dataset_cache_report["hit"]
+    dataset_info = {**dataset.info, "cache": dataset_cache_report}
+    if not len(dataset.columns["item_ids"]) or not len(dataset.columns["machine_ids"]):
+        return 400, {"status": "error", "message": "No items or machines found.", "diagnostics": diagnostics.report()}
+
+    with diagnostics.span("apply_overrides"):
+        columns = writable_columns(dataset.columns)
+        stock_holding_rate_yearly, _ = apply_overrides(columns, payload)
+    ignored = [key for key in ("warm_start", "decompose", "use_cache", "horizon") if key in payload]
+    if ignored:
+        print(f"Warning: {ignored} not used for scenario batches.")
+    include_base = payload.get("include_base", True) is not False
+    include_plans = payload.get("include_plans", False) is True
+
+    with diagnostics.span("solve_scenarios", scenarios=len(scenarios)):
+        report = solve_scenarios(columns, scenarios, stock_holding_rate_yearly, options["eligibility_policy"],
+                                 options["objective_mode"], options["formulation"], options["backend"],
+                                 options["stop_criteria"], include_base=include_base, include_plans=include_plans)
+    print(f"Scenario batch: {report['batch']}")
+    return 200, {**report, "ignoredOptions": ignored, "dataset": dataset_info, "diagnostics": diagnostics.report()}
 
 @https_fn.on_request(region="europe-west1", memory=8192, cpu=2)
 def optimizeProduction(req: https_fn.Request) -> https_fn.Response:
@@ -26,7 +392,7 @@ def optimizeProduction(req: https_fn.Request) -> https_fn.Response:
     if req.method == 'OPTIONS':
         return https_fn.Response("", headers=cors_headers, status=204)
 
-    db: google.cloud.firestore.Client = firestore.client()
+    db = get_db()
     payload = None
     if req.method == 'POST':
         try:
@@ -40,245 +406,10 @@ def optimizeProduction(req: https_fn.Request) -> https_fn.Response:
             # For now, proceed, effectively making payload optional on error
 
     try:
-        # 1. Fetch Data from Firestore
-        items_ref = db.collection("items")
-        items_stream = items_ref.stream() # Use stream to check if empty
-        items_data = {}
-        for doc in items_stream:
-            items_data[doc.id] = doc.to_dict()
-            # Ensure baseCostPerItem is applied even if overridden later by payload
-            items_data[doc.id]["baseCostPerItem"] = get_base_cost(items_data[doc.id])
-        
-        if not items_data:
-             return https_fn.Response(
-                json.dumps({"status": "error", "message": "No data found in items collection."}),
-                status=400, headers={**cors_headers, "Content-Type": "application/json"})
-
-        machines_ref = db.collection("machines")
-        machines_stream = machines_ref.stream()
-        machines_data = {}
-        for doc in machines_stream:
-            machines_data[doc.id] = doc.to_dict()
-
-        if not machines_data:
-            return https_fn.Response(
-                json.dumps({"status": "error", "message": "No data found in machines collection."}),
-                status=400, headers={**cors_headers, "Content-Type": "application/json"})
-
-        # --- Parameter Overrides from Payload --- 
-        STOCK_HOLDING_RATE_YEARLY_DEFAULT = 0.10
-        STOCK_HOLDING_RATE_YEARLY = STOCK_HOLDING_RATE_YEARLY_DEFAULT
-
-        if payload and isinstance(payload, dict): # Check if payload is a dict
-            global_overrides = payload.get("global_overrides", {})
-            if isinstance(global_overrides, dict): # Ensure global_overrides is a dict
-                 STOCK_HOLDING_RATE_YEARLY = global_overrides.get("STOCK_HOLDING_RATE_YEARLY", STOCK_HOLDING_RATE_YEARLY_DEFAULT)
-                 if not isinstance(STOCK_HOLDING_RATE_YEARLY, (int, float)) or not (0 <= STOCK_HOLDING_RATE_YEARLY <= 1):
-                    print(f"Warning: Invalid STOCK_HOLDING_RATE_YEARLY in payload: {STOCK_HOLDING_RATE_YEARLY}. Using default.")
-                    STOCK_HOLDING_RATE_YEARLY = STOCK_HOLDING_RATE_YEARLY_DEFAULT
-            
-            item_overrides_payload = payload.get("item_overrides", {})
-            if isinstance(item_overrides_payload, dict): # Ensure item_overrides_payload is a dict
-                for item_id, overrides in item_overrides_payload.items():
-                    if item_id in items_data and isinstance(overrides, dict):
-                        print(f"Applying overrides for item: {item_id}")
-                        for key, value in overrides.items():
-                            if key in ["operationTimePerPC", "baseCostPerItem", "FIXED_LOT_SIZE"] and isinstance(value, (int, float)) and value >=0:
-                                items_data[item_id][key] = float(value)
-                            elif key == "monthlyConsumption" and isinstance(value, dict):
-                                items_data[item_id][key] = {str(m): int(c) for m, c in value.items() if isinstance(m, str) and isinstance(c, (int, float)) and c >=0}
-                            else:
-                                print(f"Warning: Invalid or unsupported override key/value for item {item_id}: {key}={value}")
-            
-            machine_overrides_payload = payload.get("machine_overrides", {})
-            if isinstance(machine_overrides_payload, dict): # Ensure machine_overrides_payload is a dict
-                for machine_id, overrides in machine_overrides_payload.items():
-                    if machine_id in machines_data and isinstance(overrides, dict):
-                        print(f"Applying overrides for machine: {machine_id}")
-                        for key, value in overrides.items():
-                            if key in ["dailyOperationalHours", "weeklyOperationalDays", "hourlyOperatingCost"] and isinstance(value, (int,float)) and value >=0:
-                                 # Add validation for weeklyOperationalDays (1-7)
-                                if key == "weeklyOperationalDays" and not (1 <= value <= 7):
-                                    print(f"Warning: Invalid weeklyOperationalDays for machine {machine_id}: {value}. Skipping override.")
-                                    continue
-                                machines_data[machine_id][key] = float(value)
-                            else:
-                                print(f"Warning: Invalid or unsupported override key/value for machine {machine_id}: {key}={value}")
-        # --- End Parameter Overrides ---
-
-        model = cp_model.CpModel()
-        MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
-        NUM_MONTHS = len(MONTHS)
-        DAYS_IN_MONTH = 20
-        STOCK_HOLDING_RATE_MONTHLY = STOCK_HOLDING_RATE_YEARLY / NUM_MONTHS
-        
-        production_qty, is_producing, inventory_level = {}, {}, {}
-        item_ids, machine_ids = list(items_data.keys()), list(machines_data.keys())
-
-        for item_id in item_ids:
-            item = items_data[item_id]
-            item_op_time = item.get("operationTimePerPC", 1.0); item_op_time = float(item_op_time) if isinstance(item_op_time, (int,float)) and item_op_time > 0 else 1.0
-            current_monthly_consumption = item.get("monthlyConsumption", {m: 0 for m in MONTHS})
-            max_prod_for_item = sum(current_monthly_consumption.get(m, 0) for m in MONTHS) * 2 + 1
-
-            for month_idx in range(NUM_MONTHS):
-                inventory_level[(item_id, month_idx)] = model.NewIntVar(0, max_prod_for_item * NUM_MONTHS, f"inv_{item_id}_m{month_idx}")
-                for machine_id in machine_ids:
-                    machine_info = machines_data[machine_id]
-                    machine_available_minutes_per_month = machine_info.get("dailyOperationalHours", 24) * machine_info.get("weeklyOperationalDays", 5) * DAYS_IN_MONTH * 60
-                    max_prod_on_machine = 1
-                    if item_op_time > 0: max_prod_on_machine = int(machine_available_minutes_per_month / item_op_time)
-                    if max_prod_on_machine <= 0: max_prod_on_machine = 1
-                    
-                    var_key = (item_id, machine_id, month_idx)
-                    production_qty[var_key] = model.NewIntVar(0, max_prod_on_machine, f"prod_{item_id}_{machine_id}_m{month_idx}")
-                    is_producing[var_key] = model.NewBoolVar(f"isprod_{item_id}_{machine_id}_m{month_idx}")
-                    model.Add(production_qty[var_key] > 0).OnlyEnforceIf(is_producing[var_key])
-                    model.Add(production_qty[var_key] == 0).OnlyEnforceIf(is_producing[var_key].Not())
-
-        for item_id in item_ids:
-            item = items_data[item_id]
-            previous_month_inventory = 0 
-            current_monthly_consumption = item.get("monthlyConsumption", {m: 0 for m in MONTHS})
-            for month_idx in range(NUM_MONTHS):
-                month_name = MONTHS[month_idx]
-                consumed_this_month = current_monthly_consumption.get(month_name, 0)
-                consumed_this_month = int(consumed_this_month) if isinstance(consumed_this_month, (int, float)) else 0
-                produced_this_month_on_all_machines = sum(production_qty[(item_id, m_id, month_idx)] for m_id in machine_ids)
-                model.Add(inventory_level[(item_id, month_idx)] == previous_month_inventory + produced_this_month_on_all_machines - consumed_this_month)
-                model.Add(inventory_level[(item_id, month_idx)] >= 0) 
-                previous_month_inventory = inventory_level[(item_id, month_idx)]
-
-        for machine_id in machine_ids:
-            machine = machines_data[machine_id]
-            for month_idx in range(NUM_MONTHS):
-                total_time_on_machine_this_month = []
-                for item_id in item_ids:
-                    item = items_data[item_id]
-                    item_op_time = item.get("operationTimePerPC", 1.0); item_op_time = float(item_op_time) if isinstance(item_op_time, (int,float)) and item_op_time > 0 else 1.0
-                    total_time_on_machine_this_month.append(production_qty[(item_id, machine_id, month_idx)] * int(item_op_time * 100)) # Scaled op_time
-                machine_available_minutes_per_month = int(machine.get("dailyOperationalHours", 24) * machine.get("weeklyOperationalDays", 5) * DAYS_IN_MONTH * 60 * 100) # Scaled capacity
-                model.Add(sum(total_time_on_machine_this_month) <= machine_available_minutes_per_month)
-        
-        total_machining_cost_terms, total_stock_keeping_cost_terms = [], []
-        for item_id in item_ids:
-            item = items_data[item_id]
-            item_cost = item.get("baseCostPerItem", 2.0); item_cost = float(item_cost) if isinstance(item_cost, (int,float)) else 2.0
-            item_op_time = item.get("operationTimePerPC", 1.0); item_op_time = float(item_op_time) if isinstance(item_op_time, (int,float)) and item_op_time > 0 else 1.0
-            current_monthly_consumption = item.get("monthlyConsumption", {m: 0 for m in MONTHS})
-            max_prod_for_item = sum(current_monthly_consumption.get(m, 0) for m in MONTHS) * 2 + 1
-            for month_idx in range(NUM_MONTHS):
-                scaled_item_cost_monthly_holding = int(item_cost * STOCK_HOLDING_RATE_MONTHLY * 100) # Scale cost for multiplication
-                stock_cost_term = model.NewIntVar(0, max_prod_for_item * NUM_MONTHS * scaled_item_cost_monthly_holding , f"stock_cost_{item_id}_m{month_idx}")
-                model.AddMultiplicationEquality(stock_cost_term, [inventory_level[(item_id, month_idx)], scaled_item_cost_monthly_holding])
-                total_stock_keeping_cost_terms.append(stock_cost_term)
-                for machine_id in machine_ids:
-                    machine = machines_data[machine_id]
-                    machine_hourly_cost = machine.get("hourlyOperatingCost", 50.0); machine_hourly_cost = float(machine_hourly_cost) if isinstance(machine_hourly_cost, (int,float)) else 50.0
-                    machine_available_minutes_per_month_for_obj = machine.get("dailyOperationalHours", 24) * machine.get("weeklyOperationalDays", 5) * DAYS_IN_MONTH * 60
-                    max_prod_on_machine_for_obj = 1 
-                    if item_op_time > 0: max_prod_on_machine_for_obj = int(machine_available_minutes_per_month_for_obj / item_op_time)
-                    if max_prod_on_machine_for_obj <= 0 : max_prod_on_machine_for_obj = 1
-                    cost_per_pc_on_machine_scaled = int(item_op_time * (machine_hourly_cost / 60.0) * 10000) 
-                    machining_cost_for_prod_qty_scaled = model.NewIntVar(0, cost_per_pc_on_machine_scaled * max_prod_on_machine_for_obj , f"mach_cost_prod_qty_{item_id}_{machine_id}_m{month_idx}")
-                    model.AddMultiplicationEquality(machining_cost_for_prod_qty_scaled, [production_qty[(item_id, machine_id, month_idx)], cost_per_pc_on_machine_scaled] )
-                    total_machining_cost_terms.append(machining_cost_for_prod_qty_scaled)
-        
-        placeholder_eur_to_sek_rate = 10 
-        scaled_total_machining_cost = sum(total_machining_cost_terms) 
-        scaled_total_stock_keeping_cost_eur_units = sum(total_stock_keeping_cost_terms) 
-        scaled_total_stock_keeping_cost_sek_equivalent = scaled_total_stock_keeping_cost_eur_units * placeholder_eur_to_sek_rate * 100 # Convert EUR (scaled by 100) to SEK (scaled by 10000)
-
-        model.Minimize(scaled_total_machining_cost + scaled_total_stock_keeping_cost_sek_equivalent)
-        
-        solver = cp_model.CpSolver()
-        solver.parameters.log_search_progress = True 
-        solver.parameters.max_time_in_seconds = 120.0 
-        status = solver.Solve(model)
-
-        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
-            optimized_plan_details = []
-            total_optimized_machining_cost_sek_val = 0
-            total_optimized_stock_cost_eur_val = 0
-            for item_id_loop in item_ids: # Use different var name to avoid conflict with outer scope
-                item_loop = items_data[item_id_loop]
-                item_cost_eur = item_loop.get("baseCostPerItem", 2.0); item_cost_eur = float(item_cost_eur) if isinstance(item_cost_eur, (int,float)) else 2.0
-                item_op_time_loop = item_loop.get("operationTimePerPC", 1.0); item_op_time_loop = float(item_op_time_loop) if isinstance(item_op_time_loop, (int,float)) and item_op_time_loop > 0 else 1.0
-                for month_idx_loop in range(NUM_MONTHS):
-                    month_name_loop = MONTHS[month_idx_loop]
-                    inv_level_val = solver.Value(inventory_level[(item_id_loop, month_idx_loop)])
-                    stock_cost_this_month_eur = inv_level_val * item_cost_eur * STOCK_HOLDING_RATE_MONTHLY # Uses potentially overridden STOCK_HOLDING_RATE_MONTHLY
-                    total_optimized_stock_cost_eur_val += stock_cost_this_month_eur
-                    for machine_id_loop in machine_ids:
-                        machine_loop = machines_data[machine_id_loop]
-                        machine_hourly_cost_sek = machine_loop.get("hourlyOperatingCost", 50.0); machine_hourly_cost_sek = float(machine_hourly_cost_sek) if isinstance(machine_hourly_cost_sek, (int,float)) else 50.0
-                        qty = solver.Value(production_qty[(item_id_loop, machine_id_loop, month_idx_loop)])
-                        if qty > 0:
-                            op_time_used_minutes = qty * item_op_time_loop
-                            machining_cost_sek = (op_time_used_minutes / 60.0) * machine_hourly_cost_sek
-                            total_optimized_machining_cost_sek_val += machining_cost_sek
-                            optimized_plan_details.append({
-                                "month": month_name_loop, "machineId": machine_id_loop, "itemId": item_id_loop,
-                                "quantity": qty, "operationTimeUsedMinutes": round(op_time_used_minutes, 2),
-                                "machiningCostSEK": round(machining_cost_sek, 2)
-                            })
-            
-            total_original_machining_cost_sek_val = 0
-            total_original_stock_cost_eur_val = 0
-            for item_id_loop in item_ids:
-                 item_loop = items_data[item_id_loop] # Use potentially overridden item data
-                 item_cost_eur = item_loop.get("baseCostPerItem", 2.0); item_cost_eur = float(item_cost_eur) if isinstance(item_cost_eur, (int,float)) else 2.0
-                 current_monthly_consumption_loop = item_loop.get("monthlyConsumption", {m: 0 for m in MONTHS})
-                 total_demand_year = sum(current_monthly_consumption_loop.get(m,0) for m in MONTHS)
-                 fixed_lot_size = item_loop.get("FIXED_LOT_SIZE", total_demand_year / 4 if total_demand_year > 0 else 50) 
-                 if not isinstance(fixed_lot_size, (int,float)) or fixed_lot_size <= 0 : fixed_lot_size = 50
-                 avg_op_time = item_loop.get("operationTimePerPC", 1.0); avg_op_time = float(avg_op_time) if isinstance(avg_op_time, (int,float)) and avg_op_time > 0 else 1.0
-                 avg_machine_cost_hr_sek = 50.0 
-                 if machine_ids:
-                     first_machine_id = machine_ids[0]
-                     # Base original cost on the first machine's potentially overridden cost or default
-                     avg_machine_cost_hr_sek = machines_data[first_machine_id].get("hourlyOperatingCost",50.0)
-                     if not isinstance(avg_machine_cost_hr_sek, (int,float)): avg_machine_cost_hr_sek = 50.0
-
-                 original_machining_cost_item_sek = (total_demand_year * avg_op_time / 60.0 * avg_machine_cost_hr_sek)
-                 total_original_machining_cost_sek_val += original_machining_cost_item_sek
-                 original_stock_cost_item_eur = (fixed_lot_size / 2.0 * item_cost_eur * STOCK_HOLDING_RATE_YEARLY) # Use potentially overridden STOCK_HOLDING_RATE_YEARLY
-                 total_original_stock_cost_eur_val += original_stock_cost_item_eur
-
-            machining_savings_sek = total_original_machining_cost_sek_val - total_optimized_machining_cost_sek_val
-            stock_savings_eur = total_original_stock_cost_eur_val - total_optimized_stock_cost_eur_val
-
-            response_data = {
-                "status": "success" if status == cp_model.OPTIMAL else "feasible",
-                "message": solver.StatusName(status),
-                "totalOptimizedMachiningCostSEK": round(total_optimized_machining_cost_sek_val,2),
-                "totalOptimizedStockCostEUR": round(total_optimized_stock_cost_eur_val,2),
-                "totalOriginalMachiningCostSEK": round(total_original_machining_cost_sek_val, 2),
-                "totalOriginalStockCostEUR": round(total_original_stock_cost_eur_val, 2),
-                "machiningSavingsSEK": round(machining_savings_sek, 2),
-                "stockSavingsEUR": round(stock_savings_eur, 2),
-                "plan": optimized_plan_details,
-            }
-            
-            plan_to_save = response_data.copy()
-            plan_to_save['createdAt'] = google.cloud.firestore.SERVER_TIMESTAMP
-            if payload: # Log that this plan was generated with overrides
-                plan_to_save['overrides_applied'] = True 
-
-            try:
-                plans_ref = db.collection('production_plans')
-                plans_ref.add(plan_to_save)
-                print("Production plan successfully saved to Firestore.")
-            except Exception as e_save:
-                print(f"Error saving production plan to Firestore: {e_save}")
-
-            return https_fn.Response(
-                json.dumps(response_data, indent=2), 
-                status=200, headers={**cors_headers, "Content-Type": "application/json"})
-        else:
-            return https_fn.Response(
-                json.dumps({"status": "error", "message": f"Optimization failed. Status: {solver.StatusName(status)}"}),
-                status=500, headers={**cors_headers, "Content-Type": "application/json"})
+        status_code, response_data = run_optimization(db, payload)
+        return https_fn.Response(
+            json.dumps(response_data, separators=(",", ":")),
+            status=status_code, headers={**cors_headers, "Content-Type": "application/json"})
 
     except Exception as e:
         tb_str = traceback.format_exc()
@@ -290,3 +421,148 @@ Traceback:
         return https_fn.Response(
             json.dumps({"status": "error", "message": str(e), "trace": tb_str}),
             status=500, headers={**cors_headers, "Content-Type": "application/json"})
+
+
+@https_fn.on_request(region="europe-west1", memory=8192, cpu=2)
+def optimizationJobs(req: https_fn.Request) -> https_fn.Response:
+    """POST submits an optimization job (same payload as optimizeProduction); GET ?jobId=... polls it."""
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+    }
+    json_headers = {**cors_headers, "Content-Type": "application/json"}
+
+    if req.method == 'OPTIONS':
+        return https_fn.Response("", headers=cors_headers, status=204)
+
+    try:
+        if req.method == 'POST':
+            payload = req.get_json(silent=True)
+            if payload is None and req.data:
+                payload = json.loads(req.data)
+            job_id = job_queue.submit(payload)
+            print(f"Submitted optimization job {job_id} with payload: {payload}")
+            return https_fn.Response(json.dumps({"status": "queued", "jobId": job_id}), status=202, headers=json_headers)
+
+        job_id = req.args.get("jobId")
+        if not job_id:
+            return https_fn.Response(json.dumps({"status": "error", "message": "Missing jobId query parameter."}), status=400, headers=json_headers)
+        job = job_store.get(job_id)
+        if job is None:
+            return https_fn.Response(json.dumps({"status": "error", "message": f"Unknown job {job_id}."}), status=404, headers=json_headers)
+        return https_fn.Response(json.dumps(job, default=str), status=200, headers=json_headers)
+
+    except Exception as e:
+        tb_str = traceback.format_exc()
+        print(f"Error in optimizationJobs: {e}\n{tb_str}")
+        return https_fn.Response(
+            json.dumps({"status": "error", "message": str(e), "trace": tb_str}),
+            status=500, headers=json_headers)
+
+
+# The solve holds the task's request, so the instance keeps its CPU until the job is done; one
+# job per instance. Cloud Tasks allows a task at most 30 minutes; a failed job is recorded, not retried.
+@tasks_fn.on_task_dispatched(region="europe-west1", memory=8192, cpu=2, concurrency=1, timeout_sec=1800,
+                             retry_config=RetryConfig(max_attempts=1),
+                             rate_limits=RateLimits(max_concurrent_dispatches=JOB_MAX_CONCURRENT_TASKS))
+def runOptimizationJob(req: tasks_fn.CallableRequest) -> None:
+    """Runs an optimization job enqueued by optimizationJobs and records it in the job store."""
+    job_id = req.data["jobId"]
+    job = job_store.get(job_id)
+    if job is None or job.get("status") != JOB_QUEUED:
+        # Cloud Tasks delivers at least once; a job that already started is not run twice
+        print(f"Skipping optimization job {job_id}: {'unknown' if job is None else job.get('status')}.")
+        return
+    run_job(job_store, run_job_payload, job_id, req.data.get("payload"))
+
+
+@https_fn.on_request(region="europe-west1", memory=8192, cpu=2)
+def optimizeScenarios(req: https_fn.Request) -> https_fn.Response:
+    """POST a list of what-if "scenarios" (overrides as for optimizeProduction); returns their costs side by side."""
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'POST, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+    }
+    json_headers = {**cors_headers, "Content-Type": "application/json"}
+
+    if req.method == 'OPTIONS':
+        return https_fn.Response("", headers=cors_headers, status=204)
+
+    try:
+        payload = req.get_json(silent=True)
+        if payload is None and req.data:
+            payload = json.loads(req.data)
+        status_code, response_data = run_scenarios(get_db(), payload)
+        return https_fn.Response(json.dumps(response_data, separators=(",", ":")), status=status_code, headers=json_headers)
+
+    except Exception as e:
+        tb_str = traceback.format_exc()
+        print(f"Error in optimizeScenarios: {e}\n{tb_str}")
+        return https_fn.Response(
+            json.dumps({"status": "error", "message": str(e), "trace": tb_str}),
+            status=500, headers=json_headers)
+
+
+@https_fn.on_request(region="europe-west1", memory=2048)
+def productionPlan(req: https_fn.Request) -> https_fn.Response:
+    """GET a page of a stored plan: ?planId= (default the latest), page, pageSize, itemIds, machineIds, periods, format, gzip."""
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+    }
+    json_headers = {**cors_headers, "Content-Type": "application/json"}
+
+    if req.method == 'OPTIONS':
+        return https_fn.Response("", headers=cors_headers, status=204)
+
+    try:
+        db = get_db()
+        plan_id = req.args.get("planId")
+        if plan_id:
+            snapshot = db.collection('production_plans').document(plan_id).get()
+            header = snapshot.to_dict() if snapshot.exists else None
+        else:
+            plan_id, header = load_latest_header(db)
+        if header is None:
+            return https_fn.Response(json.dumps({"status": "error", "message": f"Plan {plan_id or '(latest)'} not found."}),
+                                     status=404, headers=json_headers)
+        view = parse_plan_view({"format": req.args.get("format"), "page": req.args.get("page", 0),
+                                "page_size": req.args.get("pageSize", 1000), "item_ids": req.args.get("itemIds"),
+                                "machine_ids": req.args.get("machineIds"), "periods": req.args.get("periods"),
+                                "gzip": req.args.get("gzip")})
+        plan, page_info = stored_plan_view(db, plan_id, header, view)
+        summary = {key: value for key, value in header.items() if key not in ("plan", "createdAt")}
+        return https_fn.Response(json.dumps({**summary, "planId": plan_id, "plan": plan, "planPage": page_info},
+                                            separators=(",", ":"), default=str),
+                                 status=200, headers=json_headers)
+
+    except Exception as e:
+        tb_str = traceback.format_exc()
+        print(f"Error in productionPlan: {e}\n{tb_str}")
+        return https_fn.Response(
+            json.dumps({"status": "error", "message": str(e), "trace": tb_str}),
+            status=500, headers=json_headers)
+
+
+@https_fn.on_request(region="europe-west1", memory=256)
+def health(req: https_fn.Request) -> https_fn.Response:
+    """GET the state of this instance; answers without creating a Firestore client or importing the solver."""
+    import sys
+    cors_headers = {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization'
+    }
+    if req.method == 'OPTIONS':
+        return https_fn.Response("", headers=cors_headers, status=204)
+    instance = {
+        "uptimeSeconds": round(time.time() - INSTANCE_STARTED, 3),
+        "solverLoaded": "ortools" in sys.modules,
+        "firestoreClient": _db is not None,
+        "datasetCached": _dataset_cache is not None and _dataset_cache.hits + _dataset_cache.misses > 0,
+    }
+    return https_fn.Response(json.dumps({"status": "ok", "instance": instance}), status=200,
+                             headers={**cors_headers, "Content-Type": "application/json"})
@@ -0,0 +1,70 @@
+# overrides.py
+# Applies the what-if overrides of a request payload (global_overrides, item_overrides
+# and machine_overrides) to the source columns before they are normalized. Shared by
+# optimizeProduction and the scenario batches of scenarios.py.
+import numpy as np
+
+from planning_data import MONTHS
+
+STOCK_HOLDING_RATE_YEARLY_DEFAULT = 0.10
+ITEM_OVERRIDE_KEYS = ("operationTimePerPC", "baseCostPerItem", "FIXED_LOT_SIZE", "monthlyConsumption")
+MACHINE_OVERRIDE_KEYS = ("dailyOperationalHours", "weeklyOperationalDays", "hourlyOperatingCost")
+
+
+def writable_columns(columns):
+    """Copies of the numeric columns overrides may write into (cached columns are read-only)."""
+    return {name: np.array(array) if array.dtype.kind in "fi" else array for name, array in columns.items()}
+
+
+def apply_overrides(columns, payload, stock_holding_rate_yearly=STOCK_HOLDING_RATE_YEARLY_DEFAULT):
+    """Writes the payload's overrides into ``columns`` (see writable_columns) in place.
+
+    Returns (stock_holding_rate_yearly, overridden): the holding rate from
+    global_overrides, else the one passed in, and whether any column changed.
+    Invalid overrides are logged and skipped.
+    """
+    overridden = False
+    if not payload or not isinstance(payload, dict):
+        return stock_holding_rate_yearly, overridden
+
+    default_rate = stock_holding_rate_yearly
+    global_overrides = payload.get("global_overrides", {})
+    if isinstance(global_overrides, dict):
+        stock_holding_rate_yearly = global_overrides.get("STOCK_HOLDING_RATE_YEARLY", default_rate)
+        if not isinstance(stock_holding_rate_yearly, (int, float)) or not (0 <= stock_holding_rate_yearly <= 1):
+            print(f"Warning: Invalid STOCK_HOLDING_RATE_YEARLY in payload: {stock_holding_rate_yearly}. Using default.")
+            stock_holding_rate_yearly = default_rate
+
+    item_overrides_payload = payload.get("item_overrides", {})
+    if isinstance(item_overrides_payload, dict):
+        item_index = {item_id: i for i, item_id in enumerate(columns["item_ids"].tolist())}
+        for item_id, overrides in item_overrides_payload.items():
+            if item_id in item_index and isinstance(overrides, dict):
+                print(f"Applying overrides for item: {item_id}")
+                i = item_index[item_id]
+                for key, value in overrides.items():
+                    if key in ITEM_OVERRIDE_KEYS[:3] and isinstance(value, (int, float)) and value >= 0:
+                        columns[key][i] = float(value)
+                        overridden = True
+                    elif key == "monthlyConsumption" and isinstance(value, dict):
+                        columns[key][i] = [int(value[m]) if isinstance(value.get(m), (int, float)) and value[m] >= 0 else 0 for m in MONTHS]
+                        overridden = True
+                    else:
+                        print(f"Warning: Invalid or unsupported override key/value for item {item_id}: {key}={value}")
+
+    machine_overrides_payload = payload.get("machine_overrides", {})
+    if isinstance(machine_overrides_payload, dict):
+        machine_index = {machine_id: m for m, machine_id in enumerate(columns["machine_ids"].tolist())}
+        for machine_id, overrides in machine_overrides_payload.items():
+            if machine_id in machine_index and isinstance(overrides, dict):
+                print(f"Applying overrides for machine: {machine_id}")
+                for key, value in overrides.items():
+                    if key in MACHINE_OVERRIDE_KEYS and isinstance(value, (int, float)) and value >= 0:
+                        if key == "weeklyOperationalDays" and not (1 <= value <= 7):
+                            print(f"Warning: Invalid weeklyOperationalDays for machine {machine_id}: {value}. Skipping override.")
+                            continue
+                        columns[key][machine_index[machine_id]] = float(value)
+                        overridden = True
+                    else:
+                        print(f"Warning: Invalid or unsupported override key/value for machine {machine_id}: {key}={value}")
+    return stock_holding_rate_yearly, overridden
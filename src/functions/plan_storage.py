@@ -0,0 +1,215 @@
+# plan_storage.py
+# Compact encoding, paginated storage and sliced views of production plans. A plan
+# (the entry list of planning_model.extract_plan) is encoded column-wise: item, machine
+# and period ids are dictionary-encoded into index arrays next to the quantity and cost
+# columns. A stored plan is a header document in production_plans (the response
+# summary, without the plan) plus production_plans/{planId}/pages/{n} documents, each
+# holding PLAN_PAGE_ENTRIES entries as gzip-compressed columnar JSON. Compressed bytes
+# keep every page well under Firestore's 1 MiB document size, and unlike arrays they
+# are not indexed per element. Responses carry one page of the plan (optionally
+# filtered, columnar or gzip-compressed) as described by a plan view.
+import base64
+import gzip
+import json
+
+PLAN_STORAGE_FORMAT = "columnar-gzip-pages-v1"
+PLAN_PAGES_COLLECTION = "pages"
+PLAN_PAGE_ENTRIES = 10000
+# Pages are at most ~1 MiB, so this many fit in one commit (10 MiB request limit)
+PAGES_PER_BATCH = 8
+PLAN_FORMATS = ("rows", "columnar")
+DEFAULT_PLAN_VIEW = {"format": "rows", "page": 0, "page_size": 1000, "item_ids": None, "machine_ids": None,
+                     "periods": None, "gzip": False}
+MAX_PLAN_PAGE_SIZE = 50000
+VALUE_COLUMNS = ("quantity", "operationTimeUsedMinutes", "machiningCostSEK")
+
+
+def encode_plan(entries):
+    """Columnar form of plan ``entries``: id dictionaries plus one index or value array per field."""
+    item_index, machine_index, period_index = {}, {}, {}
+    periods = []
+    columns = {"item": [], "machine": [], "period": [], **{key: [] for key in VALUE_COLUMNS}}
+    for entry in entries:
+        columns["item"].append(item_index.setdefault(entry["itemId"], len(item_index)))
+        columns["machine"].append(machine_index.setdefault(entry["machineId"], len(machine_index)))
+        period = (entry.get("period"), entry["month"])
+        if period not in period_index:
+            period_index[period] = len(periods)
+            periods.append({"month": period[1], **({"period": period[0]} if period[0] is not None else {})})
+        columns["period"].append(period_index[period])
+        for key in VALUE_COLUMNS:
+            columns[key].append(entry[key])
+    return {"entries": len(columns["item"]), "itemIds": list(item_index), "machineIds": list(machine_index),
+            "periods": periods, **columns}
+
+
+def decode_plan(columns):
+    """Plan entries (as extract_plan returns them) from encode_plan's columnar form."""
+    item_ids, machine_ids, periods = columns["itemIds"], columns["machineIds"], columns["periods"]
+    entries = []
+    for k in range(columns["entries"]):
+        period = periods[columns["period"][k]]
+        entry = {"month": period["month"], "machineId": machine_ids[columns["machine"][k]], "itemId": item_ids[columns["item"][k]],
+                 **{key: columns[key][k] for key in VALUE_COLUMNS}}
+        if "period" in period:
+            entry["period"] = period["period"]
+        entries.append(entry)
+    return entries
+
+
+def compress(value):
+    return gzip.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def decompress(data):
+    return json.loads(gzip.decompress(data).decode("utf-8"))
+
+
+def save_plan(db, header, entries, page_entries=PLAN_PAGE_ENTRIES):
+    """Stores ``entries`` as pages under a new production_plans document, then ``header``; returns the plan id.
+
+    The header is written last, so a reader that finds it (warm start orders by
+    createdAt) always finds all of its pages.
+    """
+    plan_ref = db.collection('production_plans').document()
+    pages_ref = plan_ref.collection(PLAN_PAGES_COLLECTION)
+    starts = list(range(0, len(entries), page_entries))
+    for first in range(0, len(starts), PAGES_PER_BATCH):
+        batch = db.batch()
+        for n in range(first, min(first + PAGES_PER_BATCH, len(starts))):
+            page = entries[starts[n]:starts[n] + page_entries]
+            batch.set(pages_ref.document(f"{n:05d}"), {"index": n, "entries": len(page), "data": compress(encode_plan(page))})
+        batch.commit()
+    plan_ref.set({**header, "planStorage": {"format": PLAN_STORAGE_FORMAT, "entries": len(entries), "pages": len(starts),
+                                            "pageEntries": page_entries}})
+    return plan_ref.id
+
+
+def load_plan_entries(db, plan_id, header, start=0, stop=None):
+    """Entries ``start:stop`` of a stored plan, reading only the pages that hold them.
+
+    Plans stored before pagination keep their entries in the header's "plan" list.
+    """
+    if "planStorage" not in header:
+        return list(header.get("plan") or [])[start:stop]
+    storage = header["planStorage"]
+    stop = storage["entries"] if stop is None else min(stop, storage["entries"])
+    if stop <= start:
+        return []
+    page_entries = storage["pageEntries"]
+    pages_ref = db.collection('production_plans').document(plan_id).collection(PLAN_PAGES_COLLECTION)
+    entries = []
+    first_page = start // page_entries
+    for n in range(first_page, (stop - 1) // page_entries + 1):
+        snapshot = pages_ref.document(f"{n:05d}").get()
+        if not snapshot.exists:
+            raise LookupError(f"Page {n} of plan {plan_id} is missing.")
+        entries.extend(decode_plan(decompress(snapshot.to_dict()["data"])))
+    offset = start - first_page * page_entries
+    return entries[offset:offset + stop - start]
+
+
+def load_latest_header(db, compatible=None, candidates=1):
+    """Returns (plan_id, header) of the newest document in production_plans, or (None, None).
+
+    With ``compatible``, the newest of the ``candidates`` newest headers it accepts.
+    """
+    import google.cloud.firestore
+    query = (db.collection('production_plans')
+             .order_by('createdAt', direction=google.cloud.firestore.Query.DESCENDING)
+             .limit(candidates))
+    for doc in query.stream():
+        header = doc.to_dict()
+        if compatible is None or compatible(header):
+            return doc.id, header
+    return None, None
+
+
+def load_latest_plan(db, compatible=None, candidates=1):
+    """Returns (plan_id, plan_doc) of the newest stored plan with its entries in plan_doc["plan"], or (None, None).
+
+    ``compatible`` and ``candidates`` are those of load_latest_header; only the accepted plan's pages are read.
+    """
+    plan_id, header = load_latest_header(db, compatible, candidates)
+    if header is None:
+        return None, None
+    return plan_id, {**header, "plan": load_plan_entries(db, plan_id, header)}
+
+
+def _id_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = [part for part in value.split(",") if part]
+    return {str(part) for part in value} if isinstance(value, (list, tuple, set)) else None
+
+
+def parse_plan_view(options):
+    """The plan view of a payload's "plan_view" dict (or productionPlan query args); invalid values use the defaults.
+
+    Keys: format ("rows" or "columnar"), page and page_size, the item_ids, machine_ids
+    and periods filters (lists or comma-separated strings) and gzip.
+    """
+    view = dict(DEFAULT_PLAN_VIEW)
+    if not isinstance(options, dict):
+        return view
+    if options.get("format") in PLAN_FORMATS:
+        view["format"] = options["format"]
+    for key, low, high in (("page", 0, None), ("page_size", 1, MAX_PLAN_PAGE_SIZE)):
+        try:
+            value = int(options.get(key, view[key]))
+        except (TypeError, ValueError):
+            print(f"Warning: Invalid plan_view {key}: {options.get(key)}. Using default.")
+            continue
+        view[key] = max(low, value) if high is None else min(max(low, value), high)
+    for key in ("item_ids", "machine_ids", "periods"):
+        view[key] = _id_list(options.get(key))
+    gzip_option = options.get("gzip", False)
+    view["gzip"] = gzip_option is True or str(gzip_option).lower() in ("1", "true")
+    return view
+
+
+def _filtered(view):
+    return any(view[key] is not None for key in ("item_ids", "machine_ids", "periods"))
+
+
+def _matches(entry, view):
+    return ((view["item_ids"] is None or entry["itemId"] in view["item_ids"])
+            and (view["machine_ids"] is None or entry["machineId"] in view["machine_ids"])
+            and (view["periods"] is None or entry.get("period", entry["month"]) in view["periods"]))
+
+
+def render_plan(page, total_entries, view, plan_id=None):
+    """(plan, planPage) for a response: the ``page`` of a plan of ``total_entries`` encoded as the view asks."""
+    plan = encode_plan(page) if view["format"] == "columnar" else page
+    if view["gzip"]:
+        plan = {"encoding": "gzip+base64", "format": view["format"], "data": base64.b64encode(compress(plan)).decode("ascii")}
+    page_info = {
+        "planId": plan_id,
+        "format": view["format"],
+        "gzip": view["gzip"],
+        "page": view["page"],
+        "pageSize": view["page_size"],
+        "pages": -(-total_entries // view["page_size"]),
+        "entries": len(page),
+        "totalEntries": total_entries,
+        "filters": {key: sorted(view[key]) for key in ("item_ids", "machine_ids", "periods") if view[key] is not None},
+    }
+    return plan, page_info
+
+
+def plan_view(entries, view, plan_id=None):
+    """render_plan over an in-memory plan, applying the view's filters first."""
+    if _filtered(view):
+        entries = [entry for entry in entries if _matches(entry, view)]
+    start = view["page"] * view["page_size"]
+    return render_plan(entries[start:start + view["page_size"]], len(entries), view, plan_id)
+
+
+def stored_plan_view(db, plan_id, header, view):
+    """render_plan over a stored plan; without filters only the pages holding the requested slice are read."""
+    if _filtered(view):
+        return plan_view(load_plan_entries(db, plan_id, header), view, plan_id)
+    total = header["planStorage"]["entries"] if "planStorage" in header else len(header.get("plan") or [])
+    start = view["page"] * view["page_size"]
+    return render_plan(load_plan_entries(db, plan_id, header, start, start + view["page_size"]), total, view, plan_id)
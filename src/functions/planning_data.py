@@ -0,0 +1,159 @@
+# planning_data.py
+# Normalizes the Firestore item/machine documents into flat NumPy arrays once per
+# request, so the model builder, result extraction and reporting never have to
+# re-coerce document fields cell by cell. Documents are first flattened into
+# "source columns" (one array per document field, also the dataset snapshot format)
+# and the defaults are then applied column-wise.
+import hashlib
+
+import numpy as np
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+NUM_MONTHS = len(MONTHS)
+DAYS_IN_MONTH = 20
+
+# Integer scaling used by the CP-SAT formulation
+TIME_SCALE = 100  # Operation times and capacities in 1/100 minute
+COST_SCALE = 10000  # Machining cost in 1/10000 SEK
+STOCK_COST_SCALE = 100  # Stock holding cost in 1/100 EUR
+PLACEHOLDER_EUR_TO_SEK_RATE = 10
+
+DEFAULT_OP_TIME = 1.0
+DEFAULT_BASE_COST = 2.0
+DEFAULT_FIXED_LOT_SIZE = 50
+DEFAULT_DAILY_HOURS = 24
+DEFAULT_WEEKLY_DAYS = 5
+DEFAULT_HOURLY_COST = 50.0
+# Changeover times from the PRD, used when a machine document has none
+DEFAULT_TOOL_CHANGE_MINUTES = 5.0
+DEFAULT_MATERIAL_CHANGE_MINUTES = 20.0
+BASE_COST_RANGE = (1.5, 3.0)
+
+# Arrays produced by normalize_columns / normalize_inputs, by the axis they are indexed on
+ITEM_FIELDS = ("item_ids", "op_time", "base_cost", "fixed_lot_size", "min_lot_size", "demand", "current_machine", "raw_material")
+MACHINE_FIELDS = ("machine_ids", "machine_type", "hourly_cost", "capacity_minutes", "tool_change_minutes", "material_change_minutes")
+# Optional per-item starting stock, and the planning periods when they are not the twelve months (see horizon.py)
+OPTIONAL_ITEM_FIELDS = ("initial_inventory",)
+PERIOD_FIELDS = ("period_months", "period_labels", "period_month_names")
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _number_or(value, default):
+    return float(value) if _is_number(value) else default
+
+
+def _positive_or(value, default):
+    return float(value) if _is_number(value) and value > 0 else default
+
+
+def deterministic_base_cost(item_id):
+    """Placeholder unit cost in BASE_COST_RANGE derived from the item id, stable across runs and processes."""
+    fraction = int.from_bytes(hashlib.sha256(str(item_id).encode()).digest()[:8], "big") / 2 ** 64
+    low, high = BASE_COST_RANGE
+    return round(low + fraction * (high - low), 2)
+
+
+def _document_number(value):
+    return float(value) if _is_number(value) else np.nan
+
+
+def documents_to_columns(item_docs, machine_docs):
+    """Flattens (doc_id, document) pairs into the columnar source form of the planning data.
+
+    Columns are named after the document fields they hold (ids in ``item_ids`` and
+    ``machine_ids``); numeric fields that are missing or not numbers are NaN, except
+    a non-numeric FIXED_LOT_SIZE, which is 0 (present but invalid). ``monthlyConsumption``
+    is an (items x months) integer matrix. Defaults are applied by normalize_columns.
+    """
+    item_ids, op_time, base_cost, lot_size, demand, current_machine, raw_material = [], [], [], [], [], [], []
+    for item_id, item in item_docs:
+        item_ids.append(str(item_id))
+        op_time.append(_document_number(item.get("operationTimePerPC")))
+        base_cost.append(_document_number(item.get("baseCostPerItem")))
+        lot_size.append(_number_or(item["FIXED_LOT_SIZE"], 0.0) if "FIXED_LOT_SIZE" in item else np.nan)
+        consumption = item.get("monthlyConsumption") or {}
+        demand.append([int(c) if _is_number(c) else 0 for c in (consumption.get(m, 0) for m in MONTHS)])
+        current_machine.append(str(item.get("currentMachineId", "") or "").strip())
+        raw_material.append(str(item.get("rawMaterialId", "") or "").strip())
+
+    machine_ids, machine_type, daily_hours, weekly_days, hourly_cost, tool_change, material_change = [], [], [], [], [], [], []
+    for machine_id, machine in machine_docs:
+        machine_ids.append(str(machine_id))
+        machine_type.append(str(machine.get("machineType", "") or "").strip())
+        daily_hours.append(_document_number(machine.get("dailyOperationalHours")))
+        weekly_days.append(_document_number(machine.get("weeklyOperationalDays")))
+        hourly_cost.append(_document_number(machine.get("hourlyOperatingCost")))
+        tool_change.append(_document_number(machine.get("toolChangeTimeMinutes")))
+        material_change.append(_document_number(machine.get("rawMaterialChangeTimeMinutes")))
+
+    return {
+        "item_ids": np.array(item_ids, dtype=str),
+        "operationTimePerPC": np.array(op_time, dtype=np.float64),
+        "baseCostPerItem": np.array(base_cost, dtype=np.float64),
+        "FIXED_LOT_SIZE": np.array(lot_size, dtype=np.float64),
+        "monthlyConsumption": np.array(demand, dtype=np.int64).reshape(len(item_ids), NUM_MONTHS),
+        "currentMachineId": np.array(current_machine, dtype=str),
+        "rawMaterialId": np.array(raw_material, dtype=str),
+        "machine_ids": np.array(machine_ids, dtype=str),
+        "machineType": np.array(machine_type, dtype=str),
+        "dailyOperationalHours": np.array(daily_hours, dtype=np.float64),
+        "weeklyOperationalDays": np.array(weekly_days, dtype=np.float64),
+        "hourlyOperatingCost": np.array(hourly_cost, dtype=np.float64),
+        "toolChangeTimeMinutes": np.array(tool_change, dtype=np.float64),
+        "rawMaterialChangeTimeMinutes": np.array(material_change, dtype=np.float64),
+    }
+
+
+def normalize_columns(columns):
+    """Applies the defaults to source columns (see documents_to_columns) and derives the model arrays.
+
+    Item arrays are indexed by position in ``item_ids``, machine arrays by position
+    in ``machine_ids``; ``demand`` is an (items x months) integer matrix.
+    """
+    op_time = columns["operationTimePerPC"]
+    base_cost = columns["baseCostPerItem"]
+    demand = np.asarray(columns["monthlyConsumption"], dtype=np.int64)
+    # Lot size used for the "original" stock cost: a quarter of the yearly demand when missing
+    yearly_demand = demand.sum(axis=1)
+    lot = np.where(np.isnan(columns["FIXED_LOT_SIZE"]),
+                   np.where(yearly_demand > 0, yearly_demand / 4, DEFAULT_FIXED_LOT_SIZE),
+                   columns["FIXED_LOT_SIZE"])
+    # Minimum lot size for the setup formulation: only lot sizes actually set on the item
+    min_lot = np.ceil(np.where(columns["FIXED_LOT_SIZE"] > 0, columns["FIXED_LOT_SIZE"], 0)).astype(np.int64)
+    tool_change = columns["toolChangeTimeMinutes"]
+    material_change = columns["rawMaterialChangeTimeMinutes"]
+    daily_hours = np.where(np.isnan(columns["dailyOperationalHours"]), DEFAULT_DAILY_HOURS, columns["dailyOperationalHours"])
+    weekly_days = np.where(np.isnan(columns["weeklyOperationalDays"]), DEFAULT_WEEKLY_DAYS, columns["weeklyOperationalDays"])
+
+    return {
+        "item_ids": columns["item_ids"],
+        "machine_ids": columns["machine_ids"],
+        "op_time": np.where(op_time > 0, op_time, DEFAULT_OP_TIME),
+        "base_cost": np.where(np.isnan(base_cost), DEFAULT_BASE_COST, base_cost),
+        "fixed_lot_size": np.where(lot > 0, lot, DEFAULT_FIXED_LOT_SIZE).astype(np.float64),
+        "min_lot_size": min_lot,
+        "demand": demand,
+        "current_machine": columns["currentMachineId"],
+        "raw_material": columns["rawMaterialId"],
+        "machine_type": columns["machineType"],
+        "hourly_cost": np.where(np.isnan(columns["hourlyOperatingCost"]), DEFAULT_HOURLY_COST, columns["hourlyOperatingCost"]),
+        "capacity_minutes": daily_hours * weekly_days * DAYS_IN_MONTH * 60,
+        "tool_change_minutes": np.where(tool_change >= 0, tool_change, DEFAULT_TOOL_CHANGE_MINUTES),
+        "material_change_minutes": np.where(material_change >= 0, material_change, DEFAULT_MATERIAL_CHANGE_MINUTES),
+    }
+
+
+def normalize_inputs(items_data, machines_data):
+    """Converts item and machine documents (keyed by document id) into the model arrays."""
+    return normalize_columns(documents_to_columns(items_data.items(), machines_data.items()))
+
+
+def subset_data(data, item_idx, machine_idx):
+    """Normalized data restricted to the given item and machine positions (in that order)."""
+    subset = {key: data[key][item_idx] for key in ITEM_FIELDS + OPTIONAL_ITEM_FIELDS if key in data}
+    subset.update({key: data[key][machine_idx] for key in MACHINE_FIELDS})
+    subset.update({key: data[key] for key in PERIOD_FIELDS if key in data})
+    return subset
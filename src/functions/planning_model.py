@@ -0,0 +1,593 @@
+# planning_model.py
+# Builds the CP-SAT lot-sizing / machine-assignment model from the normalized
+# arrays produced by planning_data.normalize_inputs and extracts the plan from a
+# solved model. Kept free of any Firebase dependency so it can be benchmarked locally.
+# The model has one column per planning period: the twelve months by default, or the
+# buckets of a horizon.py grid (``period_months`` etc. in the data).
+import time
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from planning_data import (
+    MONTHS, NUM_MONTHS, TIME_SCALE, COST_SCALE, STOCK_COST_SCALE, PLACEHOLDER_EUR_TO_SEK_RATE,
+)
+from eligibility import current_machine_index
+
+
+def period_months(data):
+    """Length of each planning period in months (all 1.0 for the monthly grid)."""
+    if "period_months" in data:
+        return np.asarray(data["period_months"], dtype=np.float64)
+    return np.ones(data["demand"].shape[1], dtype=np.float64)
+
+
+def period_labels(data):
+    """(label, month) of each planning period; the label is None for the monthly grid."""
+    if "period_labels" in data:
+        return list(zip(data["period_labels"], data["period_month_names"]))
+    return [(None, month) for month in MONTHS[:data["demand"].shape[1]]]
+
+OBJECTIVE_MODES = ("linear", "multiplication")
+DEFAULT_OBJECTIVE_MODE = "linear"
+FORMULATIONS = ("basic", "setup")
+DEFAULT_FORMULATION = "basic"
+
+
+def all_pairs(data):
+    """Returns (pair_item, pair_machine) index arrays covering every item x machine pair, item-major."""
+    num_items, num_machines = len(data["item_ids"]), len(data["machine_ids"])
+    pair_item = np.repeat(np.arange(num_items), num_machines)
+    pair_machine = np.tile(np.arange(num_machines), num_items)
+    return pair_item, pair_machine
+
+
+def _group_pairs(keys, size):
+    # Positions of the pairs belonging to each key (item or machine), in pair order
+    order = np.argsort(keys, kind="stable")
+    bounds = np.searchsorted(keys[order], np.arange(size + 1))
+    return [order[bounds[k]:bounds[k + 1]].tolist() for k in range(size)]
+
+
+def _material_groups(machine_pairs, pair_item, raw_material):
+    # Pairs of one machine grouped by raw material; items without one form their own group
+    groups = {}
+    for p in machine_pairs:
+        i = pair_item[p]
+        groups.setdefault(raw_material[i] or f"item:{i}", []).append(p)
+    return list(groups.values())
+
+
+def cost_tables(data, stock_holding_rate_yearly):
+    """Per-piece costs, capacities and bounds derived once from the normalized data.
+
+    Shared by the model builders (through model_coefficients), plan extraction and
+    the cost summary, so no stage re-derives them: "cost_per_piece" (items x machines,
+    SEK), "minutes_per_piece" (items), "capacity_minutes" and "scaled_capacity"
+    (machines x periods, minutes and 1/TIME_SCALE minutes), "holding_per_unit"
+    (items x periods, EUR) and the per-item bounds "max_prod" and "inventory_upper".
+    """
+    num_items = len(data["item_ids"])
+    op_time, demand = data["op_time"], data["demand"]
+    lengths = period_months(data)
+    # Capacity and holding cost scale with the period length (capacity_minutes is per month)
+    capacity_minutes = data["capacity_minutes"][:, None] * lengths[None, :]
+    initial_inventory = np.asarray(data.get("initial_inventory", np.zeros(num_items, dtype=np.int64)), dtype=np.int64)
+    max_prod = demand.sum(axis=1) * 2 + 1
+    return {
+        "cost_per_piece": op_time[:, None] * (data["hourly_cost"] / 60.0)[None, :],
+        "minutes_per_piece": op_time,
+        "capacity_minutes": capacity_minutes,
+        "scaled_capacity": (capacity_minutes * TIME_SCALE).astype(np.int64),
+        "holding_per_unit": data["base_cost"][:, None] * (stock_holding_rate_yearly / NUM_MONTHS * lengths)[None, :],
+        "max_prod": max_prod,
+        "inventory_upper": max_prod * demand.shape[1] + initial_inventory,
+        "initial_inventory": initial_inventory,
+    }
+
+
+def model_coefficients(data, stock_holding_rate_yearly, pairs=None, formulation=DEFAULT_FORMULATION):
+    """Bounds and integer (scaled) coefficients of the planning model, shared by every solver backend.
+
+    Item arrays are indexed by item, pair arrays by pair (see all_pairs) and the
+    per-period rows by period; costs are in objective units (1/COST_SCALE SEK).
+    "tables" holds the cost_tables they are scaled from.
+    """
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Unknown formulation '{formulation}'. Expected one of {FORMULATIONS}.")
+    num_items, num_machines = len(data["item_ids"]), len(data["machine_ids"])
+    pair_item, pair_machine = pairs if pairs is not None else all_pairs(data)
+    tables = cost_tables(data, stock_holding_rate_yearly)
+
+    op_time = data["op_time"]
+    demand = data["demand"]
+    capacity_minutes = tables["capacity_minutes"]
+
+    # Per-pair quantities, computed once for all periods
+    scaled_op_time = (op_time * TIME_SCALE).astype(np.int64)
+    scaled_capacity = tables["scaled_capacity"]
+    coefficients = {"scaled_tool_change": None, "scaled_material_change": None, "pair_min_lot": None}
+    if formulation == "setup":
+        # Tight big-M: what fits into a period after the pair's own tool change
+        scaled_tool_change = (data["tool_change_minutes"] * TIME_SCALE).astype(np.int64)
+        scaled_material_change = (data["material_change_minutes"] * TIME_SCALE).astype(np.int64)
+        room = np.maximum(scaled_capacity[pair_machine] - scaled_tool_change[pair_machine][:, None], 0)
+        pair_max_prod = room // np.maximum(scaled_op_time[pair_item], 1)[:, None]
+        coefficients.update({
+            "scaled_tool_change": scaled_tool_change,
+            "scaled_material_change": scaled_material_change,
+            "pair_min_lot": np.maximum(np.minimum(data["min_lot_size"][pair_item][:, None], pair_max_prod), 1).tolist(),
+        })
+    else:
+        pair_max_prod = np.maximum((capacity_minutes[pair_machine] / op_time[pair_item][:, None]).astype(np.int64), 1)
+    scaled_holding_cost = (tables["holding_per_unit"] * STOCK_COST_SCALE).astype(np.int64)
+    inventory_upper = tables["inventory_upper"]
+    if formulation == "setup":
+        # A single minimum lot may exceed the stock a slow mover ever needs; it has to fit into the inventory
+        inventory_upper = np.maximum(inventory_upper, tables["initial_inventory"] + data["min_lot_size"] + demand.sum(axis=1))
+
+    coefficients.update({
+        "tables": tables,
+        "formulation": formulation,
+        "num_periods": demand.shape[1],
+        "pair_item": pair_item,
+        "pair_machine": pair_machine,
+        "pairs_of_item": _group_pairs(pair_item, num_items),
+        "pairs_of_machine": _group_pairs(pair_machine, num_machines),
+        "pair_max_prod": pair_max_prod,
+        "scaled_op_time": scaled_op_time,
+        "scaled_capacity": scaled_capacity.tolist(),
+        "pair_cost": (tables["cost_per_piece"][pair_item, pair_machine] * COST_SCALE).astype(np.int64).tolist(),
+        "holding": scaled_holding_cost.tolist(),
+        # Stock cost is in EUR scaled by 100; convert to SEK scaled by 10000 to match machining cost
+        "stock_to_sek": PLACEHOLDER_EUR_TO_SEK_RATE * (COST_SCALE // STOCK_COST_SCALE),
+        "inventory_upper": inventory_upper.tolist(),
+        "initial_inventory": tables["initial_inventory"].tolist(),
+    })
+    return coefficients
+
+
+def changeover_cost(scaled_minutes, hourly_cost):
+    """Objective cost of a changeover of ``scaled_minutes`` (1/TIME_SCALE minutes) on a machine."""
+    return int(scaled_minutes / TIME_SCALE / 60.0 * hourly_cost * COST_SCALE)
+
+
+def changeover_groups(coefficients, data, m):
+    """(pairs, minutes) groups of machine ``m`` charged per period in the setup formulation.
+
+    Returns a list of (group, tool_change, material_change): the group's pairs share a
+    raw material, so the material change is charged once when any of them produces.
+    """
+    tool_change = int(coefficients["scaled_tool_change"][m])
+    material_change = int(coefficients["scaled_material_change"][m])
+    groups = _material_groups(coefficients["pairs_of_machine"][m], coefficients["pair_item"].tolist(), data["raw_material"])
+    return [(group, tool_change, material_change) for group in groups]
+
+
+def build_model(data, stock_holding_rate_yearly, pairs=None, objective_mode=DEFAULT_OBJECTIVE_MODE,
+                formulation=DEFAULT_FORMULATION):
+    """Builds the production planning CpModel.
+
+    ``pairs`` restricts the (item, machine) combinations that get production
+    variables; by default every item may run on every machine. ``objective_mode``
+    is "linear" (weighted sum over quantities and inventory) or "multiplication"
+    (the original auxiliary-variable formulation, kept for comparison).
+    ``formulation`` "setup" charges a tool change for every producing pair and one
+    raw-material change per material and machine in each period against capacity
+    (and at the machine's hourly cost), and enforces the items' FIXED_LOT_SIZE as a
+    minimum lot. Returns a dict holding the model and the variable handles needed to
+    read the solution back.
+    """
+    coefficients = model_coefficients(data, stock_holding_rate_yearly, pairs, formulation)
+    model = cp_model.CpModel()
+    item_ids, machine_ids = data["item_ids"], data["machine_ids"]
+    num_items, num_machines = len(item_ids), len(machine_ids)
+    pair_item, pair_machine = coefficients["pair_item"], coefficients["pair_machine"]
+    num_periods = coefficients["num_periods"]
+    demand = data["demand"]
+    setup = formulation == "setup"
+    pair_max_prod, pair_min_lot = coefficients["pair_max_prod"], coefficients["pair_min_lot"]
+    scaled_op_time, scaled_capacity = coefficients["scaled_op_time"], coefficients["scaled_capacity"]
+    inventory_upper, initial_inventory = coefficients["inventory_upper"], coefficients["initial_inventory"]
+    pairs_of_item, pairs_of_machine = coefficients["pairs_of_item"], coefficients["pairs_of_machine"]
+
+    pair_names = [f"{item_ids[i]}_{machine_ids[m]}" for i, m in zip(pair_item.tolist(), pair_machine.tolist())]
+
+    # Constraint indices by role, so scenarios.py can patch a copy of the model
+    lot_constraints, balance_constraints, capacity_constraints, changeover_terms = [], [], [], []
+    production_qty, is_producing = [], []
+    for p, (name, upper_row) in enumerate(zip(pair_names, pair_max_prod.tolist())):
+        qty_row, flag_row = [], []
+        for month_idx in range(num_periods):
+            qty = model.NewIntVar(0, upper_row[month_idx], f"prod_{name}_m{month_idx}")
+            flag = model.NewBoolVar(f"isprod_{name}_m{month_idx}")
+            if setup:
+                # Linear big-M link: a producing pair makes at least its minimum lot
+                upper_link = model.Add(qty <= upper_row[month_idx] * flag)
+                lower_link = model.Add(qty >= pair_min_lot[p][month_idx] * flag)
+                lot_constraints.append((p, month_idx, upper_link.Index(), lower_link.Index()))
+            else:
+                model.Add(qty > 0).OnlyEnforceIf(flag)
+                model.Add(qty == 0).OnlyEnforceIf(flag.Not())
+            qty_row.append(qty)
+            flag_row.append(flag)
+        production_qty.append(qty_row)
+        is_producing.append(flag_row)
+
+    inventory_level = []
+    demand_rows = demand.tolist()
+    for i in range(num_items):
+        inv_row = [model.NewIntVar(0, inventory_upper[i], f"inv_{item_ids[i]}_m{month_idx}") for month_idx in range(num_periods)]
+        previous_month_inventory = initial_inventory[i]
+        for month_idx in range(num_periods):
+            produced = cp_model.LinearExpr.Sum([production_qty[p][month_idx] for p in pairs_of_item[i]])
+            balance = model.Add(inv_row[month_idx] == previous_month_inventory + produced - demand_rows[i][month_idx])
+            balance_constraints.append((i, month_idx, balance.Index()))
+            previous_month_inventory = inv_row[month_idx]
+        inventory_level.append(inv_row)
+
+    pair_scaled_op_time = scaled_op_time[pair_item].tolist()
+    pair_item_list = pair_item.tolist()
+    hourly_cost = data["hourly_cost"].tolist()
+    # Changeover variables and their cost (setup formulation only), added to the objective below
+    setup_vars, setup_coeffs = [], []
+    material_loaded = []  # (variable, machine, period, pairs) of the materials shared by several items
+    for m in range(num_machines):
+        machine_pairs = pairs_of_machine[m]
+        if not machine_pairs:
+            continue
+        coeffs = [pair_scaled_op_time[p] for p in machine_pairs]
+        groups = changeover_groups(coefficients, data, m) if setup else []
+        for month_idx in range(num_periods):
+            load_vars = [production_qty[p][month_idx] for p in machine_pairs]
+            load_coeffs = list(coeffs)
+            if setup:
+                for group, tool_change, material_change in groups:
+                    if len(group) == 1:
+                        # A single item per material: its tool change and material change come together
+                        changeovers = [(is_producing[group[0]][month_idx], tool_change + material_change)]
+                    else:
+                        loaded = model.NewBoolVar(f"material_{machine_ids[m]}_{pair_item_list[group[0]]}_m{month_idx}")
+                        for p in group:
+                            model.AddImplication(is_producing[p][month_idx], loaded)
+                        material_loaded.append((loaded, m, month_idx, group))
+                        changeovers = [(is_producing[p][month_idx], tool_change) for p in group] + [(loaded, material_change)]
+                    for var, minutes in changeovers:
+                        load_vars.append(var)
+                        load_coeffs.append(minutes)
+                        setup_vars.append(var)
+                        setup_coeffs.append(changeover_cost(minutes, hourly_cost[m]))
+                        changeover_terms.append((var.Index(), m, minutes))
+            load = cp_model.LinearExpr.WeightedSum(load_vars, load_coeffs)
+            capacity = model.Add(load <= scaled_capacity[m][month_idx])
+            capacity_constraints.append((m, month_idx, capacity.Index()))
+
+    stock_to_sek, holding, pair_cost = coefficients["stock_to_sek"], coefficients["holding"], coefficients["pair_cost"]
+    if objective_mode == "linear":
+        # Every cost coefficient is a constant, so the objective is a plain weighted sum
+        objective_vars, objective_coeffs = [], []
+        for i in range(num_items):
+            objective_vars.extend(inventory_level[i])
+            objective_coeffs.extend([cost * stock_to_sek for cost in holding[i]])
+        for p in range(len(production_qty)):
+            objective_vars.extend(production_qty[p])
+            objective_coeffs.extend([pair_cost[p]] * num_periods)
+        objective_vars.extend(setup_vars)
+        objective_coeffs.extend(setup_coeffs)
+        model.Minimize(cp_model.LinearExpr.WeightedSum(objective_vars, objective_coeffs))
+    elif objective_mode == "multiplication":
+        # Original formulation: one auxiliary cost variable per cell, tied to the quantity by a constant product
+        total_machining_cost_terms, total_stock_keeping_cost_terms = [], []
+        for i in range(num_items):
+            for month_idx in range(num_periods):
+                stock_cost_term = model.NewIntVar(0, inventory_upper[i] * holding[i][month_idx], f"stock_cost_{item_ids[i]}_m{month_idx}")
+                model.AddMultiplicationEquality(stock_cost_term, [inventory_level[i][month_idx], holding[i][month_idx]])
+                total_stock_keeping_cost_terms.append(stock_cost_term)
+        for p, (name, upper_row, cost) in enumerate(zip(pair_names, pair_max_prod.tolist(), pair_cost)):
+            for month_idx in range(num_periods):
+                machining_cost_term = model.NewIntVar(0, cost * upper_row[month_idx], f"mach_cost_prod_qty_{name}_m{month_idx}")
+                model.AddMultiplicationEquality(machining_cost_term, [production_qty[p][month_idx], cost])
+                total_machining_cost_terms.append(machining_cost_term)
+        model.Minimize(cp_model.LinearExpr.Sum(total_machining_cost_terms) + cp_model.LinearExpr.Sum(total_stock_keeping_cost_terms) * stock_to_sek
+                       + cp_model.LinearExpr.WeightedSum(setup_vars, setup_coeffs))
+    else:
+        raise ValueError(f"Unknown objective_mode '{objective_mode}'. Expected one of {OBJECTIVE_MODES}.")
+
+    handle = {
+        "model": model,
+        "production_qty": production_qty,
+        "is_producing": is_producing,
+        "inventory_level": inventory_level,
+        # Variable indices of the (pairs x periods) and (items x periods) grids, for reading solutions in bulk
+        "qty_index": variable_indices(production_qty),
+        "flag_index": variable_indices(is_producing),
+        "inv_index": variable_indices(inventory_level),
+        "pair_item": pair_item,
+        "pair_machine": pair_machine,
+        "pair_max_prod": pair_max_prod,
+        "pairs_of_item": pairs_of_item,
+        "stock_holding_rate_yearly": stock_holding_rate_yearly,
+        "formulation": formulation,
+        "objective_mode": objective_mode,
+        "coefficients": coefficients,
+        "lot_constraints": lot_constraints,
+        "balance_constraints": balance_constraints,
+        "capacity_constraints": capacity_constraints,
+        "changeover_terms": changeover_terms,
+    }
+    if setup:
+        # Finding a first solution with setups is slow on its own; start from a batched greedy plan
+        hint_qty = batched_lot_quantities(data, pair_item, pair_machine, pairs_of_item, pair_max_prod, pair_min_lot, pair_cost,
+                                          [[cost * stock_to_sek for cost in row] for row in holding],
+                                          scaled_capacity, coefficients["scaled_tool_change"], coefficients["scaled_material_change"])
+        hint_production(handle, data, hint_qty)
+        for loaded, m, month_idx, group in material_loaded:
+            model.AddHint(loaded, any(hint_qty[p, month_idx] > 0 for p in group))
+    return handle
+
+
+def solve_model(handle, data, max_time_in_seconds=120.0, num_workers=None, log_search_progress=True, solution_callback=None,
+                relative_gap=None):
+    """Solves a built model and returns its status, bound and (when solved) the extracted plan.
+
+    "stats" holds the model size, CP-SAT's search counters and the extraction time.
+    """
+    solver = cp_model.CpSolver()
+    solver.parameters.log_search_progress = log_search_progress
+    solver.parameters.max_time_in_seconds = max_time_in_seconds
+    if num_workers:
+        solver.parameters.num_workers = num_workers
+    if relative_gap is not None:
+        solver.parameters.relative_gap_limit = relative_gap
+    status = solver.Solve(handle["model"], solution_callback)
+
+    proto = handle["model"].Proto()
+    result = {"statusName": solver.StatusName(status), "wallTime": solver.WallTime()}
+    result["stats"] = {
+        "models": 1, "variables": len(proto.variables), "constraints": len(proto.constraints),
+        "branches": solver.NumBranches(), "conflicts": solver.NumConflicts(), "wallTime": solver.WallTime(),
+    }
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        result["objective"] = solver.ObjectiveValue()
+        result["bestBound"] = solver.BestObjectiveBound()
+        start = time.perf_counter()
+        result.update(extract_plan(solution_values(solver), handle, data))
+        result["stats"]["extractSeconds"] = time.perf_counter() - start
+    return result
+
+
+def variable_indices(rows, index=lambda var: var.Index()):
+    """(rows x periods) int64 array of the model indices of a grid of variables."""
+    return np.array([[index(var) for var in row] for row in rows], dtype=np.int64)
+
+
+def solution_values(source):
+    """Values of every model variable in a CP-SAT solution, indexed by variable index.
+
+    ``source`` is a solved CpSolver or a solution callback; reading the response once
+    replaces one Value() call per variable.
+    """
+    response = source.Response() if isinstance(source, cp_model.CpSolverSolutionCallback) else source.ResponseProto()
+    return np.array(response.solution, dtype=np.int64)
+
+
+def extract_plan(values, handle, data):
+    """Reads the solved quantities (``values`` by variable index) back into the plan entries and optimized cost totals.
+
+    Costs come from the model's cost_tables; entries are ordered by item, period and pair.
+    """
+    tables = handle["coefficients"]["tables"]
+    pair_item, pair_machine = handle["pair_item"], handle["pair_machine"]
+    qty = values[handle["qty_index"]]
+    inventory = values[handle["inv_index"]]
+
+    pair_cost = tables["cost_per_piece"][pair_item, pair_machine]
+    total_optimized_machining_cost_sek_val = float(np.sum(qty * pair_cost[:, None]))
+    total_optimized_stock_cost_eur_val = float(np.sum(inventory * tables["holding_per_unit"]))
+
+    p, t = np.nonzero(qty > 0)
+    order = np.lexsort((p, t, pair_item[p]))
+    p, t = p[order], t[order]
+    quantities = qty[p, t]
+    items, machines = pair_item[p], pair_machine[p]
+    minutes = (quantities * tables["minutes_per_piece"][items]).tolist()
+    costs = (quantities * pair_cost[p]).tolist()
+    item_ids, machine_ids = data["item_ids"][items].tolist(), data["machine_ids"][machines].tolist()
+    labels = period_labels(data)
+
+    optimized_plan_details = []
+    for item_id, machine_id, month_idx, quantity, minutes_used, cost in zip(
+            item_ids, machine_ids, t.tolist(), quantities.tolist(), minutes, costs):
+        period_label, month_name = labels[month_idx]
+        entry = {
+            "month": month_name, "machineId": machine_id, "itemId": item_id,
+            "quantity": quantity, "operationTimeUsedMinutes": round(minutes_used, 2), "machiningCostSEK": round(cost, 2),
+        }
+        if period_label is not None:
+            entry["period"] = period_label
+        optimized_plan_details.append(entry)
+
+    return {
+        "plan": optimized_plan_details,
+        "totalOptimizedMachiningCostSEK": total_optimized_machining_cost_sek_val,
+        "totalOptimizedStockCostEUR": total_optimized_stock_cost_eur_val,
+    }
+
+
+def batched_lot_quantities(data, pair_item, pair_machine, pairs_of_item, pair_max_prod, pair_min_lot, pair_cost,
+                           holding_cost, scaled_capacity, scaled_tool_change, scaled_material_change):
+    """Greedy (pairs x periods) production plan for the setup formulation.
+
+    Period by period, each item's uncovered demand (at least its minimum lot) first
+    goes to the cheapest eligible machine with room for it and its changeovers, split
+    over several machines when no single one has room. Capacity left in the period
+    then extends those lots to cover following periods, as long as holding their
+    demand costs less than one more setup (part-period balancing). Demand that fits
+    nowhere stays uncovered and the solver repairs the hint. Costs are in objective units.
+    """
+    demand = data["demand"]
+    num_items, num_periods = demand.shape
+    raw_material = data["raw_material"]
+    op_time = (data["op_time"] * TIME_SCALE).astype(np.int64).tolist()
+    hourly_cost = data["hourly_cost"].tolist()
+    remaining = [list(row) for row in scaled_capacity]
+    inventory = np.asarray(data.get("initial_inventory", np.zeros(num_items, dtype=np.int64)), dtype=np.int64).tolist()
+    pair_cost = np.asarray(pair_cost).tolist()
+    candidates = [sorted(pairs, key=lambda p: pair_cost[p]) for pairs in pairs_of_item]
+    pair_machine, upper = pair_machine.tolist(), pair_max_prod.tolist()
+    demand_rows = demand.tolist()
+    hint_qty = np.zeros((len(pair_item), num_periods), dtype=np.int64)
+    loaded = set()
+
+    def changeover(i, p, t):
+        m = pair_machine[p]
+        return int(scaled_tool_change[m]) + (0 if (m, raw_material[i] or f"item:{i}", t) in loaded else int(scaled_material_change[m]))
+
+    def room(i, p, t):
+        # Largest lot of item i that still fits on the pair's machine in period t
+        return min(upper[p][t], max(remaining[pair_machine[p]][t] - changeover(i, p, t), 0) // max(op_time[i], 1))
+
+    def place(i, p, t, lot):
+        remaining[pair_machine[p]][t] -= lot * op_time[i] + changeover(i, p, t)
+        loaded.add((pair_machine[p], raw_material[i] or f"item:{i}", t))
+        hint_qty[p, t] = lot
+        return lot
+
+    for t in range(num_periods):
+        batched = []
+        for i in range(num_items):
+            net = demand_rows[i][t] - inventory[i]
+            if net <= 0 or not candidates[i]:
+                continue
+            # Whole lot on the cheapest machine that takes it, else split over the machines with room
+            whole = next((p for p in candidates[i] if room(i, p, t) >= max(net, pair_min_lot[p][t])), None)
+            if whole is not None:
+                place(i, whole, t, max(net, pair_min_lot[whole][t]))
+                batched.append((i, whole))
+                continue
+            for p in candidates[i]:
+                lot = min(net, room(i, p, t))
+                if lot > 0 and lot >= pair_min_lot[p][t]:
+                    net -= place(i, p, t, lot)
+                if net <= 0:
+                    break
+        for i, p in batched:
+            m = pair_machine[p]
+            setup_cost = (int(scaled_tool_change[m]) + int(scaled_material_change[m])) / TIME_SCALE / 60.0 * hourly_cost[m] * COST_SCALE
+            carried, lot = 0.0, int(hint_qty[p, t])
+            for k in range(t + 1, num_periods):
+                carried += demand_rows[i][k] * sum(holding_cost[i][t:k])
+                extra = demand_rows[i][k]
+                if carried > setup_cost or lot + extra > upper[p][t] or extra * op_time[i] > remaining[m][t]:
+                    break
+                lot += extra
+                remaining[m][t] -= extra * op_time[i]
+            hint_qty[p, t] = lot
+        produced = np.zeros(num_items, dtype=np.int64)
+        np.add.at(produced, pair_item, hint_qty[:, t])
+        inventory = [level + made - demand_rows[i][t] for i, (level, made) in enumerate(zip(inventory, produced.tolist()))]
+    return hint_qty
+
+
+def hint_production(handle, data, hint_qty):
+    """Hints the quantities, producing flags and (where demand is covered) inventory of a (pairs x periods) plan.
+
+    Returns the number of hinted variables.
+    """
+    model = handle["model"]
+    hinted = 0
+    for p, (qty_row, flag_row) in enumerate(zip(handle["production_qty"], handle["is_producing"])):
+        for month_idx, qty in enumerate(hint_qty[p].tolist()):
+            model.AddHint(qty_row[month_idx], qty)
+            model.AddHint(flag_row[month_idx], qty > 0)
+            hinted += 2
+    num_items = len(data["item_ids"])
+    produced = np.zeros((num_items, hint_qty.shape[1]), dtype=np.int64)
+    np.add.at(produced, handle["pair_item"], hint_qty)
+    initial_inventory = np.asarray(data.get("initial_inventory", np.zeros(num_items, dtype=np.int64)), dtype=np.int64)
+    inventory = initial_inventory[:, None] + np.cumsum(produced - data["demand"], axis=1)
+    # Inventory follows from the quantities; only hint it where the plan still covers demand
+    for i, inv_row in enumerate(handle["inventory_level"]):
+        for month_idx, level in enumerate(inventory[i].tolist()):
+            if level >= 0:
+                model.AddHint(inv_row[month_idx], level)
+                hinted += 1
+    return hinted
+
+
+def baseline_costs(data, stock_holding_rate_yearly, tables=None):
+    """Per-item yearly cost of the current way of producing (the "original" plan).
+
+    Each item runs on its currentMachineId; items whose current machine is missing
+    or unknown are priced on their cheapest machine, so they never inflate the
+    savings. Stock is replenished in FIXED_LOT_SIZE lots whenever a period's demand
+    would run the inventory below zero, and every period's closing inventory is
+    held at the same holding cost as in the model. Returns "machine" (positions,
+    items), "machiningCostSEK" and "stockCostEUR" (items) and "fallbackItems".
+    """
+    if tables is None:
+        tables = cost_tables(data, stock_holding_rate_yearly)
+    demand = data["demand"]
+    num_items, num_periods = demand.shape
+    cost_per_piece = tables["cost_per_piece"]
+    current = current_machine_index(data)
+    known = current >= 0
+    if cost_per_piece.shape[1] > 0:
+        machine = np.where(known, current, cost_per_piece.argmin(axis=1))
+        piece_cost = cost_per_piece[np.arange(num_items), machine]
+    else:
+        machine, piece_cost = current, np.zeros(num_items)
+    # Lots beyond the year's demand carry over to the next year; only the demand is machined this year
+    machining = demand.sum(axis=1) * piece_cost
+
+    lot = data["fixed_lot_size"]
+    inventory = tables["initial_inventory"].astype(np.float64)
+    stock = np.zeros(num_items)
+    for t in range(num_periods):
+        shortfall = np.maximum(demand[:, t] - inventory, 0.0)
+        inventory = inventory + np.ceil(shortfall / lot) * lot - demand[:, t]
+        stock += inventory * tables["holding_per_unit"][:, t]
+    return {"machine": machine, "machiningCostSEK": machining, "stockCostEUR": stock, "fallbackItems": int((~known).sum())}
+
+
+def cost_summary(data, solve_result, stock_holding_rate_yearly, tables=None):
+    """Optimized and original yearly costs of a solved plan and the savings between them (unrounded).
+
+    The original costs are those of baseline_costs. ``tables`` are the data's
+    cost_tables, when the caller already has them.
+    """
+    baseline = baseline_costs(data, stock_holding_rate_yearly, tables)
+    optimized_machining = solve_result["totalOptimizedMachiningCostSEK"]
+    optimized_stock = solve_result["totalOptimizedStockCostEUR"]
+    original_machining = float(baseline["machiningCostSEK"].sum())
+    original_stock = float(baseline["stockCostEUR"].sum())
+    return {
+        "totalOptimizedMachiningCostSEK": optimized_machining,
+        "totalOptimizedStockCostEUR": optimized_stock,
+        "totalOriginalMachiningCostSEK": original_machining,
+        "totalOriginalStockCostEUR": original_stock,
+        "machiningSavingsSEK": original_machining - optimized_machining,
+        "stockSavingsEUR": original_stock - optimized_stock,
+        "originalFallbackItems": baseline["fallbackItems"],
+    }
+
+
+def setup_summary(plan_entries, data):
+    """Tool changes, raw-material changeovers and their time and cost (SEK) implied by a plan."""
+    item_position = {item_id: i for i, item_id in enumerate(data["item_ids"].tolist())}
+    machine_position = {machine_id: m for m, machine_id in enumerate(data["machine_ids"].tolist())}
+    tool_change, material_change = data["tool_change_minutes"].tolist(), data["material_change_minutes"].tolist()
+    hourly_cost, raw_material = data["hourly_cost"].tolist(), data["raw_material"].tolist()
+    setups, minutes, cost = 0, 0.0, 0.0
+    loaded = set()
+    for entry in plan_entries:
+        i, m = item_position[entry["itemId"]], machine_position[entry["machineId"]]
+        changeover = tool_change[m]
+        material = (entry["machineId"], entry.get("period", entry["month"]), raw_material[i] or f"item:{i}")
+        if material not in loaded:
+            loaded.add(material)
+            changeover += material_change[m]
+        setups += 1
+        minutes += changeover
+        cost += changeover / 60.0 * hourly_cost[m]
+    return {"setups": setups, "materialChangeovers": len(loaded), "setupMinutes": round(minutes, 2), "setupCostSEK": round(cost, 2)}
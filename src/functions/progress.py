@@ -0,0 +1,44 @@
+# progress.py
+# Solution callback that reports each improving CP-SAT solution (objective, bound,
+# wall time) and, at most every few seconds, the best plan found so far.
+import time
+
+from ortools.sat.python import cp_model
+
+from planning_model import extract_plan, solution_values
+
+PROGRESS_MIN_INTERVAL_SECONDS = 2.0
+
+
+class SolutionProgressCallback(cp_model.CpSolverSolutionCallback):
+    """Records every improving solution and forwards it to ``listener(event)``.
+
+    Extracting the full plan reads every production variable, so it is only done
+    for the first solution and then at most once per ``min_interval_seconds``.
+    """
+
+    def __init__(self, handle, data, listener=None, min_interval_seconds=PROGRESS_MIN_INTERVAL_SECONDS):
+        super().__init__()
+        self.handle = handle
+        self.data = data
+        self.listener = listener
+        self.min_interval_seconds = min_interval_seconds
+        self.solutions = []
+        self.last_improvement = None
+        self._last_published = None
+
+    def on_solution_callback(self):
+        event = {
+            "objective": self.ObjectiveValue(),
+            "bestBound": self.BestObjectiveBound(),
+            "wallTime": round(self.WallTime(), 3),
+        }
+        self.solutions.append(event)
+        self.last_improvement = time.monotonic()
+        if self.listener is None:
+            return
+        if self._last_published is not None and event["wallTime"] - self._last_published < self.min_interval_seconds:
+            return
+        self._last_published = event["wallTime"]
+        self.listener({"type": "solution", **event, "solutionCount": len(self.solutions),
+                       "bestSolution": extract_plan(solution_values(self), self.handle, self.data)})
@@ -0,0 +1,260 @@
+# scenarios.py
+# Batches of what-if scenarios in one request. Each scenario is a set of overrides
+# (global_overrides, item_overrides and machine_overrides, as optimizeProduction takes
+# them) applied on top of the same loaded data. The CP-SAT model is built once for the
+# base data; each scenario solves a copy of it in which only the bounds and coefficients
+# its overrides change are patched. Scenarios run in parallel threads, since CP-SAT
+# releases the GIL while it searches. The result is a table of costs and savings per
+# scenario, with the difference to the base.
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from planning_data import normalize_columns
+from eligibility import build_eligibility, eligible_pairs
+from planning_model import build_model, changeover_cost, cost_summary, model_coefficients, setup_summary
+from anytime import solve_anytime
+from overrides import apply_overrides, writable_columns
+from solver_backends import select_backend, solve_problem
+
+MAX_SCENARIOS = 20
+BASE_SCENARIO_NAME = "base"
+# Each scenario gets an equal share of the time budget over the parallel workers, but at least this
+MIN_SCENARIO_TIME_SECONDS = 5.0
+
+
+def parse_scenarios(options):
+    """The payload's "scenarios" list as (name, overrides) pairs; invalid entries are logged and skipped."""
+    if not isinstance(options, list):
+        return []
+    scenarios = []
+    for position, scenario in enumerate(options):
+        if not isinstance(scenario, dict):
+            print(f"Warning: Invalid scenario at position {position}: {scenario}. Skipping.")
+            continue
+        name = str(scenario.get("name") or f"scenario {position + 1}")
+        scenarios.append((name, {key: scenario[key] for key in ("global_overrides", "item_overrides", "machine_overrides") if key in scenario}))
+    if len(scenarios) > MAX_SCENARIOS:
+        print(f"Warning: {len(scenarios)} scenarios in payload; only the first {MAX_SCENARIOS} are solved.")
+    return scenarios[:MAX_SCENARIOS]
+
+
+class BaseModel:
+    """The CP-SAT model of the base data and the index maps needed to patch copies of it.
+
+    Only the "linear" objective is patched; its coefficients are plain constants.
+    """
+
+    def __init__(self, handle, data):
+        self.handle = handle
+        self.demand = data["demand"]
+        self.hourly_cost = data["hourly_cost"]
+        self.proto = handle["model"].Proto()
+        self.objective_position = {var: k for k, var in enumerate(self.proto.objective.vars)}
+        self.balance = {(i, t): index for i, t, index in handle["balance_constraints"]}
+        self.capacity = {(m, t): index for m, t, index in handle["capacity_constraints"]}
+        self.lots = {(p, t): (upper, lower) for p, t, upper, lower in handle["lot_constraints"]}
+        # Proto indices of the quantity, producing flag and inventory variables, the same in every copy
+        self.qty_index = handle["qty_index"].tolist()
+        self.flag_index = handle["flag_index"].tolist()
+        self.inv_index = handle["inv_index"].tolist()
+        self._positions = {}
+
+    def _position(self, constraint, var):
+        # Position of a variable in a linear constraint of the base model (the same in every copy)
+        if constraint not in self._positions:
+            self._positions[constraint] = {v: k for k, v in enumerate(self.proto.constraints[constraint].linear.vars)}
+        position = self._positions[constraint].get(var)
+        if position is None:
+            # Zero coefficients are dropped from the model, so there is no term to patch
+            raise LookupError(f"variable {var} not in constraint {constraint}")
+        return position
+
+    def patch(self, data, stock_holding_rate_yearly):
+        """Returns (handle, patched) for the scenario ``data``, or (None, reason) when a copy cannot be patched.
+
+        ``patched`` counts the bounds, right-hand sides and coefficients rewritten.
+        """
+        handle = self.handle
+        base = handle["coefficients"]
+        if handle["objective_mode"] != "linear":
+            return None, "Only the linear objective is patched."
+        pairs = (base["pair_item"], base["pair_machine"])
+        new = model_coefficients(data, stock_holding_rate_yearly, pairs, base["formulation"])
+        for key in ("scaled_tool_change", "scaled_material_change", "initial_inventory"):
+            if not np.array_equal(np.asarray(new[key]), np.asarray(base[key])):
+                return None, f"{key} differs from the base model."
+
+        model = handle["model"].clone()
+        proto = model.Proto()
+        patched = 0
+        qty_index, flag_index, inv_index = self.qty_index, self.flag_index, self.inv_index
+
+        def set_link(constraint, flag, qty, bound):
+            # qty <= bound * flag or qty >= bound * flag: the flag's term is -bound times the quantity's
+            linear = proto.constraints[constraint].linear
+            linear.coeffs[self._position(constraint, flag)] = -linear.coeffs[self._position(constraint, qty)] * int(bound)
+
+        try:
+            for p, t in zip(*(axis.tolist() for axis in np.nonzero(new["pair_max_prod"] != base["pair_max_prod"]))):
+                upper = int(new["pair_max_prod"][p, t])
+                proto.variables[qty_index[p][t]].domain[1] = upper
+                patched += 1
+                if (p, t) in self.lots:
+                    # qty <= upper * flag
+                    set_link(self.lots[p, t][0], flag_index[p][t], qty_index[p][t], upper)
+                    patched += 1
+            if new["pair_min_lot"] is not None:
+                for p, t in zip(*(axis.tolist() for axis in np.nonzero(np.asarray(new["pair_min_lot"]) != np.asarray(base["pair_min_lot"])))):
+                    # qty >= min_lot * flag
+                    set_link(self.lots[p, t][1], flag_index[p][t], qty_index[p][t], new["pair_min_lot"][p][t])
+                    patched += 1
+            for i in np.flatnonzero(np.asarray(new["inventory_upper"]) != np.asarray(base["inventory_upper"])).tolist():
+                for var in inv_index[i]:
+                    proto.variables[var].domain[1] = new["inventory_upper"][i]
+                    patched += 1
+            demand_change = data["demand"] - self.demand
+            for i, t in zip(*(axis.tolist() for axis in np.nonzero(demand_change))):
+                # inv[t] == inv[t-1] + produced - demand: the right-hand side moves against the inventory term
+                constraint = self.balance[i, t]
+                linear = proto.constraints[constraint].linear
+                shift = linear.coeffs[self._position(constraint, inv_index[i][t])] * int(demand_change[i, t])
+                linear.domain[0] -= shift
+                linear.domain[1] -= shift
+                patched += 1
+            new_capacity, base_capacity = np.asarray(new["scaled_capacity"]), np.asarray(base["scaled_capacity"])
+            for m, t in zip(*(axis.tolist() for axis in np.nonzero(new_capacity != base_capacity))):
+                domain = proto.constraints[self.capacity[m, t]].linear.domain
+                domain[len(domain) - 1] = int(new_capacity[m, t])
+                patched += 1
+            pair_item = base["pair_item"].tolist()
+            pair_machine = base["pair_machine"].tolist()
+            changed_items = set(np.flatnonzero(new["scaled_op_time"] != base["scaled_op_time"]).tolist())
+            for p in (p for p, i in enumerate(pair_item) if i in changed_items):
+                for t in range(base["num_periods"]):
+                    constraint = self.capacity[pair_machine[p], t]
+                    position = self._position(constraint, qty_index[p][t])
+                    proto.constraints[constraint].linear.coeffs[position] = int(new["scaled_op_time"][pair_item[p]])
+                    patched += 1
+
+            objective = proto.objective
+            for p in np.flatnonzero(np.asarray(new["pair_cost"]) != np.asarray(base["pair_cost"])).tolist():
+                for var in qty_index[p]:
+                    objective.coeffs[self.objective_position[var]] = new["pair_cost"][p]
+                    patched += 1
+            new_holding = np.asarray(new["holding"]) * new["stock_to_sek"]
+            for i, t in zip(*(axis.tolist() for axis in np.nonzero(new_holding != np.asarray(base["holding"]) * base["stock_to_sek"]))):
+                objective.coeffs[self.objective_position[inv_index[i][t]]] = int(new_holding[i, t])
+                patched += 1
+            changed_machines = set(np.flatnonzero(data["hourly_cost"] != self.hourly_cost).tolist())
+            for var, m, minutes in handle["changeover_terms"]:
+                if m in changed_machines:
+                    objective.coeffs[self.objective_position[var]] = changeover_cost(minutes, data["hourly_cost"][m])
+                    patched += 1
+        except LookupError as e:
+            return None, f"Cannot patch the base model: {e}."
+
+        scenario_handle = dict(handle, model=model, coefficients=new, pair_max_prod=new["pair_max_prod"],
+                               stock_holding_rate_yearly=stock_holding_rate_yearly)
+        return scenario_handle, patched
+
+
+def _scenario_row(name, data, result, stock_holding_rate_yearly, formulation, model_report, include_plan):
+    status_name = result["statusName"]
+    row = {"name": name, "status": "success" if status_name == "OPTIMAL" else "feasible", "message": status_name}
+    if status_name not in ("OPTIMAL", "FEASIBLE"):
+        row["status"] = "error"
+        row["model"] = model_report
+        return row
+    row.update({key: round(value, 2) for key, value in cost_summary(data, result, stock_holding_rate_yearly).items()})
+    row.update({
+        "stockHoldingRateYearly": stock_holding_rate_yearly,
+        "setup": {"formulation": formulation, **setup_summary(result["plan"], data)},
+        "wallTime": round(result["wallTime"], 3),
+        "model": model_report,
+    })
+    if include_plan:
+        row["plan"] = result["plan"]
+    return row
+
+
+def solve_scenarios(columns, scenarios, stock_holding_rate_yearly, eligibility_policy, objective_mode, formulation, backend,
+                    criteria, include_base=True, include_plans=False, max_workers=None):
+    """Solves the base data and every (name, overrides) scenario; returns the comparison report.
+
+    ``columns`` are the source columns with any request-wide overrides applied;
+    scenario overrides go on top of them. Eligibility follows the base data (overrides
+    cannot change an item's machine). The other arguments are the solver options of
+    optimizeProduction; decomposition, horizons and warm starts are not used here.
+    """
+    start = time.monotonic()
+    base_data = normalize_columns(columns)
+    mask = build_eligibility(base_data, eligibility_policy)
+    pairs = eligible_pairs(mask)
+    selected, reason = select_backend(backend, len(pairs[0]) * base_data["demand"].shape[1], formulation, criteria)
+
+    runs = [(BASE_SCENARIO_NAME, None)] if include_base else []
+    runs += scenarios
+    cpu_count = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers or cpu_count, len(runs)))
+    solver_workers = max(1, cpu_count // max_workers)
+    max_time_in_seconds = criteria["max_time_in_seconds"]
+    scenario_criteria = {**criteria, "max_time_in_seconds": min(max_time_in_seconds, max(MIN_SCENARIO_TIME_SECONDS, max_time_in_seconds * max_workers / max(len(runs), 1)))}
+
+    base_model = None
+    build_seconds = 0.0
+    if selected == "cpsat":
+        build_start = time.monotonic()
+        base_model = BaseModel(build_model(base_data, stock_holding_rate_yearly, pairs=pairs, objective_mode=objective_mode,
+                                           formulation=formulation), base_data)
+        build_seconds = time.monotonic() - build_start
+
+    def solve_one(data, rate, handle):
+        if handle is not None:
+            return solve_anytime(handle, data, scenario_criteria, num_workers=solver_workers, log_search_progress=False)
+        return solve_problem(data, mask, rate, objective_mode, scenario_criteria, backend=selected, formulation=formulation,
+                             num_workers=solver_workers, log_search_progress=False)
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for name, overrides in runs:
+            scenario_columns = writable_columns(columns)
+            rate, overridden = apply_overrides(scenario_columns, overrides, stock_holding_rate_yearly)
+            data = normalize_columns(scenario_columns) if overridden else base_data
+            handle, model_report = None, {"source": "rebuilt", "reason": f"Backend {selected}."}
+            if base_model is not None:
+                if overrides is None:
+                    handle, model_report = base_model.handle, {"source": "base"}
+                else:
+                    patch_start = time.monotonic()
+                    handle, patched = base_model.patch(data, rate)
+                    if handle is None:
+                        model_report = {"source": "rebuilt", "reason": patched}
+                    else:
+                        model_report = {"source": "patched", "patchedEntries": patched, "patchSeconds": round(time.monotonic() - patch_start, 3)}
+            futures.append((name, data, rate, model_report, pool.submit(solve_one, data, rate, handle)))
+        rows = [_scenario_row(name, data, future.result(), rate, formulation, model_report, include_plans)
+                for name, data, rate, model_report, future in futures]
+
+    base_row = rows[0] if include_base and rows and rows[0]["status"] != "error" else None
+    if base_row is not None:
+        for row in rows[1:]:
+            if row["status"] != "error":
+                row["vsBase"] = {
+                    "machiningCostSEK": round(row["totalOptimizedMachiningCostSEK"] - base_row["totalOptimizedMachiningCostSEK"], 2),
+                    "stockCostEUR": round(row["totalOptimizedStockCostEUR"] - base_row["totalOptimizedStockCostEUR"], 2),
+                }
+    return {
+        "status": "success" if all(row["status"] != "error" for row in rows) else "partial",
+        "scenarios": rows,
+        "batch": {
+            "scenarios": len(runs),
+            "workers": max_workers,
+            "backend": {"requested": backend, "selected": selected, "reason": reason},
+            "baseModelBuildSeconds": round(build_seconds, 3),
+            "wallSeconds": round(time.monotonic() - start, 3),
+            "criteria": scenario_criteria,
+        },
+    }
@@ -0,0 +1,147 @@
+# solve_cache.py
+# Caches optimizer responses under a content hash of the normalized inputs, the
+# override payload and the options that change the result. Identical requests
+# then skip the model build and solve entirely. Backends are local (in-memory LRU
+# and a JSON directory store) so warm function instances and tests need no Firestore.
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+SOLVE_CACHE_DEFAULT = True
+DEFAULT_TTL_SECONDS = float(os.environ.get("SOLVE_CACHE_TTL_SECONDS", 6 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("SOLVE_CACHE_MAX_ENTRIES", 32))
+DEFAULT_CACHE_DIR = os.environ.get("SOLVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "solve_cache"))
+CACHE_KEY_VERSION = "1"
+
+
+def make_cache_key(data, overrides=None, options=None):
+    """Stable SHA-256 over every normalized array plus the override payload and result-relevant options."""
+    digest = hashlib.sha256(CACHE_KEY_VERSION.encode())
+    for name in sorted(data):
+        array = data[name]
+        digest.update(f"{name}|{array.dtype.str}|{array.shape}|".encode())
+        digest.update(array.tobytes())
+    digest.update(json.dumps(overrides or {}, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(options or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+class MemoryCache:
+    """In-process LRU with a time-to-live per entry."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class DiskCache:
+    """One JSON file per key in a directory; expired files are dropped on read, oldest evicted on write."""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_entries=DEFAULT_MAX_ENTRIES, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                path = os.path.join(self.directory, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class TieredCache:
+    """Memory first, then disk; disk hits are promoted into memory."""
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.put(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                self.disk.put(key, value)
+            except OSError as e:
+                print(f"Warning: Could not write solve cache entry to disk: {e}")
+
+
+def build_default_cache():
+    try:
+        disk = DiskCache()
+    except OSError as e:
+        print(f"Warning: Solve cache directory unavailable, using memory only: {e}")
+        disk = None
+    return TieredCache(MemoryCache(), disk)
@@ -0,0 +1,149 @@
+# solver_backends.py
+# The solver behind the planning model. "cpsat" is the CP-SAT model of planning_model.py;
+# "mip" solves the same model with SCIP and "lp" solves its LP relaxation with GLOP
+# (linear_model.py), which gives a lower bound and a rounded plan in a fraction of the
+# time. "auto" picks CP-SAT or the MIP by the size of each model built, so decomposed
+# components and rolling windows choose for themselves; the LP is only used on request.
+# The linear solvers report no intermediate solutions, so "auto" keeps CP-SAT for a
+# solve with a progress listener or a no_improvement_seconds stop, and a requested
+# linear backend lists the criteria it ignored in "anytime".
+# When its rounded plan breaks capacity or a minimum lot, CP-SAT solves the model from
+# it with the rest of the time budget.
+# solve_problem builds, warm-starts and solves with any backend and returns the result
+# shape of anytime.solve_anytime.
+import time
+
+from anytime import OPTIMALITY_TOLERANCE, relative_gap, solve_anytime
+from eligibility import eligible_pairs
+from linear_model import build_linear_model, solve_linear_model
+from planning_model import DEFAULT_FORMULATION, build_model, hint_production
+from diagnostics import merge_solver_stats
+from warm_start import apply_warm_start
+
+SOLVER_BACKENDS = ("auto", "cpsat", "mip", "lp")
+DEFAULT_SOLVER_BACKEND = "auto"
+# "auto" thresholds on production variables (eligible pairs x periods), from
+# src/benchmarks/bench_solver_backends.py on one CPU: below the first CP-SAT proves
+# optimality in seconds (the sample data's 19800 included); SCIP does so up to about
+# 90k variables where CP-SAT needs minutes, but finds no solution in 60s at 144k.
+# Above that CP-SAT at least returns a feasible plan. The rounded relaxation is close
+# to the bound at that size, but not guaranteed feasible (and GLOP itself runs out of
+# time near 600k), so "auto" never picks it. Setups always use CP-SAT.
+AUTO_MIP_MIN_VARIABLES = 20000
+AUTO_MIP_MAX_VARIABLES = 100000
+
+
+def select_backend(requested, num_variables, formulation=DEFAULT_FORMULATION, criteria=None, listener=None):
+    """Returns (backend, reason): the requested backend, or the one "auto" picks for a model of this size.
+
+    ``criteria`` and ``listener`` are those of the solve: "auto" only picks the MIP
+    when neither needs CP-SAT's solution callback.
+    """
+    if requested != "auto":
+        return requested, "Requested in payload."
+    if formulation == "setup":
+        return "cpsat", "Setup formulation: CP-SAT starts from the batched lot plan."
+    if listener is not None:
+        return "cpsat", "Progress listener: only CP-SAT reports intermediate solutions."
+    if criteria and criteria.get("no_improvement_seconds"):
+        return "cpsat", "no_improvement_seconds set: only CP-SAT stops on it."
+    if num_variables >= AUTO_MIP_MAX_VARIABLES:
+        return "cpsat", f"{num_variables} production variables >= {AUTO_MIP_MAX_VARIABLES}."
+    if num_variables >= AUTO_MIP_MIN_VARIABLES:
+        return "mip", f"{num_variables} production variables >= {AUTO_MIP_MIN_VARIABLES}."
+    return "cpsat", f"{num_variables} production variables < {AUTO_MIP_MIN_VARIABLES}."
+
+
+def _linear_anytime(result, criteria, relaxed):
+    # The linear solvers report no intermediate solutions; the stop reason follows from the status
+    # (a stop on the gap limit also turns the result FEASIBLE, as in anytime.solve_anytime)
+    gap = relative_gap(result.get("objective"), result.get("bestBound"))
+    if relaxed:
+        stop_reason = "relaxation"
+    elif result["statusName"] == "OPTIMAL":
+        stop_reason = "relative_gap" if gap and gap > OPTIMALITY_TOLERANCE else "optimal"
+        if stop_reason == "relative_gap":
+            # Stopped on the MIP gap limit: proven within the gap, not optimal
+            result["statusName"] = "FEASIBLE"
+    elif result["statusName"] in ("FEASIBLE", "UNKNOWN"):
+        stop_reason = "deadline" if criteria.get("deadline") is not None else "time_limit"
+    else:
+        stop_reason = result["statusName"].lower()
+    solutions = []
+    if "objective" in result:
+        solutions.append({"objective": result["objective"], "bestBound": result["bestBound"], "wallTime": round(result["wallTime"], 3)})
+    report = {"stopReason": stop_reason, "relativeGap": gap, "solutions": solutions, "criteria": criteria}
+    if criteria.get("no_improvement_seconds"):
+        report["ignoredCriteria"] = ["no_improvement_seconds"]
+    return report
+
+
+def solve_problem(data, mask, stock_holding_rate_yearly, objective_mode, criteria, backend=DEFAULT_SOLVER_BACKEND,
+                  formulation=DEFAULT_FORMULATION, hint_plan_id=None, hint_plan=None, listener=None, num_workers=None,
+                  log_search_progress=True):
+    """Builds the model for ``backend`` (one of SOLVER_BACKENDS) and solves it with the stop criteria.
+
+    The result gains "backend": the selected backend, why, and the solver used; its
+    "stats" gain the model build (and warm-start) time. A
+    stored ``hint_plan`` warm-starts CP-SAT and the MIP; the result's "warmStart" is
+    the apply_warm_start report, or None without a plan. The linear backends ignore
+    ``objective_mode`` and ``no_improvement_seconds`` (listed in "anytime"'s
+    "ignoredCriteria"), and send ``listener`` their one solution at the end.
+    """
+    pairs = eligible_pairs(mask)
+    backend, reason = select_backend(backend, len(pairs[0]) * data["demand"].shape[1], formulation, criteria, listener)
+    warm_start_report = None
+    start = time.perf_counter()
+    if backend == "cpsat":
+        handle = build_model(data, stock_holding_rate_yearly, pairs=pairs, objective_mode=objective_mode, formulation=formulation)
+        if hint_plan is not None:
+            warm_start_report = apply_warm_start(handle, data, hint_plan_id, hint_plan)
+        build_seconds = time.perf_counter() - start
+        result = solve_anytime(handle, data, criteria, listener=listener, num_workers=num_workers,
+                               log_search_progress=log_search_progress)
+        solver_name = "CP-SAT"
+    elif backend in ("mip", "lp"):
+        relaxed = backend == "lp"
+        handle = build_linear_model(data, stock_holding_rate_yearly, pairs=pairs, formulation=formulation, relaxed=relaxed)
+        if hint_plan is not None and relaxed:
+            warm_start_report = {"enabled": True, "sourcePlanId": hint_plan_id, "applied": False, "reason": "Not used with the lp backend."}
+        elif hint_plan is not None:
+            warm_start_report = apply_warm_start(handle, data, hint_plan_id, hint_plan)
+        build_seconds = time.perf_counter() - start
+        result = solve_linear_model(handle, data, max_time_in_seconds=criteria["max_time_in_seconds"],
+                                    relative_gap=criteria.get("relative_gap"))
+        solver_name = handle["solverName"]
+        result["anytime"] = _linear_anytime(result, criteria, relaxed)
+        if listener is not None and "plan" in result:
+            listener({"type": "solution", **result["anytime"]["solutions"][-1], "solutionCount": 1,
+                      "bestSolution": {key: result[key] for key in ("plan", "totalOptimizedMachiningCostSEK", "totalOptimizedStockCostEUR")}})
+    else:
+        raise ValueError(f"Unknown solver backend '{backend}'. Expected one of {SOLVER_BACKENDS}.")
+    result["stats"]["buildSeconds"] = build_seconds
+    result["backend"] = {"selected": backend, "reason": reason, "solver": solver_name}
+    if backend == "lp" and "plan" not in result and "rounded_qty" in handle:
+        result = _repair_with_cpsat(result, handle["rounded_qty"], data, pairs, stock_holding_rate_yearly, objective_mode,
+                                    formulation, {**criteria, "max_time_in_seconds": max(0.1, criteria["max_time_in_seconds"] - (time.perf_counter() - start))},
+                                    listener, num_workers, log_search_progress)
+    result["warmStart"] = warm_start_report
+    return result
+
+
+def _repair_with_cpsat(linear_result, rounded_qty, data, pairs, stock_holding_rate_yearly, objective_mode, formulation, criteria,
+                       listener, num_workers, log_search_progress):
+    # The rounded LP plan breaks capacity or a minimum lot: CP-SAT solves the model, hinted
+    # with it, in the time left, so a large model still gets a plan (as before the LP backend)
+    start = time.perf_counter()
+    handle = build_model(data, stock_holding_rate_yearly, pairs=pairs, objective_mode=objective_mode, formulation=formulation)
+    if formulation != "setup":
+        # With setups the rounded plan breaks minimum lots; build_model's batched lot plan is the better start
+        handle["model"].ClearHints()
+        hint_production(handle, data, rounded_qty)
+    build_seconds = time.perf_counter() - start
+    result = solve_anytime(handle, data, criteria, listener=listener, num_workers=num_workers, log_search_progress=log_search_progress)
+    result["stats"]["buildSeconds"] = build_seconds
+    result["stats"] = merge_solver_stats([linear_result["stats"], result["stats"]])
+    result["relaxation"] = linear_result["relaxation"]
+    result["backend"] = {**linear_result["backend"], "solver": "CP-SAT",
+                         "fallback": {"backend": "cpsat", "reason": "Rounded LP plan rejected; solved with CP-SAT."}}
+    return result
@@ -0,0 +1,113 @@
+# warm_start.py
+# Seeds the CP-SAT search with the quantities of the most recent stored production
+# plan (AddHint), so re-runs after small overrides start from a known good plan. Only
+# a plan solved for the same dataset version, monthly grid, formulation and
+# eligibility qualifies. A linear_model MIP gets the same plan as its MIP start.
+import numpy as np
+
+from planning_data import MONTHS, NUM_MONTHS
+from planning_model import changeover_groups, hint_production
+from linear_model import hint_linear_production
+
+WARM_START_DEFAULT = True
+# A stored plan is only used when at least this share of its entries maps onto the current model
+MIN_MATCHED_FRACTION = 0.5
+# Newest stored plans searched for one solved for the same dataset version, grid and formulation
+WARM_START_CANDIDATES = 5
+
+
+def plan_is_compatible(header, dataset_version, formulation, eligibility_policy):
+    """Whether a stored plan ``header`` was solved for this dataset version on the monthly grid with the same formulation and eligibility."""
+    return ((header.get("dataset") or {}).get("version") == dataset_version
+            and header.get("horizon") is None
+            and (header.get("setup") or {}).get("formulation") == formulation
+            and (header.get("eligibility") or {}).get("policy") == eligibility_policy)
+
+
+def plan_to_hint_matrix(plan_entries, handle, data):
+    """Maps stored plan entries onto a (pairs x months) quantity matrix for the current model.
+
+    Returns the matrix plus counts of matched, unmatched (item/machine/month no longer
+    in the model) and clamped (quantity above the variable's upper bound) entries.
+    """
+    item_ids, machine_ids = data["item_ids"].tolist(), data["machine_ids"].tolist()
+    pair_index = {
+        (item_ids[i], machine_ids[m]): p
+        for p, (i, m) in enumerate(zip(handle["pair_item"].tolist(), handle["pair_machine"].tolist()))
+    }
+    month_index = {month: idx for idx, month in enumerate(MONTHS)}
+    upper = handle["pair_max_prod"]
+
+    hint_qty = np.zeros((len(pair_index), NUM_MONTHS), dtype=np.int64)
+    matched = unmatched = clamped = 0
+    for entry in plan_entries:
+        p = pair_index.get((str(entry.get("itemId")), str(entry.get("machineId"))))
+        month_idx = month_index.get(entry.get("month"))
+        quantity = entry.get("quantity")
+        if p is None or month_idx is None or not isinstance(quantity, (int, float)) or quantity < 0:
+            unmatched += 1
+            continue
+        quantity = int(quantity)
+        if quantity > upper[p, month_idx]:
+            quantity = int(upper[p, month_idx])
+            clamped += 1
+        hint_qty[p, month_idx] += quantity
+        matched += 1
+    return hint_qty, {"matchedEntries": matched, "unmatchedEntries": unmatched, "clampedEntries": clamped}
+
+
+def hint_is_feasible(hint_qty, handle, data):
+    """Checks the hinted quantities against the model's inventory and capacity constraints.
+
+    Inventory runs from the initial stock and must stay within [0, its bound]. Machine
+    load counts the setup formulation's tool and material changes, whose producing
+    pairs must also make their minimum lot. Returns (feasible, inventory).
+    """
+    coefficients = handle["coefficients"]
+    pair_item, pair_machine = coefficients["pair_item"], coefficients["pair_machine"]
+    num_items, num_machines = len(data["item_ids"]), len(data["machine_ids"])
+
+    produced = np.zeros((num_items, NUM_MONTHS), dtype=np.int64)
+    np.add.at(produced, pair_item, hint_qty)
+    initial_inventory = np.asarray(coefficients["initial_inventory"], dtype=np.int64)
+    inventory = initial_inventory[:, None] + np.cumsum(produced - data["demand"], axis=1)
+    inventory_upper = np.asarray(coefficients["inventory_upper"], dtype=np.int64)
+    feasible = bool((inventory >= 0).all() and (inventory <= inventory_upper[:, None]).all())
+
+    load = np.zeros((num_machines, NUM_MONTHS), dtype=np.int64)
+    np.add.at(load, pair_machine, hint_qty * coefficients["scaled_op_time"][pair_item][:, None])
+    if coefficients["formulation"] == "setup":
+        producing = hint_qty > 0
+        feasible = feasible and bool((hint_qty >= np.asarray(coefficients["pair_min_lot"]))[producing].all())
+        for m in range(num_machines):
+            for group, tool_change, material_change in changeover_groups(coefficients, data, m):
+                group_producing = producing[group]
+                load[m] += tool_change * group_producing.sum(axis=0) + material_change * group_producing.any(axis=0)
+    feasible = feasible and bool((load <= np.asarray(coefficients["scaled_capacity"], dtype=np.int64)).all())
+    return feasible, inventory
+
+
+def apply_warm_start(model_handle, data, plan_id, plan_doc):
+    """Adds solution hints from a stored plan to the model and returns a report for the response."""
+    report = {"enabled": True, "sourcePlanId": plan_id, "applied": False, "hintedVariables": 0}
+    plan_entries = (plan_doc or {}).get("plan")
+    if not isinstance(plan_entries, list) or not plan_entries:
+        report["reason"] = "No stored plan with entries found."
+        return report
+
+    hint_qty, counts = plan_to_hint_matrix(plan_entries, model_handle, data)
+    report.update(counts)
+    if counts["matchedEntries"] < MIN_MATCHED_FRACTION * len(plan_entries):
+        report["reason"] = "Stored plan does not match the current items and machines."
+        return report
+
+    feasible, _ = hint_is_feasible(hint_qty, model_handle, data)
+    # The stored plan replaces any hint the model was built with (e.g. the setup formulation's batched lot plan)
+    if "solver" in model_handle:
+        hinted = hint_linear_production(model_handle, hint_qty)
+    else:
+        model_handle["model"].ClearHints()
+        hinted = hint_production(model_handle, data, hint_qty)
+
+    report.update({"applied": True, "hintedVariables": hinted, "hintFeasible": feasible})
+    return report
@@ -0,0 +1,112 @@
+# delta_ingest.py
+# Change detection for ingestion: every document is fingerprinted and compared with
+# the fingerprints from the previous run (a local manifest, or the documents stored
+# in Firestore), so only inserted and changed documents are written and, optionally,
+# documents that vanished from the source are deleted.
+import hashlib
+import json
+import os
+
+from firestore_batch import BatchWriter
+
+MANIFEST_VERSION = 1
+
+
+def fingerprint(document):
+    """SHA-256 of the document's canonical JSON form (key order does not matter)."""
+    canonical = json.dumps(document, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def load_manifest(path, project_id=None):
+    """Per-collection fingerprints of the last run, or None when missing, unreadable or for another project."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read ingest manifest '{path}': {e}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("projectId") != project_id:
+        print(f"Warning: Ingest manifest '{path}' belongs to another project or format. Ignoring it.")
+        return None
+    return manifest.get("collections", {})
+
+
+def save_manifest(path, collections, project_id=None):
+    # Write to a temporary file first so an interrupted run never leaves a truncated manifest
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": MANIFEST_VERSION, "projectId": project_id, "collections": collections}, f)
+    os.replace(tmp_path, path)
+
+
+def stored_fingerprints(collection_ref):
+    """Fingerprints of the documents currently stored in a collection (one read per document)."""
+    return {doc.id: fingerprint(doc.to_dict()) for doc in collection_ref.stream()}
+
+
+def write_collection(db, collection_name, documents, previous=None, delete_missing=False, keep_ids=(), **writer_options):
+    """Writes (doc_id, document) pairs to a collection, skipping unchanged ones.
+
+    ``previous`` maps document ids to the fingerprints of the last run; None writes
+    everything. With ``delete_missing``, previously known documents that are not in
+    ``documents`` (and not in ``keep_ids``, e.g. rejected rows) are deleted.
+    An id that comes again (e.g. from a later chunk of the same file) replaces the
+    document written for it before and is counted by its last document, so an
+    unchanged source reports no updates even when an earlier duplicate was written
+    over the stored document (which is then written back). Returns (fingerprints, report); the fingerprints
+    only include writes that are known to have succeeded, so failed documents are
+    retried on the next run.
+    """
+    collection_ref = db.collection(collection_name)
+    fingerprints = {}
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+    changed = set()
+    outcome = {}
+    writer = BatchWriter(db, label=collection_name, **writer_options)
+    for doc_id, document in documents:
+        new_fp = fingerprint(document)
+        old_fp = previous.get(doc_id) if previous is not None else None
+        if doc_id in fingerprints:
+            if fingerprints[doc_id] == new_fp:
+                continue
+            # Counted once, by its last document
+            report[outcome[doc_id]] -= 1
+            # The earlier document may be in a batch still in flight; it has to land first
+            writer.wait()
+        fingerprints[doc_id] = new_fp
+        outcome[doc_id] = "unchanged" if old_fp == new_fp else "updated" if old_fp is not None else "inserted"
+        report[outcome[doc_id]] += 1
+        if old_fp == new_fp and doc_id not in changed:
+            continue
+        # (Unchanged but written: an earlier document of this id replaced the stored one)
+        changed.add(doc_id)
+        writer.set(collection_ref.document(doc_id), document)
+
+    vanished = []
+    # Read only now: ``keep_ids`` may be filled while ``documents`` is consumed
+    keep_ids = set(keep_ids)
+    if delete_missing and previous:
+        vanished = [doc_id for doc_id in previous if doc_id not in fingerprints and doc_id not in keep_ids]
+        for doc_id in vanished:
+            writer.delete(collection_ref.document(doc_id))
+        report["deleted"] = len(vanished)
+    stats = writer.close()
+    report.update(stats)
+
+    if stats["failedWrites"]:
+        # Unknown which batches failed: forget the changed documents so they are written again
+        for doc_id in changed:
+            if previous is not None and doc_id in previous:
+                fingerprints[doc_id] = previous[doc_id]
+            else:
+                del fingerprints[doc_id]
+    if previous is not None:
+        deleted = set() if stats["failedWrites"] else set(vanished)
+        # Documents that are still stored (kept, not deleted, or failed deletes) stay in the manifest
+        for doc_id, old_fp in previous.items():
+            if doc_id not in fingerprints and doc_id not in deleted:
+                fingerprints[doc_id] = old_fp
+    return fingerprints, report
@@ -0,0 +1,124 @@
+# firestore_batch.py
+# Batched Firestore writes for the ingestion scripts: document writes are grouped
+# into WriteBatch commits of up to 500 operations (the Firestore limit), optionally
+# committed concurrently, retried with exponential backoff on transient errors,
+# and reported as they progress.
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core import exceptions as gcp_exceptions
+
+MAX_BATCH_SIZE = 500  # Firestore limit on operations per batch commit
+RETRYABLE_ERRORS = (
+    gcp_exceptions.Aborted,
+    gcp_exceptions.DeadlineExceeded,
+    gcp_exceptions.InternalServerError,
+    gcp_exceptions.ResourceExhausted,
+    gcp_exceptions.ServiceUnavailable,
+)
+
+
+class BatchWriter:
+    """Collects set/delete operations and commits them in chunks.
+
+    Use as a context manager so the final partial batch is committed on exit:
+
+        with BatchWriter(db, label="items") as writer:
+            writer.set(db.collection("items").document(item_id), item_data)
+    """
+
+    def __init__(self, db, batch_size=MAX_BATCH_SIZE, max_concurrent_commits=1, max_retries=5,
+                 backoff_seconds=0.5, label="documents", progress_every=MAX_BATCH_SIZE * 4):
+        if not 1 <= batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        self.db = db
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.label = label
+        self.progress_every = progress_every
+        self.max_concurrent_commits = max_concurrent_commits
+        self._pending = []
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_commits) if max_concurrent_commits > 1 else None
+        self._futures = []
+        self._started = time.perf_counter()
+        self._last_reported = 0
+        self.stats = {"writes": 0, "commits": 0, "retries": 0, "failedWrites": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def set(self, doc_ref, data):
+        self._add(("set", doc_ref, data))
+
+    def delete(self, doc_ref):
+        self._add(("delete", doc_ref, None))
+
+    def _add(self, operation):
+        self._pending.append(operation)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        operations, self._pending = self._pending, []
+        if self._executor is None:
+            self._record(self._commit(operations))
+        else:
+            self._futures.append(self._executor.submit(self._commit, operations))
+            # Keep the number of in-flight batches bounded
+            if len(self._futures) >= self.max_concurrent_commits * 2:
+                self._drain()
+
+    def wait(self):
+        """Commits the pending operations and waits for every batch in flight, so later operations land after them."""
+        self.flush()
+        self._drain()
+
+    def _drain(self):
+        futures, self._futures = self._futures, []
+        for future in futures:
+            self._record(future.result())
+
+    def _commit(self, operations):
+        for attempt in range(self.max_retries + 1):
+            batch = self.db.batch()
+            for kind, doc_ref, data in operations:
+                if kind == "set":
+                    batch.set(doc_ref, data)
+                else:
+                    batch.delete(doc_ref)
+            try:
+                batch.commit()
+                return len(operations), attempt, 0
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    print(f"Error committing batch of {len(operations)} {self.label} after {attempt + 1} attempts: {e}")
+                    return 0, attempt, len(operations)
+                time.sleep(self.backoff_seconds * 2 ** attempt)
+            except Exception as e:
+                print(f"Error committing batch of {len(operations)} {self.label}: {e}")
+                return 0, attempt, len(operations)
+
+    def _record(self, outcome):
+        written, retries, failed = outcome
+        self.stats["writes"] += written
+        self.stats["commits"] += 1
+        self.stats["retries"] += retries
+        self.stats["failedWrites"] += failed
+        done = self.stats["writes"] + self.stats["failedWrites"]
+        if done - self._last_reported >= self.progress_every:
+            self._last_reported = done
+            elapsed = time.perf_counter() - self._started
+            print(f"  {self.label}: {self.stats['writes']} written ({self.stats['writes'] / max(elapsed, 1e-9):.0f}/s)")
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+        self.stats["seconds"] = round(time.perf_counter() - self._started, 3)
+        return self.stats
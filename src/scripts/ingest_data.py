@@ -1,14 +1,36 @@
 # ingest_data.py
+import argparse
+import datetime
+import os
+import sys
+import tempfile
 import pandas as pd
 import firebase_admin
 from firebase_admin import credentials, firestore
-import random
 import math
 
+# The placeholder base cost and the dataset snapshot format are shared with the optimizer
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'functions'))
+
+from firestore_batch import MAX_BATCH_SIZE
+from item_table import COL_ITEM_ID, normalize_items_frame, item_documents
+from streaming_reader import DEFAULT_CHUNK_ROWS, iter_csv_chunks, iter_xlsx_chunks, read_xlsx_sheet, xlsx_sheet_names
+from delta_ingest import load_manifest, save_manifest, stored_fingerprints, write_collection
+from planning_data import deterministic_base_cost
+from dataset_snapshot import (DATASET_META_COLLECTION, DATASET_META_DOCUMENT, SNAPSHOT_FORMAT, publish_snapshot,
+                              read_dataset_version, stream_columns, write_snapshot)
+
 # Initialize Firebase Admin SDK
 SERVICE_ACCOUNT_KEY_PATH = '../../qwiklabs-gcp-00-6d5f50f68707-firebase-adminsdk-fbsvc-1fe7825b05.json'
 EXCEL_FILE_PATH = '../../data/turning-data.xlsx'
 CSV_ITEMS_FALLBACK_PATH = '../../data/turning-data.csv'
+# Fingerprints of the last ingested documents, used to write only what changed
+INGEST_MANIFEST_PATH = '.ingest_manifest.json'
+
+# Writes are grouped into WriteBatch commits; a few batches are committed in parallel
+WRITE_BATCH_SIZE = MAX_BATCH_SIZE
+MAX_CONCURRENT_COMMITS = 4
+MAX_REPORTED_REJECTIONS = 20
 
 def initialize_firebase():
     try:
@@ -22,14 +44,6 @@ def initialize_firebase():
         exit()
     
 # Helper functions to parse values, handling potential errors and formatting issues
-def parse_operation_time(op_time_str):
-    if pd.isna(op_time_str) or str(op_time_str).lower() == 'nan':
-        return 0.0
-    try:
-        return float(str(op_time_str).replace(',', '.').upper().replace(' MIN', '').strip())
-    except ValueError:
-        return 0.0
-
 def parse_float_with_comma(value_str):
     if pd.isna(value_str) or str(value_str).lower() == 'nan':
         return 0.0
@@ -38,69 +52,62 @@ def parse_float_with_comma(value_str):
     except ValueError:
         return 0.0
 
-# Function to ingest items from a DataFrame
-def ingest_items(db, df):
+def _print_report(label, report):
+    print(f"{label} ingestion complete. {report['inserted']} inserted, {report['updated']} updated, "
+          f"{report['unchanged']} unchanged, {report['deleted']} deleted "
+          f"({report['commits']} batches, {report['seconds']}s, {report['retries']} retries, {report['failedWrites']} failed writes).")
+
+# Function to ingest items from a DataFrame. ``previous`` holds the fingerprints of the
+# last run (None rewrites every document); returns (fingerprints, report)
+def ingest_items(db, df, previous=None, delete_missing=False, batch_size=WRITE_BATCH_SIZE, max_concurrent_commits=MAX_CONCURRENT_COMMITS):
+    return ingest_item_chunks(db, [df], previous, delete_missing, batch_size, max_concurrent_commits)
+
+# Same as ingest_items for an iterable of DataFrame chunks (see streaming_reader), which are
+# normalized and written one at a time so memory does not grow with the file size
+def ingest_item_chunks(db, chunks, previous=None, delete_missing=False, batch_size=WRITE_BATCH_SIZE, max_concurrent_commits=MAX_CONCURRENT_COMMITS):
     items_collection_name = 'items'
-    items_ref = db.collection(items_collection_name)
     print(f"Starting items ingestion into '{items_collection_name}' collection...")
+    # Rejected rows keep whatever is stored for them instead of being deleted
+    rejected_ids = set()
+    rejected_rows = 0
+    # Source row of every accepted Item Id so far: duplicates across chunks follow the
+    # same rule as within one (the last occurrence wins; write_collection replaces the earlier document)
+    accepted_rows = {}
 
-    df.columns = [str(col).strip() for col in df.columns]
-
-    col_item_id = 'Item Id'
-    col_op_time = 'Operation Time Per PC'
-    col_material_length = 'Material Length (mm)'
-    col_machine_id = 'Machine Id'
-    col_forecast = 'FORECAST_YEAR'
-    col_fixed_lot = 'FIXED_LOT_SIZE'
-    col_raw_material_id = 'RawMaterial Id'
-
-    consumption_column_map = {
-        'Consumed January': 'January', 'Consumed February': 'February', 'Consumed March': 'March',
-        'Consumed April': 'April', 'Consumed May': 'May', 'Consumed June': 'June',
-        'Consumed July': 'July', 'Consumed August': 'August', 'Consumed September': 'September',
-        'Consumed October': 'October', 'Consumed November': 'November', 'Consumed December': 'December'
-    }
-    count = 0
-    for index, row in df.iterrows():
-        try:
-            item_id_val = str(row[col_item_id]).strip()
-            if not item_id_val or item_id_val.lower() == 'nan':
-                print(f"Skipping item row {index+2} due to missing or invalid Item Id.")
-                continue
-
-            monthly_consumption = {}
-            for excel_col, firestore_month in consumption_column_map.items():
-                val = 0
-                if excel_col in row and not pd.isna(row[excel_col]):
-                    try:
-                        val = int(parse_float_with_comma(row[excel_col]))
-                    except ValueError:
-                        val = 0
-                monthly_consumption[firestore_month] = val
-
-            item_data = {
-                'itemId': item_id_val,
-                'operationTimePerPC': parse_operation_time(row.get(col_op_time)),
-                'materialLengthMM': parse_float_with_comma(row.get(col_material_length)),
-                'currentMachineId': str(row.get(col_machine_id, '')).strip(),
-                'rawMaterialId': str(row.get(col_raw_material_id, '')).strip(),
-                'forecastYear': int(parse_float_with_comma(row.get(col_forecast, 0))),
-                'FIXED_LOT_SIZE': int(parse_float_with_comma(row.get(col_fixed_lot, 0))),
-                'monthlyConsumption': monthly_consumption,
-                'baseCostPerItem': round(random.uniform(1.5, 3.0), 2)
-            }
-            items_ref.document(item_id_val).set(item_data)
-            count += 1
-        except KeyError as ke:
-            print(f"KeyError for item row {index+2} (Item ID: {row.get(col_item_id, 'Unknown')}): Missing column {ke}.")
-        except Exception as e: # Catch other potential errors during row processing
-            print(f"Error ingesting item row {index+2} (Item ID: {row.get(col_item_id, 'Unknown')}): {e}")
-    print(f"Items ingestion complete. {count} items ingested.")
+    def reject(row, item_id_val, reason):
+        nonlocal rejected_rows
+        if rejected_rows < MAX_REPORTED_REJECTIONS:
+            print(f"Skipping item row {row} (Item ID: {item_id_val}): {reason}.")
+        rejected_rows += 1
+
+    def documents():
+        for chunk in chunks:
+            table, rejections = normalize_items_frame(chunk)
+            for rejection in rejections:
+                reject(rejection['row'], rejection['itemId'], rejection['reason'])
+                rejected_ids.add(rejection['itemId'])
+            for (item_id_val, item_data), row in zip(item_documents(table), table['sourceRow'].tolist()):
+                earlier_row = accepted_rows.get(item_id_val)
+                if earlier_row is not None:
+                    reject(earlier_row, item_id_val, f"duplicate {COL_ITEM_ID} (superseded by row {row})")
+                accepted_rows[item_id_val] = row
+                # Deterministic, so unchanged rows produce unchanged documents
+                item_data['baseCostPerItem'] = deterministic_base_cost(item_id_val)
+                yield item_id_val, item_data
+
+    fingerprints, report = write_collection(db, items_collection_name, documents(), previous, delete_missing,
+                                            keep_ids=rejected_ids,
+                                            batch_size=batch_size, max_concurrent_commits=max_concurrent_commits)
+    if rejected_rows > MAX_REPORTED_REJECTIONS:
+        print(f"... and {rejected_rows - MAX_REPORTED_REJECTIONS} more rejected item rows.")
+    report['rejectedRows'] = rejected_rows
+    _print_report("Items", report)
+    print(f"{rejected_rows} item rows rejected.")
+    return fingerprints, report
 
 # Function to ingest machines using the mapping and specification data
-def ingest_machines(db, machine_mapping_df, machine_spec_df):
+def ingest_machines(db, machine_mapping_df, machine_spec_df, previous=None, delete_missing=False, batch_size=WRITE_BATCH_SIZE, max_concurrent_commits=MAX_CONCURRENT_COMMITS):
     machines_collection_name = 'machines'
-    machines_ref = db.collection(machines_collection_name)
     print(f"Starting machines ingestion into '{machines_collection_name}' collection using mapping and specification...")
 
     # Normalize column names for both dataframes
@@ -122,7 +129,7 @@ def ingest_machines(db, machine_mapping_df, machine_spec_df):
         except Exception as e:
             print(f"Error processing Machine Mapping row {index+2}: {e}")
 
-    ingested_count = 0
+    machine_documents = []
     # Iterate through the mapping to create machine documents
     for machine_type, actual_ids in machine_type_to_ids.items():
         # Find the corresponding specification row(s) for this machine type
@@ -150,17 +157,18 @@ def ingest_machines(db, machine_mapping_df, machine_spec_df):
                     'toolChangeTimeMinutes': 5, # Default from PRD
                     'rawMaterialChangeTimeMinutes': 20, # Default from PRD
                 }
-                machines_ref.document(actual_id).set(machine_data)
-                ingested_count += 1
+                machine_documents.append((actual_id, machine_data))
                 # print(f"Ingested machine: {actual_id} (Type: {machine_type})")
             except Exception as e:
                  print(f"Error ingesting machine with Actual ID '{actual_id}' (Type: {machine_type}): {e}")
 
-    print(f"Machines ingestion complete. {ingested_count} machine instances ingested.")
+    fingerprints, report = write_collection(db, machines_collection_name, machine_documents, previous, delete_missing,
+                                            batch_size=batch_size, max_concurrent_commits=max_concurrent_commits)
+    _print_report("Machines", report)
+    return fingerprints, report
 
-def create_default_machines(db):
+def create_default_machines(db, previous=None):
     machines_collection_name = 'machines'
-    machines_ref = db.collection(machines_collection_name)
     print(f"Creating default machine set in '{machines_collection_name}' collection as fallback...")
     default_machines = {
         "M1": {'machineId': "M1", 'machineType': "DefaultTypeA", 'dailyOperationalHours': 24, 'weeklyOperationalDays': 5, 'hourlyOperatingCost': 50.0, 'turretCapacity': 12, 'speedUpFactor': 1.0, 'toolChangeTimeMinutes': 5, 'rawMaterialChangeTimeMinutes': 20},
@@ -168,39 +176,100 @@ def create_default_machines(db):
         "M3": {'machineId': "M3", 'machineType': "DefaultTypeB", 'dailyOperationalHours': 24, 'weeklyOperationalDays': 5, 'hourlyOperatingCost': 50.0, 'turretCapacity': 10, 'speedUpFactor': 1.0, 'toolChangeTimeMinutes': 5, 'rawMaterialChangeTimeMinutes': 20},
         "M4": {'machineId': "M4", 'machineType': "DefaultTypeB", 'dailyOperationalHours': 24, 'weeklyOperationalDays': 5, 'hourlyOperatingCost': 52.0, 'turretCapacity': 10, 'speedUpFactor': 1.0, 'toolChangeTimeMinutes': 5, 'rawMaterialChangeTimeMinutes': 20},
     }
-    for m_id, data in default_machines.items():
+    fingerprints, report = write_collection(db, machines_collection_name, default_machines.items(), previous)
+    if report['failedWrites']:
+        print(f"Error creating default machines: {report['failedWrites']} writes failed.")
+    print("Default machines (M1-M4) ingestion complete.")
+    return fingerprints, report
+
+# Bumps meta/dataset_version after a run that changed the data and, when a bucket is
+# given, publishes the columnar snapshot the optimizer loads instead of the collections
+def publish_dataset_version(db, changed, snapshot_bucket=None):
+    current = read_dataset_version(db)
+    current_snapshot = (current or {}).get('snapshot') or {}
+    if not changed and current is not None and (current_snapshot.get('format') == SNAPSHOT_FORMAT or not snapshot_bucket):
+        print(f"Dataset unchanged. Keeping dataset version {current.get('version')}.")
+        return current
+
+    run_id = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    dataset_version = {'version': run_id, 'updatedAt': firestore.SERVER_TIMESTAMP, 'snapshot': None}
+    if snapshot_bucket:
         try:
-            machines_ref.document(m_id).set(data)
+            # Read back from Firestore so the snapshot matches the collections exactly
+            columns = stream_columns(db)
+            with tempfile.TemporaryDirectory() as snapshot_dir:
+                manifest = write_snapshot(snapshot_dir, columns)
+                version = f"{run_id}-{manifest['contentHash'][:12]}"
+                dataset_version['snapshot'] = publish_snapshot(snapshot_bucket, version, snapshot_dir)
+            dataset_version.update({'version': version, 'contentHash': manifest['contentHash'],
+                                    'itemCount': manifest['itemCount'], 'machineCount': manifest['machineCount']})
+            print(f"Published dataset snapshot {version} ({manifest['itemCount']} items, {manifest['machineCount']} machines) to gs://{snapshot_bucket}/{dataset_version['snapshot']['prefix']}")
         except Exception as e:
-            print(f"Error creating default machine {m_id}: {e}")
-    print("Default machines (M1-M4) ingestion complete.")
+            # Without a snapshot the optimizer falls back to the collections, which are current
+            print(f"Error publishing dataset snapshot: {e}")
+    db.collection(DATASET_META_COLLECTION).document(DATASET_META_DOCUMENT).set(dataset_version)
+    print(f"Dataset version is now {dataset_version['version']}.")
+    return dataset_version
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest the turning data (Excel, CSV fallback) into Firestore.")
+    parser.add_argument('--full', action='store_true', help="Rewrite every document instead of only inserted/changed ones")
+    parser.add_argument('--compare', choices=['manifest', 'firestore'], default='manifest',
+                        help="Detect changes against the local manifest (default; falls back to firestore when missing) or the stored documents")
+    parser.add_argument('--delete-missing', action='store_true', help="Delete documents whose rows vanished from the source")
+    parser.add_argument('--manifest', default=INGEST_MANIFEST_PATH, help="Path of the local fingerprint manifest")
+    parser.add_argument('--snapshot-bucket', default=os.environ.get('DATASET_SNAPSHOT_BUCKET'),
+                        help="Cloud Storage bucket for the optimizer's columnar dataset snapshot (default: $DATASET_SNAPSHOT_BUCKET; none skips the snapshot)")
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help="Item rows read, normalized and written per chunk")
+    return parser.parse_args(argv)
+
+def load_previous_fingerprints(db, args, project_id):
+    if args.full:
+        return None
+    if args.compare == 'manifest':
+        previous = load_manifest(args.manifest, project_id)
+        if previous is not None:
+            return previous
+        print(f"No usable manifest at '{args.manifest}'. Comparing with the stored documents instead.")
+    return {name: stored_fingerprints(db.collection(name)) for name in ('items', 'machines')}
+
+def main(argv=None):
+    args = parse_args(argv)
     db = initialize_firebase()
+    project_id = getattr(db, 'project', None)
+    previous = load_previous_fingerprints(db, args, project_id)
+    collections = dict(previous or {})
+
+    def previous_for(name):
+        return None if previous is None else previous.get(name, {})
+
+    reports = []
     items_data_loaded = False
     machines_data_loaded = False
 
     try:
         print(f"Attempting to read Excel file: {EXCEL_FILE_PATH}")
-        xls = pd.ExcelFile(EXCEL_FILE_PATH)
-        if 'Items' in xls.sheet_names: # Check if 'Items' sheet exists before parsing
-            print("Found 'Items' sheet. Parsing item data from Excel...")
-            items_df_excel = xls.parse('Items')
-            ingest_items(db, items_df_excel)
+        sheet_names = xlsx_sheet_names(EXCEL_FILE_PATH)
+        if 'Items' in sheet_names: # Check if 'Items' sheet exists before parsing
+            print("Found 'Items' sheet. Streaming item data from Excel...")
+            items_chunks_excel = iter_xlsx_chunks(EXCEL_FILE_PATH, 'Items', args.chunk_rows)
+            collections['items'], report = ingest_item_chunks(db, items_chunks_excel, previous_for('items'), args.delete_missing)
+            reports.append(report)
             items_data_loaded = True
         else:
             print("Warning: 'Items' sheet not found in Excel.")
 
         # Check for both 'Machine Mapping' and 'Machine Specification' sheets
-        machine_mapping_loaded = 'Machine Mapping' in xls.sheet_names
-        machine_spec_loaded = 'Machine Specification' in xls.sheet_names
+        machine_mapping_loaded = 'Machine Mapping' in sheet_names
+        machine_spec_loaded = 'Machine Specification' in sheet_names
 
         if machine_mapping_loaded and machine_spec_loaded:
             print("Found 'Machine Mapping' and 'Machine Specification' sheets. Parsing machine data from Excel...")
-            machine_mapping_df_excel = xls.parse('Machine Mapping')
+            machine_mapping_df_excel = read_xlsx_sheet(EXCEL_FILE_PATH, 'Machine Mapping')
             print("Found 'Machine Specification' sheet. Parsing machine data from Excel...")
-            machines_df_excel = xls.parse('Machine Specification')
-            ingest_machines(db, machine_mapping_df_excel, machines_df_excel)
+            machines_df_excel = read_xlsx_sheet(EXCEL_FILE_PATH, 'Machine Specification')
+            collections['machines'], report = ingest_machines(db, machine_mapping_df_excel, machines_df_excel, previous_for('machines'), args.delete_missing)
+            reports.append(report)
             machines_data_loaded = True
         elif not machine_mapping_loaded and machine_spec_loaded:
              print("Warning: 'Machine Mapping' sheet not found in Excel, but 'Machine Specification' was found. Cannot link actual IDs without the mapping.")
@@ -217,9 +286,10 @@ def main():
     if not items_data_loaded:
         print(f"Attempting fallback to CSV for item data: {CSV_ITEMS_FALLBACK_PATH}")
         try:
-            items_df_csv = pd.read_csv(CSV_ITEMS_FALLBACK_PATH, delimiter=';')
-            print("Successfully read item data from CSV.")
-            ingest_items(db, items_df_csv)
+            items_chunks_csv = iter_csv_chunks(CSV_ITEMS_FALLBACK_PATH, args.chunk_rows)
+            print("Streaming item data from CSV.")
+            collections['items'], report = ingest_item_chunks(db, items_chunks_csv, previous_for('items'), args.delete_missing)
+            reports.append(report)
             items_data_loaded = True # Mark as loaded if CSV is successful
         except FileNotFoundError:
             print(f"Error: CSV fallback file '{CSV_ITEMS_FALLBACK_PATH}' not found.")
@@ -229,13 +299,21 @@ def main():
     # Fallback for Machines if not loaded from Excel
     if not machines_data_loaded:
         print("Machine data not loaded from Excel. Creating default machines.")
-        create_default_machines(db)
+        collections['machines'], report = create_default_machines(db, previous_for('machines'))
+        reports.append(report)
         machines_data_loaded = True # Mark as loaded if defaults are created
         
     if not items_data_loaded and not machines_data_loaded:
         print("Critical error: No data could be loaded for items or machines. Exiting.")
         exit()
         
+    changed = any(report['writes'] or report['failedWrites'] for report in reports)
+    publish_dataset_version(db, changed, args.snapshot_bucket)
+
+    try:
+        save_manifest(args.manifest, collections, project_id)
+    except OSError as e:
+        print(f"Warning: Could not write ingest manifest '{args.manifest}': {e}")
     print("Data ingestion script finished.")
 
 if __name__ == "__main__":
@@ -0,0 +1,136 @@
+# item_table.py
+# Column-wise normalization of the raw Items sheet / CSV into a typed items table.
+# Comma decimals, the " MIN" unit suffix and empty cells are handled with pandas
+# string operations on whole columns; rows that cannot be ingested are collected
+# in a rejection report instead of being skipped one at a time.
+import numpy as np
+import pandas as pd
+
+COL_ITEM_ID = 'Item Id'
+COL_OP_TIME = 'Operation Time Per PC'
+COL_MATERIAL_LENGTH = 'Material Length (mm)'
+COL_MACHINE_ID = 'Machine Id'
+COL_FORECAST = 'FORECAST_YEAR'
+COL_FIXED_LOT = 'FIXED_LOT_SIZE'
+COL_RAW_MATERIAL_ID = 'RawMaterial Id'
+
+CONSUMPTION_COLUMN_MAP = {
+    'Consumed January': 'January', 'Consumed February': 'February', 'Consumed March': 'March',
+    'Consumed April': 'April', 'Consumed May': 'May', 'Consumed June': 'June',
+    'Consumed July': 'July', 'Consumed August': 'August', 'Consumed September': 'September',
+    'Consumed October': 'October', 'Consumed November': 'November', 'Consumed December': 'December'
+}
+MONTHS = list(CONSUMPTION_COLUMN_MAP.values())
+
+# Typed table columns: Firestore field name -> dtype
+TABLE_DTYPES = {
+    'itemId': object,
+    'operationTimePerPC': np.float64,
+    'materialLengthMM': np.float64,
+    'currentMachineId': object,
+    'rawMaterialId': object,
+    'forecastYear': np.int64,
+    'FIXED_LOT_SIZE': np.int64,
+    **{month: np.int64 for month in MONTHS},
+}
+
+
+def _text(df, col):
+    # str() of every cell, as the per-row parser did ('' when the column is missing)
+    if col not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+    raw = df[col]
+    # pandas >= 3 keeps missing values as NaN in astype(str); str(nan) gave 'nan'
+    text = raw.astype(str).fillna('nan').astype(object)
+    if pd.api.types.is_float_dtype(raw):
+        # Id columns read as float because of empty cells: 55235206.0 -> '55235206', so the id
+        # does not depend on whether the frame (or chunk) happened to contain an empty cell
+        integral = raw.notna() & np.isfinite(raw) & raw.eq(np.floor(raw))
+        text[integral] = raw[integral].astype(np.int64).astype(str).astype(object)
+    return text.str.strip()
+
+
+def _numeric(df, col, strip_unit=False):
+    """Parses a numeric column with comma decimals. Returns (values, invalid mask); empty cells become 0."""
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index), pd.Series(False, index=df.index)
+    raw = df[col]
+    empty = raw.isna()
+    if pd.api.types.is_numeric_dtype(raw) and not pd.api.types.is_bool_dtype(raw):
+        # Already parsed by read_csv/read_excel: only NaN/inf handling is left
+        values = raw.astype(np.float64)
+        invalid = ~empty & ~np.isfinite(values.fillna(0.0))
+        return values.where(~invalid & ~empty, 0.0), invalid
+    text = raw.astype(str).fillna('').str.replace(',', '.', regex=False)
+    if strip_unit:
+        text = text.str.upper().str.replace(' MIN', '', regex=False)
+    text = text.str.strip()
+    empty |= text.eq('') | text.str.lower().eq('nan')
+    values = pd.to_numeric(text.where(~empty), errors='coerce')
+    invalid = ~empty & ~np.isfinite(values.fillna(0.0))
+    invalid |= ~empty & values.isna()
+    return values.where(~invalid & ~empty, 0.0).astype(np.float64), invalid
+
+
+def normalize_items_frame(df):
+    """Turns the raw items frame into (table, rejections).
+
+    ``table`` has one row per accepted item with the columns of TABLE_DTYPES plus
+    ``sourceRow`` (the spreadsheet row number). ``rejections`` is a list of
+    {"row", "itemId", "reason"} dicts for rows that were not accepted: missing
+    Item Id, unparseable numeric values, or an Item Id repeated further down the
+    sheet (the last occurrence wins, as it would when writing documents).
+    """
+    df = df.rename(columns=lambda col: str(col).strip())
+    # Spreadsheet row numbers (header is row 1); the index keeps counting across read_csv chunks
+    source_row = pd.Series(np.asarray(df.index, dtype=np.int64) + 2, index=df.index)
+
+    item_id = _text(df, COL_ITEM_ID)
+    table = pd.DataFrame({'itemId': item_id}, index=df.index)
+    reasons = pd.Series('', index=df.index, dtype=object)
+    reasons[item_id.eq('') | item_id.str.lower().eq('nan')] = f"missing or invalid {COL_ITEM_ID}"
+
+    numeric_columns = [
+        ('operationTimePerPC', COL_OP_TIME, True),
+        ('materialLengthMM', COL_MATERIAL_LENGTH, False),
+        ('forecastYear', COL_FORECAST, False),
+        ('FIXED_LOT_SIZE', COL_FIXED_LOT, False),
+    ] + [(month, excel_col, False) for excel_col, month in CONSUMPTION_COLUMN_MAP.items()]
+    for field, col, strip_unit in numeric_columns:
+        values, invalid = _numeric(df, col, strip_unit)
+        # Integer fields are truncated toward zero, like int(float(...))
+        table[field] = values if TABLE_DTYPES[field] is np.float64 else np.trunc(values).astype(np.int64)
+        reasons[invalid & reasons.eq('')] = f"invalid {col}"
+
+    table['currentMachineId'] = _text(df, COL_MACHINE_ID)
+    table['rawMaterialId'] = _text(df, COL_RAW_MATERIAL_ID)
+    table['sourceRow'] = source_row
+
+    accepted_ids = item_id[reasons.eq('')]
+    duplicate = accepted_ids.index[accepted_ids.duplicated(keep='last')]
+    if len(duplicate):
+        last_row = dict(zip(accepted_ids, source_row[accepted_ids.index]))
+        reasons[duplicate] = [f"duplicate {COL_ITEM_ID} (superseded by row {last_row[i]})" for i in item_id[duplicate]]
+
+    rejected = reasons.ne('')
+    rejections = [{"row": int(row), "itemId": item, "reason": reason}
+                  for row, item, reason in zip(source_row[rejected], item_id[rejected], reasons[rejected])]
+    table = table[~rejected][list(TABLE_DTYPES) + ['sourceRow']].reset_index(drop=True)
+    return table, rejections
+
+
+def item_documents(table):
+    """Yields (item_id, document) pairs with native Python values, ready for Firestore."""
+    columns = {col: table[col].tolist() for col in TABLE_DTYPES}
+    monthly = [columns[month] for month in MONTHS]
+    for i, item_id in enumerate(columns['itemId']):
+        yield item_id, {
+            'itemId': item_id,
+            'operationTimePerPC': columns['operationTimePerPC'][i],
+            'materialLengthMM': columns['materialLengthMM'][i],
+            'currentMachineId': columns['currentMachineId'][i],
+            'rawMaterialId': columns['rawMaterialId'][i],
+            'forecastYear': columns['forecastYear'][i],
+            'FIXED_LOT_SIZE': columns['FIXED_LOT_SIZE'][i],
+            'monthlyConsumption': {month: values[i] for month, values in zip(MONTHS, monthly)},
+        }
@@ -0,0 +1,64 @@
+# streaming_reader.py
+# Reads the planning input files in bounded chunks instead of whole sheets: CSV via
+# read_csv(chunksize=...), xlsx via openpyxl's read-only row streaming. Each chunk
+# is a DataFrame indexed by (spreadsheet row - 2), like a frame read in one go, so
+# row numbers in reports stay the same.
+import openpyxl
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+DEFAULT_CHUNK_ROWS = 5000
+
+
+def iter_csv_chunks(path, chunk_rows=DEFAULT_CHUNK_ROWS, delimiter=';'):
+    yield from pd.read_csv(path, delimiter=delimiter, chunksize=chunk_rows)
+
+
+def xlsx_sheet_names(path):
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        return list(workbook.sheetnames)
+    finally:
+        workbook.close()
+
+
+def _chunk_frame(header, rows, index):
+    # TextParser applies the same type inference as read_excel (numeric-looking text becomes numbers)
+    frame = TextParser(rows, header=None, names=header).read()
+    frame.index = pd.Index(index, dtype='int64')
+    return frame
+
+
+def iter_xlsx_chunks(path, sheet_name, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Streams a worksheet as DataFrames of up to ``chunk_rows`` rows; the first row is the header.
+
+    Blank rows are skipped and columns without a header are dropped.
+    """
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook[sheet_name].iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+        columns = [c for c, name in enumerate(header_row) if name is not None]
+        header = [str(header_row[c]) for c in columns]
+        chunk, chunk_index = [], []
+        for position, row in enumerate(rows):
+            values = [row[c] if c < len(row) else None for c in columns]
+            if all(value is None for value in values):
+                continue
+            chunk.append(values)
+            chunk_index.append(position)
+            if len(chunk) >= chunk_rows:
+                yield _chunk_frame(header, chunk, chunk_index)
+                chunk, chunk_index = [], []
+        if chunk:
+            yield _chunk_frame(header, chunk, chunk_index)
+    finally:
+        workbook.close()
+
+
+def read_xlsx_sheet(path, sheet_name):
+    """A whole (small) worksheet as one DataFrame, read through the streaming reader."""
+    chunks = list(iter_xlsx_chunks(path, sheet_name))
+    return pd.concat(chunks) if chunks else pd.DataFrame()
@@ -0,0 +1,48 @@
+# conftest.py
+# Shared helpers for the tests. The tests import the function and script modules
+# directly (like src/benchmarks), build small planning datasets from item and machine
+# documents and use the benchmarks' in-memory Firestore fake, so they need neither
+# Firestore nor GCS.
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'benchmarks'))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'scripts'))
+sys.path.insert(0, os.path.join(TESTS_DIR, '..', 'functions'))
+
+import pytest
+
+from planning_data import MONTHS, documents_to_columns, normalize_columns
+
+
+def machine_doc(machine_type="T", daily_hours=8, weekly_days=5, hourly_cost=600.0, tool_change=5, material_change=20):
+    return {
+        'machineType': machine_type,
+        'dailyOperationalHours': daily_hours,
+        'weeklyOperationalDays': weekly_days,
+        'hourlyOperatingCost': hourly_cost,
+        'toolChangeTimeMinutes': tool_change,
+        'rawMaterialChangeTimeMinutes': material_change,
+    }
+
+
+def item_doc(machine_id, demand, op_time=1.0, lot_size=0, raw_material="R1", base_cost=2.0):
+    """``demand`` is one quantity for every month or a list of twelve."""
+    demand = [demand] * len(MONTHS) if isinstance(demand, int) else demand
+    return {
+        'operationTimePerPC': op_time,
+        'currentMachineId': machine_id,
+        'rawMaterialId': raw_material,
+        'FIXED_LOT_SIZE': lot_size,
+        'monthlyConsumption': dict(zip(MONTHS, demand)),
+        'baseCostPerItem': base_cost,
+    }
+
+
+@pytest.fixture
+def make_data():
+    """Normalized planning data from {item_id: item_doc} and {machine_id: machine_doc}."""
+    def make(items, machines):
+        return normalize_columns(documents_to_columns(items.items(), machines.items()))
+    return make
@@ -0,0 +1,34 @@
+import anytime
+from anytime import DEFAULT_RELATIVE_GAP, parse_stop_criteria, solve_anytime
+
+
+def fake_solve(calls, status="OPTIMAL", objective=100.0, bound=100.0):
+    def solve_model(handle, data, **kwargs):
+        calls.append(kwargs)
+        return {"statusName": status, "objective": objective, "bestBound": bound, "stats": {}}
+    return solve_model
+
+
+def test_relative_gap_is_parsed_as_given():
+    assert parse_stop_criteria({})["relative_gap"] is DEFAULT_RELATIVE_GAP is None
+    assert parse_stop_criteria({"relative_gap": 0})["relative_gap"] == 0.0
+    assert parse_stop_criteria({"relative_gap": 0.05})["relative_gap"] == 0.05
+    assert parse_stop_criteria({"relative_gap": 1.5})["relative_gap"] is None
+
+
+def test_no_gap_limit_unless_requested(monkeypatch):
+    calls = []
+    monkeypatch.setattr(anytime, "solve_model", fake_solve(calls))
+    for options in ({}, {"relative_gap": 0}, {"relative_gap": 0.05}):
+        solve_anytime({}, {}, parse_stop_criteria(options), log_search_progress=False)
+    assert [call["relative_gap"] for call in calls] == [None, 0.0, 0.05]
+
+
+def test_stop_on_the_gap_limit_is_feasible(monkeypatch):
+    monkeypatch.setattr(anytime, "solve_model", fake_solve([], bound=97.0))
+    result = solve_anytime({}, {}, parse_stop_criteria({"relative_gap": 0.05}), log_search_progress=False)
+    assert result["statusName"] == "FEASIBLE"
+    assert result["anytime"]["stopReason"] == "relative_gap"
+    monkeypatch.setattr(anytime, "solve_model", fake_solve([]))
+    result = solve_anytime({}, {}, parse_stop_criteria({}), log_search_progress=False)
+    assert (result["statusName"], result["anytime"]["stopReason"]) == ("OPTIMAL", "optimal")
@@ -0,0 +1,58 @@
+import mmap
+
+import numpy as np
+
+from conftest import item_doc, machine_doc
+from dataset_cache import DatasetCache, DatasetEntry
+from dataset_snapshot import read_snapshot, write_snapshot
+from fake_firestore import FakeFirestoreClient
+from planning_data import deterministic_base_cost, documents_to_columns
+
+MACHINES = {"M1": machine_doc()}
+
+
+def is_mapped(array):
+    base = array
+    while base is not None and not isinstance(base, mmap.mmap):
+        base = base.base
+    return base is not None
+
+
+def snapshot_columns(tmp_path, items):
+    write_snapshot(str(tmp_path), documents_to_columns(items.items(), MACHINES.items()))
+    return read_snapshot(str(tmp_path))
+
+
+def test_snapshot_columns_stay_memory_mapped(tmp_path):
+    entry = DatasetEntry(snapshot_columns(tmp_path, {"I1": item_doc("M1", 10), "I2": item_doc("M1", 20)}), {})
+    assert all(is_mapped(array) for array in entry.columns.values())
+    assert not any(array.flags.writeable for array in entry.columns.values())
+
+
+def test_only_missing_base_costs_are_copied_and_filled(tmp_path):
+    missing = {**item_doc("M1", 20), "baseCostPerItem": None}
+    entry = DatasetEntry(snapshot_columns(tmp_path, {"I1": item_doc("M1", 10, base_cost=3.0), "I2": missing}), {})
+    assert entry.columns["baseCostPerItem"].tolist() == [3.0, deterministic_base_cost("I2")]
+    assert not is_mapped(entry.columns["baseCostPerItem"])
+    assert not entry.columns["baseCostPerItem"].flags.writeable
+    assert is_mapped(entry.columns["item_ids"]) and is_mapped(entry.columns["monthlyConsumption"])
+
+
+def test_cache_reloads_when_the_version_changes():
+    db = FakeFirestoreClient()
+    loads = []
+
+    def loader(db, dataset_version):
+        loads.append(dataset_version)
+        return documents_to_columns([("I1", item_doc("M1", 10))], MACHINES.items()), {"version": dataset_version["version"]}
+
+    cache = DatasetCache(loader)
+    meta = db.collection("meta").document("dataset_version")
+    meta.set({"version": "v1"})
+    first, report = cache.get(db)
+    assert report["hit"] is False
+    assert cache.get(db)[0] is first and cache.hits == 1
+    meta.set({"version": "v2"})
+    second, report = cache.get(db)
+    assert second is not first and (report["hit"], report["version"]) == (False, "v2")
+    assert len(loads) == 2
@@ -0,0 +1,53 @@
+from delta_ingest import fingerprint, load_manifest, save_manifest, stored_fingerprints, write_collection
+from fake_firestore import FakeFirestoreClient
+
+
+def test_fingerprint_ignores_key_order():
+    assert fingerprint({"a": 1, "b": {"x": 2, "y": 3}}) == fingerprint({"b": {"y": 3, "x": 2}, "a": 1})
+    assert fingerprint({"a": 1}) != fingerprint({"a": 2})
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    assert load_manifest(path, "p1") is None
+    save_manifest(path, {"items": {"A1": "f1"}}, "p1")
+    assert load_manifest(path, "p1") == {"items": {"A1": "f1"}}
+    # Another project's fingerprints say nothing about this one's documents
+    assert load_manifest(path, "p2") is None
+
+
+def test_only_changes_are_written_and_vanished_documents_deleted():
+    db = FakeFirestoreClient()
+    first = {"A1": {"lot": 1}, "A2": {"lot": 2}, "A3": {"lot": 3}, "A4": {"lot": 4}}
+    previous, report = write_collection(db, "items", first.items())
+    assert report["inserted"] == 4 and report["writes"] == 4
+    assert previous == {doc_id: fingerprint(document) for doc_id, document in first.items()}
+
+    # A1 unchanged, A2 updated, A3 removed from the source, A4 rejected this run, A5 new
+    second = {"A1": {"lot": 1}, "A2": {"lot": 20}, "A5": {"lot": 5}}
+    fingerprints, report = write_collection(db, "items", second.items(), previous, delete_missing=True, keep_ids={"A4"})
+    assert {key: report[key] for key in ("inserted", "updated", "unchanged", "deleted")} == {
+        "inserted": 1, "updated": 1, "unchanged": 1, "deleted": 1}
+    assert report["writes"] == 3
+    stored = db.collection("items").docs
+    assert stored == {"A1": {"lot": 1}, "A2": {"lot": 20}, "A4": {"lot": 4}, "A5": {"lot": 5}}
+    # The kept document stays in the manifest, so a later run still knows it is stored
+    assert fingerprints == stored_fingerprints(db.collection("items"))
+
+
+def test_without_delete_missing_vanished_documents_stay():
+    db = FakeFirestoreClient()
+    previous, _ = write_collection(db, "items", [("A1", {"lot": 1}), ("A2", {"lot": 2})])
+    fingerprints, report = write_collection(db, "items", [("A1", {"lot": 1})], previous)
+    assert report["deleted"] == 0 and report["unchanged"] == 1
+    assert set(db.collection("items").docs) == {"A1", "A2"}
+    assert fingerprints == previous
+
+
+
+def test_a_repeated_id_is_written_once_with_its_last_document():
+    db = FakeFirestoreClient()
+    previous, _ = write_collection(db, "items", [("A1", {"lot": 1})])
+    _, report = write_collection(db, "items", [("A1", {"lot": 1}), ("A1", {"lot": 7})], previous)
+    assert (report["updated"], report["unchanged"]) == (1, 0)
+    assert db.collection("items").docs["A1"] == {"lot": 7}
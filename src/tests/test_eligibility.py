@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import item_doc, machine_doc
+from eligibility import build_eligibility, eligible_pairs
+
+# Two turning machines, one milling machine and one without a type
+MACHINES = {"T1": machine_doc("turning"), "T2": machine_doc("turning"), "F1": machine_doc("milling"), "X1": machine_doc("")}
+
+
+def test_policies(make_data):
+    data = make_data({"I1": item_doc("T2", 10), "I2": item_doc("F1", 10)}, MACHINES)
+    assert build_eligibility(data, "machine_type").tolist() == [[True, True, False, False], [False, False, True, False]]
+    assert build_eligibility(data, "current_machine").tolist() == [[False, True, False, False], [False, False, True, False]]
+    assert build_eligibility(data, "all").all()
+    with pytest.raises(ValueError):
+        build_eligibility(data, "nearest")
+
+
+@pytest.mark.parametrize("policy", ["machine_type", "current_machine"])
+@pytest.mark.parametrize("current", ["", "Z9"])
+def test_missing_or_unknown_current_machine_is_eligible_everywhere(make_data, policy, current):
+    data = make_data({"I1": item_doc(current, 10), "I2": item_doc("T1", 10)}, MACHINES)
+    mask = build_eligibility(data, policy)
+    assert mask[0].all()
+    assert mask[1].sum() == (2 if policy == "machine_type" else 1)
+
+
+def test_blank_machine_type_is_not_a_shared_type(make_data):
+    machines = {**MACHINES, "X2": machine_doc("")}
+    data = make_data({"I1": item_doc("X1", 10), "I2": item_doc("T1", 10)}, machines)
+    mask = build_eligibility(data, "machine_type")
+    assert mask[0].all()
+    # Typed items still never reach the untyped machines
+    assert mask[1].tolist() == [True, True, False, False, False]
+
+
+def test_float_machine_ids_match(make_data):
+    data = make_data({"I1": item_doc("55235206.0", 10)}, {"55235206": machine_doc("turning"), "F1": machine_doc("milling")})
+    assert build_eligibility(data, "current_machine").tolist() == [[True, False]]
+    pair_item, pair_machine = eligible_pairs(build_eligibility(data, "machine_type"))
+    assert (pair_item.tolist(), pair_machine.tolist()) == ([0], [0])
@@ -0,0 +1,78 @@
+import numpy as np
+
+from conftest import item_doc, machine_doc
+from anytime import parse_stop_criteria
+from eligibility import build_eligibility
+from horizon import grid_buckets, parse_horizon, solve_rolling, to_period_data
+from planning_data import MONTHS
+
+DEMAND = [10, 0, 7, 31, 3, 12, 9, 0, 5, 14, 2, 8]
+
+
+def test_weekly_buckets_round_the_cumulative_demand(make_data):
+    data = make_data({"I1": item_doc("M1", DEMAND), "I2": item_doc("M1", 1)}, {"M1": machine_doc()})
+    weekly = to_period_data(data, parse_horizon({"grid": "weekly"}))
+    assert weekly["demand"].shape == (2, 52)
+    assert weekly["demand"].sum(axis=1).tolist() == [sum(DEMAND), 12]
+    # Every week end is the rounded cumulative demand up to that point of the year
+    boundaries, _ = grid_buckets("weekly")
+    monthly_cumulative = np.concatenate([[0], np.cumsum(DEMAND)])
+    month = np.minimum(np.floor(boundaries[1:] + 1e-9).astype(int), 11)
+    expected = np.rint(monthly_cumulative[month] + np.array(DEMAND)[month] * (boundaries[1:] - month))
+    assert np.cumsum(weekly["demand"][0]).tolist() == expected.astype(int).tolist()
+    assert (weekly["demand"] >= 0).all()
+    assert np.allclose(weekly["period_months"], 12 / 52)
+
+
+def test_mixed_grid_is_weekly_then_monthly(make_data):
+    data = make_data({"I1": item_doc("M1", DEMAND)}, {"M1": machine_doc()})
+    mixed = to_period_data(data, parse_horizon({"grid": "mixed", "weeks": 6}))
+    # Six weeks end in February: its rest is one bucket, then whole months
+    assert mixed["period_labels"] == [f"W0{week}" for week in range(1, 7)] + MONTHS[1:]
+    assert np.isclose(mixed["period_months"][:6].sum() + mixed["period_months"][6], 2.0)
+    assert mixed["demand"][0].sum() == sum(DEMAND)
+    assert mixed["demand"][0, 7:].tolist() == DEMAND[2:]
+    assert mixed["demand"][0, :7].sum() == DEMAND[0] + DEMAND[1]
+
+
+def test_parse_horizon_bounds_window_and_freeze():
+    assert parse_horizon(None) is None
+    assert parse_horizon({"grid": "weekly", "window": 8, "freeze": 20}) == {
+        "grid": "weekly", "weeks": None, "periods": 52, "window": 8, "freeze": 8}
+    assert parse_horizon({"grid": "daily", "window": -1})["window"] == 12
+
+
+def rolling(make_data, window, freeze, events=None):
+    items = {"I1": item_doc("M1", DEMAND), "I2": item_doc("M1", 25, op_time=3.0)}
+    data = make_data(items, {"M1": machine_doc(daily_hours=1, weekly_days=1)})
+    horizon = parse_horizon({"grid": "monthly", "window": window, "freeze": freeze})
+    return data, solve_rolling(data, build_eligibility(data), 0.2, "linear", parse_stop_criteria({"max_time_seconds": 30}),
+                               horizon, progress=events.append if events is not None else None)
+
+
+def test_rolling_windows_freeze_their_first_periods(make_data):
+    events = []
+    data, result = rolling(make_data, window=3, freeze=2, events=events)
+    assert [event["periodsFrozen"] for event in events] == [2, 4, 6, 8, 10, 12]
+    assert result["horizon"]["windowsSolved"] == result["horizon"]["windows"] == 6
+    # The frozen periods chain into one plan: stock carried between windows never goes negative
+    produced = np.zeros((2, 12))
+    for entry in result["plan"]:
+        produced[int(entry["itemId"][1]) - 1, MONTHS.index(entry["month"])] += entry["quantity"]
+    assert (np.cumsum(produced - data["demand"], axis=1) >= 0).all()
+    assert result["horizon"]["windowStatuses"] == {"OPTIMAL": 6}
+
+
+def test_optimal_windows_are_reported_as_a_rolling_stop(make_data):
+    _, result = rolling(make_data, window=4, freeze=4)
+    assert result["statusName"] == "FEASIBLE"
+    assert result["anytime"]["stopReason"] == "rolling_horizon"
+    assert result["anytime"]["note"].startswith("Rolling horizon: optimal per window only")
+    assert "stopped before optimality" not in result["anytime"]["note"]
+    assert result["anytime"]["relativeGap"] is None
+
+
+def test_a_single_window_keeps_its_status(make_data):
+    _, result = rolling(make_data, window=12, freeze=12)
+    assert result["statusName"] == "OPTIMAL"
+    assert "stopReason" not in result["anytime"]
@@ -0,0 +1,64 @@
+import numpy as np
+
+from conftest import item_doc, machine_doc
+from anytime import parse_stop_criteria
+from eligibility import DEFAULT_ELIGIBILITY_POLICY, build_eligibility, eligible_pairs
+from incremental import IncrementalStore, fix_outside, solve_incremental
+from overrides import STOCK_HOLDING_RATE_YEARLY_DEFAULT, apply_overrides, writable_columns
+from planning_data import MONTHS, documents_to_columns, normalize_columns
+from planning_model import build_model
+from scenarios import BaseModel
+
+ITEMS = {f"I{n}": item_doc("M1" if n % 2 else "M2", [40 + 15 * ((n + t) % 4) for t in range(12)], op_time=1.0 + 0.5 * n,
+                           raw_material=f"R{n % 2}") for n in range(6)}
+MACHINES = {"M1": machine_doc(daily_hours=2, weekly_days=1), "M2": machine_doc(daily_hours=2, weekly_days=1, hourly_cost=720.0)}
+CRITERIA = parse_stop_criteria({"max_time_seconds": 20})
+
+
+def solve(store, base_data, payload=None):
+    columns = writable_columns(documents_to_columns(ITEMS.items(), MACHINES.items()))
+    rate, _ = apply_overrides(columns, payload or {})
+    return solve_incremental(store, "v1", base_data, STOCK_HOLDING_RATE_YEARLY_DEFAULT, normalize_columns(columns), rate,
+                             DEFAULT_ELIGIBILITY_POLICY, "linear", "basic", CRITERIA, log_search_progress=False)
+
+
+def quantities(plan, skip_item):
+    return sorted((entry["itemId"], entry["machineId"], entry["month"], entry["quantity"])
+                  for entry in plan if entry["itemId"] != skip_item)
+
+
+def test_fix_outside_fixes_the_pairs_of_kept_items(make_data):
+    data = make_data(ITEMS, MACHINES)
+    handle = build_model(data, STOCK_HOLDING_RATE_YEARLY_DEFAULT, pairs=eligible_pairs(build_eligibility(data)))
+    base = BaseModel(handle, data)
+    local, _ = base.patch(data, STOCK_HOLDING_RATE_YEARLY_DEFAULT)
+    reference_qty = np.arange(len(local["pair_item"]) * 12).reshape(-1, 12) % 7
+    free = np.zeros(len(data["item_ids"]), dtype=bool)
+    free[0] = True
+    fixed = fix_outside(local, base, free, reference_qty)
+    assert fixed == int((local["pair_item"] != 0).sum())
+    proto = local["model"].Proto()
+    for p, row in enumerate(base.qty_index):
+        domains = [list(proto.variables[qty].domain) for qty in row]
+        if local["pair_item"][p] == 0:
+            assert all(domain[0] < domain[-1] for domain in domains)
+        else:
+            assert domains == [[value, value] for value in reference_qty[p].tolist()]
+
+
+def test_neighbourhood_solve_is_feasible_without_the_restricted_bound(make_data):
+    store = IncrementalStore()
+    base_data = make_data(ITEMS, MACHINES)
+    first = solve(store, base_data)
+    assert first["incremental"]["mode"] == "full"
+    assert first["statusName"] == "OPTIMAL"
+
+    what_if = solve(store, base_data, {"item_overrides": {"I2": {"monthlyConsumption": {month: 90 for month in MONTHS[:6]}}}})
+    assert what_if["incremental"]["mode"] == "neighbourhood"
+    assert what_if["incremental"]["freeItems"] == 1
+    # Optimal for the neighbourhood only, so no bound or gap for the whole problem
+    assert what_if["statusName"] == "FEASIBLE"
+    assert "bestBound" not in what_if
+    assert what_if["anytime"]["relativeGap"] is None
+    assert quantities(what_if["plan"], "I2") == quantities(first["plan"], "I2")
+    assert sum(entry["quantity"] for entry in what_if["plan"] if entry["itemId"] == "I2") >= 90 * 6
@@ -0,0 +1,61 @@
+import openpyxl
+
+from fake_firestore import FakeFirestoreClient
+from ingest_data import ingest_item_chunks
+from streaming_reader import iter_csv_chunks, iter_xlsx_chunks
+
+HEADER = ["Item Id", "Operation Time Per PC", "Machine Id", "FIXED_LOT_SIZE", "Consumed January"]
+# Rows 2-7 of the sheet: A1 comes again in the last chunk, row 5 has no id
+ROWS = [["A1", "1,5", "M1", "100", "10"], ["A2", "2", "M1", "50", "5"], ["A3", "1", "M2", "0", "1"],
+        ["", "1", "M2", "0", "1"], ["A2", "2,5", "M2", "50", "5"], ["A1", "1,5 MIN", "M2", "777", "10"]]
+
+
+def write_csv(path):
+    path.write_text("\n".join(";".join(row) for row in [HEADER] + ROWS) + "\n")
+    return str(path)
+
+
+def write_xlsx(path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Items"
+    for row in [HEADER] + ROWS:
+        sheet.append(row)
+    workbook.save(path)
+    return str(path)
+
+
+def test_chunks_keep_spreadsheet_row_numbers(tmp_path):
+    csv_chunks = list(iter_csv_chunks(write_csv(tmp_path / "items.csv"), chunk_rows=2))
+    xlsx_chunks = list(iter_xlsx_chunks(write_xlsx(tmp_path / "items.xlsx"), "Items", chunk_rows=2))
+    for chunks in (csv_chunks, xlsx_chunks):
+        assert [(chunk.index + 2).tolist() for chunk in chunks] == [[2, 3], [4, 5], [6, 7]]
+
+
+def test_last_duplicate_wins_across_chunks(tmp_path, capsys):
+    db = FakeFirestoreClient()
+    _, report = ingest_item_chunks(db, iter_csv_chunks(write_csv(tmp_path / "items.csv"), chunk_rows=2))
+    items = db.collection("items").docs
+    assert sorted(items) == ["A1", "A2", "A3"]
+    assert (items["A1"]["FIXED_LOT_SIZE"], items["A1"]["currentMachineId"]) == (777, "M2")
+    assert items["A2"]["operationTimePerPC"] == 2.5
+    # Each id is counted once, by its last row
+    assert (report["inserted"], report["writes"] - report["inserted"]) == (3, 2)
+    assert report["rejectedRows"] == 3
+    output = capsys.readouterr().out
+    assert "Skipping item row 5 (Item ID: nan): missing or invalid Item Id." in output
+    assert "Skipping item row 3 (Item ID: A2): duplicate Item Id (superseded by row 6)." in output
+    assert "Skipping item row 2 (Item ID: A1): duplicate Item Id (superseded by row 7)." in output
+
+
+def test_rerun_of_an_unchanged_file_reports_no_changes(tmp_path):
+    db = FakeFirestoreClient()
+    path = write_csv(tmp_path / "items.csv")
+    fingerprints, _ = ingest_item_chunks(db, iter_csv_chunks(path, chunk_rows=2))
+    stored = {doc_id: dict(document) for doc_id, document in db.collection("items").docs.items()}
+    fingerprints_again, report = ingest_item_chunks(db, iter_csv_chunks(path, chunk_rows=2), fingerprints, delete_missing=True)
+    assert (report["inserted"], report["updated"], report["unchanged"], report["deleted"]) == (0, 0, 3, 0)
+    # The earlier duplicates of A1 and A2 are written and then replaced by their last rows again
+    assert report["writes"] == 4
+    assert db.collection("items").docs == stored
+    assert fingerprints_again == fingerprints
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from item_table import COL_FIXED_LOT, COL_ITEM_ID, COL_MACHINE_ID, COL_OP_TIME, item_documents, normalize_items_frame
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=[COL_ITEM_ID, COL_OP_TIME, COL_MACHINE_ID, COL_FIXED_LOT, 'Consumed March'])
+
+
+def test_text_cells_are_parsed_column_wise():
+    table, rejections = normalize_items_frame(frame([
+        ["A1", "1,5 MIN", "55235206", "120", "7"],
+        ["A2", " 2 min ", "", "", "3,9"],
+    ]))
+    assert rejections == []
+    assert table["operationTimePerPC"].tolist() == [1.5, 2.0]
+    assert table["currentMachineId"].tolist() == ["55235206", ""]
+    # Empty cells are 0 and integer fields truncate toward zero
+    assert table[COL_FIXED_LOT].tolist() == [120, 0]
+    assert table["March"].tolist() == [7, 3]
+    assert table["sourceRow"].tolist() == [2, 3]
+
+
+def test_float_id_columns_keep_integral_ids():
+    # Read with an empty cell, the machine column is float: 55235206.0 stays '55235206'
+    table, _ = normalize_items_frame(frame([["A1", 1.0, 55235206.0, 0, 0], ["A2", 1.0, np.nan, 0, 0]]))
+    assert table["currentMachineId"][0] == "55235206"
+
+
+def test_rows_that_cannot_be_ingested_are_reported():
+    table, rejections = normalize_items_frame(frame([
+        ["A1", "1,0", "M1", "10", "1"],
+        ["", "1,0", "M1", "10", "1"],
+        ["A3", "fast", "M1", "10", "1"],
+        ["A4", "1,0", "M1", "10", "many"],
+    ]))
+    assert table["itemId"].tolist() == ["A1"]
+    assert rejections == [
+        {"row": 3, "itemId": "", "reason": f"missing or invalid {COL_ITEM_ID}"},
+        {"row": 4, "itemId": "A3", "reason": f"invalid {COL_OP_TIME}"},
+        {"row": 5, "itemId": "A4", "reason": "invalid Consumed March"},
+    ]
+
+
+def test_last_duplicate_wins_within_a_frame():
+    table, rejections = normalize_items_frame(frame([["A1", 1.0, "M1", 10, 1], ["A1", 2.0, "M2", 20, 2]]))
+    assert table["operationTimePerPC"].tolist() == [2.0]
+    assert rejections == [{"row": 2, "itemId": "A1", "reason": f"duplicate {COL_ITEM_ID} (superseded by row 3)"}]
+
+
+def test_documents_hold_native_values():
+    table, _ = normalize_items_frame(frame([["A1", "1,5", "M1", "10", "4"]]))
+    [(item_id, document)] = list(item_documents(table))
+    assert item_id == "A1"
+    assert document["monthlyConsumption"]["March"] == 4 and type(document["monthlyConsumption"]["March"]) is int
+    assert document["monthlyConsumption"]["January"] == 0
+    assert (document["operationTimePerPC"], document[COL_FIXED_LOT]) == (1.5, 10)
@@ -0,0 +1,83 @@
+import pytest
+
+from jobs import (JOB_FAILED, JOB_QUEUED, JOB_SUCCEEDED, InMemoryJobStore, LocalJobQueue, TaskQueueDispatcher,
+                  build_job_queue, run_job)
+
+PLAN = [{"month": "January", "machineId": "M1", "itemId": "I1", "quantity": 5, "operationTimeUsedMinutes": 5.0,
+         "machiningCostSEK": 50.0}]
+
+
+class FakeTaskQueue:
+    def __init__(self, error=None):
+        self.tasks = []
+        self.error = error
+
+    def enqueue(self, task_data):
+        if self.error is not None:
+            raise self.error
+        self.tasks.append(task_data)
+        return f"task-{len(self.tasks)}"
+
+
+def solving_runner(payload, progress):
+    progress({"type": "solution", "objective": 10.0, "bestBound": 8.0, "wallTime": 0.5,
+              "bestSolution": {"plan": PLAN, "totalOptimizedMachiningCostSEK": 50.0, "totalOptimizedStockCostEUR": 0.0}})
+    return 200, {"status": "success", "payload": payload}
+
+
+def test_run_job_records_progress_and_result():
+    store = InMemoryJobStore()
+    store.create("j1", {"jobId": "j1", "status": JOB_QUEUED})
+    run_job(store, solving_runner, "j1", {"formulation": "setup"})
+    job = store.get("j1")
+    assert job["status"] == JOB_SUCCEEDED
+    assert job["progress"]["solutions"] == [{"objective": 10.0, "bestBound": 8.0, "wallTime": 0.5}]
+    assert job["bestSolution"]["planPage"]["totalEntries"] == 1
+    assert job["result"] == {"status": "success", "payload": {"formulation": "setup"}}
+
+
+def test_run_job_records_failures():
+    def failing_runner(payload, progress):
+        raise RuntimeError("no data")
+
+    store = InMemoryJobStore()
+    store.create("j1", {"jobId": "j1", "status": JOB_QUEUED})
+    run_job(store, failing_runner, "j1", None)
+    assert store.get("j1")["status"] == JOB_FAILED
+    assert store.get("j1")["result"]["message"] == "no data"
+    run_job(store, lambda payload, progress: (500, {"status": "error"}), "j1", None)
+    assert store.get("j1")["status"] == JOB_FAILED
+
+
+def test_dispatcher_only_records_and_enqueues():
+    store, task_queue = InMemoryJobStore(), FakeTaskQueue()
+    job_id = TaskQueueDispatcher(store, lambda: task_queue).submit({"decompose": True})
+    assert store.get(job_id)["status"] == JOB_QUEUED
+    assert task_queue.tasks == [{"jobId": job_id, "payload": {"decompose": True}}]
+
+
+def test_dispatcher_marks_jobs_it_cannot_enqueue_failed():
+    store = InMemoryJobStore()
+    dispatcher = TaskQueueDispatcher(store, lambda: FakeTaskQueue(PermissionError("cloudtasks.tasks.create denied")))
+    with pytest.raises(PermissionError):
+        dispatcher.submit({})
+    [job] = store._jobs.values()
+    assert job["status"] == JOB_FAILED
+    assert "cloudtasks.tasks.create denied" in job["result"]["message"]
+
+
+def test_deployed_jobs_go_to_the_task_queue(monkeypatch):
+    monkeypatch.delenv("JOB_DISPATCH", raising=False)
+    monkeypatch.delenv("FUNCTIONS_EMULATOR", raising=False)
+    monkeypatch.setenv("K_SERVICE", "optimizationjobs")
+    assert isinstance(build_job_queue(InMemoryJobStore(), solving_runner, FakeTaskQueue), TaskQueueDispatcher)
+    monkeypatch.setenv("FUNCTIONS_EMULATOR", "true")
+    assert isinstance(build_job_queue(InMemoryJobStore(), solving_runner, FakeTaskQueue), LocalJobQueue)
+
+
+def test_local_queue_runs_jobs_on_its_threads():
+    store = InMemoryJobStore()
+    job_queue = LocalJobQueue(store, solving_runner)
+    job_id = job_queue.submit({})
+    job_queue._queue.join()
+    assert store.get(job_id)["status"] == JOB_SUCCEEDED
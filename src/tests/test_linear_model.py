@@ -0,0 +1,85 @@
+import numpy as np
+from ortools.linear_solver import pywraplp
+
+from conftest import item_doc, machine_doc
+from anytime import parse_stop_criteria
+from eligibility import build_eligibility
+from linear_model import _STATUS_NAMES, _machine_load, _repair_overload, build_linear_model, round_relaxation
+from planning_model import model_coefficients
+from solver_backends import select_backend, solve_problem
+
+# 1200 minutes a month (1 h x 1 day x 20 days)
+SMALL_MACHINE = machine_doc(daily_hours=1, weekly_days=1)
+
+
+def test_rounding_covers_cumulative_demand(make_data):
+    data = make_data({"I1": item_doc("M1", 3)}, {"M1": SMALL_MACHINE})
+    handle = build_linear_model(data, 0.2, relaxed=True)
+    values = np.zeros(handle["solver"].NumVariables())
+    values[handle["qty_index"]] = [[2.5, 3.5] * 6]
+    report = round_relaxation(handle, data, values)
+    # Cumulative production 2.5, 6, 8.5, ... rounded up: three pieces every month
+    assert values[handle["qty_index"]].tolist() == [[3.0] * 12]
+    assert values[handle["inv_index"]].tolist() == [[0.0] * 12]
+    assert report == {**report, "capacityViolations": 0, "minLotViolations": 0, "negativeInventory": 0}
+
+
+def test_overload_moves_to_another_machine_in_the_same_period(make_data):
+    data = make_data({"I1": item_doc("M1", 0)}, {"M1": SMALL_MACHINE, "M2": SMALL_MACHINE})
+    coefficients = model_coefficients(data, 0.2)
+    qty = np.zeros((2, 12))
+    qty[0, 3] = 1300  # 100 pieces (minutes) more than M1 has in April
+    load, _ = _machine_load(qty, coefficients, data)
+    _repair_overload(qty, load, coefficients)
+    assert qty[:, 3].tolist() == [1200, 100]
+    assert (load <= np.asarray(coefficients["scaled_capacity"])).all()
+
+
+def test_overload_moves_to_earlier_periods_of_the_pair(make_data):
+    data = make_data({"I1": item_doc("M1", 0)}, {"M1": SMALL_MACHINE})
+    coefficients = model_coefficients(data, 0.2)
+    qty = np.zeros((1, 12))
+    qty[0, 5] = 1300
+    qty[0, 4] = 1150
+    load, _ = _machine_load(qty, coefficients, data)
+    _repair_overload(qty, load, coefficients)
+    assert qty[0, 3:6].tolist() == [50, 1200, 1200]
+    assert (load <= np.asarray(coefficients["scaled_capacity"])).all()
+
+
+def test_rejected_rounding_falls_back_to_cpsat(make_data):
+    # The relaxation spreads the lot of 1000 over the year, so its rounded plan breaks the minimum lot
+    data = make_data({"I1": item_doc("M1", 2, lot_size=1000)}, {"M1": machine_doc()})
+    result = solve_problem(data, build_eligibility(data), 0.2, "linear", parse_stop_criteria({"max_time_seconds": 20}),
+                           backend="lp", formulation="setup", log_search_progress=False)
+    assert result["relaxation"]["planFeasible"] is False
+    assert result["backend"]["fallback"]["backend"] == "cpsat"
+    assert result["statusName"] == "OPTIMAL"
+    assert [entry["quantity"] for entry in result["plan"]] == [1000]
+
+
+def test_auto_never_selects_the_relaxation():
+    assert select_backend("auto", 10 ** 6)[0] == "cpsat"
+    assert select_backend("lp", 10)[0] == "lp"
+
+
+def test_auto_keeps_cpsat_for_listeners_and_no_improvement_stops():
+    assert select_backend("auto", 50000)[0] == "mip"
+    assert select_backend("auto", 50000, listener=print)[0] == "cpsat"
+    assert select_backend("auto", 50000, criteria=parse_stop_criteria({"no_improvement_seconds": 5}))[0] == "cpsat"
+    assert select_backend("mip", 10, listener=print)[0] == "mip"
+
+
+def test_a_requested_mip_reports_the_criteria_it_ignores(make_data):
+    data = make_data({"I1": item_doc("M1", 3)}, {"M1": SMALL_MACHINE})
+    result = solve_problem(data, build_eligibility(data), 0.2, "linear",
+                           parse_stop_criteria({"max_time_seconds": 10, "no_improvement_seconds": 5}), backend="mip",
+                           log_search_progress=False)
+    assert result["statusName"] == "OPTIMAL"
+    assert result["anytime"]["ignoredCriteria"] == ["no_improvement_seconds"]
+
+
+def test_unbounded_and_abnormal_keep_their_status_names():
+    assert _STATUS_NAMES[pywraplp.Solver.UNBOUNDED] == "UNBOUNDED"
+    assert _STATUS_NAMES[pywraplp.Solver.ABNORMAL] == "ABNORMAL"
+    assert _STATUS_NAMES[pywraplp.Solver.MODEL_INVALID] == "MODEL_INVALID"
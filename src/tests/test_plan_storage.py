@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import google.cloud.firestore
+
+from fake_firestore import FakeFirestoreClient
+from plan_storage import (decode_plan, encode_plan, load_latest_header, load_latest_plan, parse_plan_view, plan_view,
+                          save_plan, stored_plan_view)
+from planning_data import MONTHS
+from warm_start import plan_is_compatible
+
+CREATED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def plan_entries(count):
+    return [{"month": MONTHS[k % 12], "machineId": f"M{k % 3}", "itemId": f"I{k // 12}", "quantity": k,
+             "operationTimeUsedMinutes": k * 1.5, "machiningCostSEK": k * 10.0} for k in range(count)]
+
+
+def header(version, days=0, formulation="basic"):
+    return {"createdAt": CREATED + timedelta(days=days), "dataset": {"version": version}, "horizon": None,
+            "setup": {"formulation": formulation}, "eligibility": {"policy": "machine_type"}}
+
+
+def test_encoding_round_trips_weekly_periods():
+    entries = plan_entries(30)
+    entries[0]["period"] = "W01"
+    encoded = encode_plan(entries)
+    assert len(encoded["itemIds"]) == 3 and len(encoded["machineIds"]) == 3
+    assert decode_plan(encoded) == entries
+
+
+def test_saved_pages_load_back_as_the_plan():
+    db, entries = FakeFirestoreClient(), plan_entries(25)
+    plan_id = save_plan(db, header("v1"), entries, page_entries=10)
+    pages = db.collection("production_plans").subcollections[(plan_id, "pages")].docs
+    assert sorted(pages) == ["00000", "00001", "00002"]
+    assert all(isinstance(page["data"], bytes) for page in pages.values())
+    loaded_id, plan = load_latest_plan(db)
+    assert loaded_id == plan_id
+    assert plan["plan"] == entries
+    assert plan["planStorage"] == {"format": "columnar-gzip-pages-v1", "entries": 25, "pages": 3, "pageEntries": 10}
+
+
+def test_stored_view_pages_match_the_in_memory_view():
+    db, entries = FakeFirestoreClient(), plan_entries(25)
+    plan_id = save_plan(db, header("v1"), entries, page_entries=10)
+    _, stored = load_latest_header(db)
+    for options in ({"page": 1, "page_size": 7}, {"page": 3, "page_size": 7}, {"format": "columnar", "page_size": 11},
+                    {"item_ids": "I1", "machine_ids": ["M0", "M2"]}, {"page": 9}):
+        view = parse_plan_view(options)
+        assert stored_plan_view(db, plan_id, stored, view) == plan_view(entries, view, plan_id)
+    plan, page = stored_plan_view(db, plan_id, stored, parse_plan_view({"page": 3, "page_size": 7}))
+    assert [entry["quantity"] for entry in plan] == [21, 22, 23, 24]
+    assert (page["pages"], page["totalEntries"]) == (4, 25)
+
+
+def test_latest_compatible_plan_is_loaded():
+    db = FakeFirestoreClient()
+    old_id = save_plan(db, header("v1", days=0), plan_entries(3))
+    save_plan(db, header("v1", days=2, formulation="setup"), plan_entries(5))
+    save_plan(db, header("v0", days=1), plan_entries(4))
+
+    def compatible(stored):
+        return plan_is_compatible(stored, "v1", "basic", "machine_type")
+
+    assert load_latest_header(db)[1]["setup"]["formulation"] == "setup"
+    assert load_latest_plan(db, compatible, candidates=2) == (None, None)
+    plan_id, plan = load_latest_plan(db, compatible, candidates=3)
+    assert plan_id == old_id and len(plan["plan"]) == 3
+
+
+def test_server_timestamps_order_the_plans():
+    db = FakeFirestoreClient()
+    save_plan(db, {**header("v1"), "createdAt": google.cloud.firestore.SERVER_TIMESTAMP}, plan_entries(1))
+    newest = save_plan(db, {**header("v2"), "createdAt": google.cloud.firestore.SERVER_TIMESTAMP}, plan_entries(2))
+    plan_id, stored = load_latest_header(db)
+    assert plan_id == newest and isinstance(stored["createdAt"], datetime)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from conftest import item_doc, machine_doc
+from planning_model import baseline_costs
+
+# 10 and 5 SEK a minute
+MACHINES = {"M1": machine_doc(hourly_cost=600.0), "M2": machine_doc(hourly_cost=300.0)}
+
+
+def data_with_fallback(make_data, current_machine):
+    return make_data({"A": item_doc("M1", 3, op_time=2.0, lot_size=10), "B": item_doc(current_machine, 1, lot_size=1)}, MACHINES)
+
+
+@pytest.mark.parametrize("current_machine", ["", "M9"])
+def test_items_without_a_known_machine_are_priced_on_the_cheapest(make_data, current_machine):
+    baseline = baseline_costs(data_with_fallback(make_data, current_machine), 0.24)
+    assert baseline["machine"].tolist() == [0, 1]
+    assert baseline["fallbackItems"] == 1
+    # A: 36 pieces x 2 min x 10 SEK on its own M1; B: 12 pieces x 1 min x 5 SEK on M2
+    assert baseline["machiningCostSEK"].tolist() == [720.0, 60.0]
+
+
+def test_stock_follows_fixed_lot_replenishment(make_data):
+    baseline = baseline_costs(data_with_fallback(make_data, "M2"), 0.24)
+    # A orders 10 whenever 3 a month would run it short: closing stock 7, 4, 1, 8, ... sums to 56
+    # pieces held at 2 SEK x 24 % / 12 a month; B's lots of 1 leave nothing in stock
+    assert baseline["stockCostEUR"] == pytest.approx([56 * 0.04, 0.0])
+    assert baseline["fallbackItems"] == 0
+
+
+def test_initial_inventory_is_used_before_the_first_lot(make_data):
+    data = data_with_fallback(make_data, "M2")
+    data["initial_inventory"] = np.array([30, 0])
+    baseline = baseline_costs(data, 0.24)
+    # 27, 24, ..., 0 from the initial stock, then lots in November: 7 and 4
+    assert baseline["stockCostEUR"][0] == pytest.approx((135 + 7 + 4) * 0.04)
+    assert baseline["machiningCostSEK"][0] == 720.0
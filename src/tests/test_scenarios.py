@@ -0,0 +1,77 @@
+import pytest
+
+from conftest import item_doc, machine_doc
+from anytime import parse_stop_criteria, solve_anytime
+from eligibility import build_eligibility, eligible_pairs
+from overrides import STOCK_HOLDING_RATE_YEARLY_DEFAULT, apply_overrides, writable_columns
+from planning_data import MONTHS, documents_to_columns, normalize_columns
+from planning_model import build_model
+from scenarios import BaseModel
+
+ITEMS = {f"I{n}": item_doc("M1" if n % 2 else "M2", [40 + 15 * ((n + t) % 4) for t in range(12)], op_time=1.0 + 0.5 * n,
+                           lot_size=60 if n % 3 == 0 else 0, raw_material=f"R{n % 2}") for n in range(6)}
+# 2400 minutes a month each, so demand and capacity interact
+MACHINES = {"M1": machine_doc(daily_hours=2, weekly_days=1), "M2": machine_doc(daily_hours=2, weekly_days=1, hourly_cost=720.0)}
+
+SCENARIOS = [
+    {"item_overrides": {"I2": {"monthlyConsumption": {month: 90 for month in MONTHS[:6]}}}},
+    {"item_overrides": {"I1": {"operationTimePerPC": 4.0}}},
+    {"item_overrides": {"I0": {"FIXED_LOT_SIZE": 150}}},
+    {"machine_overrides": {"M1": {"dailyOperationalHours": 1.5}}},
+    {"machine_overrides": {"M2": {"hourlyOperatingCost": 500.0}}},
+    {"global_overrides": {"STOCK_HOLDING_RATE_YEARLY": 0.4}},
+]
+
+
+def scenario_data(columns, payload):
+    columns = writable_columns(columns)
+    rate, _ = apply_overrides(columns, payload)
+    return normalize_columns(columns), rate
+
+
+def nonzero_terms(vars, coeffs):
+    # A rebuild drops terms whose coefficient became zero; a patched copy keeps them at zero
+    return {var: coeff for var, coeff in zip(vars, coeffs) if coeff}
+
+
+def constraint_form(constraint):
+    if not constraint.has_linear():
+        return str(constraint)
+    linear = constraint.linear
+    return list(constraint.enforcement_literal), nonzero_terms(linear.vars, linear.coeffs), list(linear.domain)
+
+
+@pytest.mark.parametrize("formulation", ["basic", "setup"])
+@pytest.mark.parametrize("payload", SCENARIOS)
+def test_patched_copy_matches_a_rebuild(formulation, payload):
+    columns = documents_to_columns(ITEMS.items(), MACHINES.items())
+    base_data = normalize_columns(columns)
+    pairs = eligible_pairs(build_eligibility(base_data))
+    base = BaseModel(build_model(base_data, STOCK_HOLDING_RATE_YEARLY_DEFAULT, pairs=pairs, formulation=formulation), base_data)
+
+    data, rate = scenario_data(columns, payload)
+    patched, reason = base.patch(data, rate)
+    assert patched is not None, reason
+    rebuilt = build_model(data, rate, pairs=pairs, formulation=formulation)
+
+    patched_proto, rebuilt_proto = patched["model"].Proto(), rebuilt["model"].Proto()
+    assert [list(var.domain) for var in patched_proto.variables] == [list(var.domain) for var in rebuilt_proto.variables]
+    assert [constraint_form(c) for c in patched_proto.constraints] == [constraint_form(c) for c in rebuilt_proto.constraints]
+    assert (nonzero_terms(patched_proto.objective.vars, patched_proto.objective.coeffs)
+            == nonzero_terms(rebuilt_proto.objective.vars, rebuilt_proto.objective.coeffs))
+
+
+@pytest.mark.parametrize("payload", SCENARIOS)
+def test_patched_copy_solves_to_the_rebuilt_optimum(payload):
+    columns = documents_to_columns(ITEMS.items(), MACHINES.items())
+    base_data = normalize_columns(columns)
+    pairs = eligible_pairs(build_eligibility(base_data))
+    base = BaseModel(build_model(base_data, STOCK_HOLDING_RATE_YEARLY_DEFAULT, pairs=pairs), base_data)
+
+    data, rate = scenario_data(columns, payload)
+    patched, _ = base.patch(data, rate)
+    criteria = parse_stop_criteria({"max_time_seconds": 30})
+    patched_result = solve_anytime(patched, data, criteria, log_search_progress=False)
+    rebuilt_result = solve_anytime(build_model(data, rate, pairs=pairs), data, criteria, log_search_progress=False)
+    assert patched_result["statusName"] == rebuilt_result["statusName"] == "OPTIMAL"
+    assert patched_result["objective"] == pytest.approx(rebuilt_result["objective"], rel=2e-4)
@@ -0,0 +1,65 @@
+import pytest
+
+from conftest import item_doc, machine_doc
+from anytime import parse_stop_criteria
+from eligibility import build_eligibility
+from planning_model import setup_summary
+from solver_backends import solve_problem
+
+# One machine with 1200 minutes a month (1 h x 1 day x 20 days), 5 min tool and 20 min material changes
+SMALL_MACHINE = machine_doc(daily_hours=1, weekly_days=1, tool_change=5, material_change=20)
+
+
+def solve(data, formulation="setup", backend="cpsat"):
+    return solve_problem(data, build_eligibility(data), 0.2, "linear", parse_stop_criteria({"max_time_seconds": 20}),
+                         backend=backend, formulation=formulation, log_search_progress=False)
+
+
+@pytest.mark.parametrize("backend", ["cpsat", "mip"])
+def test_lot_above_the_stock_bound_is_feasible(make_data, backend):
+    # A slow mover whose fixed lot exceeds twice its yearly demand
+    data = make_data({"I1": item_doc("M1", 2, lot_size=1000)}, {"M1": machine_doc()})
+    assert solve(data, formulation="basic", backend=backend)["statusName"] == "OPTIMAL"
+    result = solve(data, backend=backend)
+    assert result["statusName"] == "OPTIMAL"
+    assert [entry["quantity"] for entry in result["plan"]] == [1000]
+
+
+def test_producing_pairs_make_at_least_the_minimum_lot(make_data):
+    items = {f"I{n}": item_doc("M1", 40 + 10 * n, lot_size=150, raw_material=f"R{n}") for n in range(3)}
+    result = solve(make_data(items, {"M1": SMALL_MACHINE}))
+    assert result["statusName"] == "OPTIMAL"
+    assert result["plan"]
+    assert all(entry["quantity"] >= 150 for entry in result["plan"])
+
+
+def plan_minutes(plan, data):
+    """Production plus changeover minutes of a plan per (machine, month), as setup_summary counts changeovers."""
+    op_time = dict(zip(data["item_ids"].tolist(), data["op_time"].tolist()))
+    minutes = {}
+    for entry in plan:
+        key = (entry["machineId"], entry["month"])
+        minutes[key] = minutes.get(key, 0.0) + entry["quantity"] * op_time[entry["itemId"]]
+    for key in minutes:
+        entries = [entry for entry in plan if (entry["machineId"], entry["month"]) == key]
+        minutes[key] += setup_summary(entries, data)["setupMinutes"]
+    return minutes
+
+
+def test_shared_material_is_charged_once_per_machine_and_period(make_data):
+    # Both items run every month and use all but 40 minutes: two tool changes and one
+    # material change (30 min) fit, two material changes (50 min) would not
+    items = {"I1": item_doc("M1", 580, raw_material="R1"), "I2": item_doc("M1", 580, raw_material="R1")}
+    data = make_data(items, {"M1": SMALL_MACHINE})
+    result = solve(data)
+    assert result["statusName"] == "OPTIMAL"
+    assert setup_summary(result["plan"], data)["materialChangeovers"] == 12
+    capacity = float(data["capacity_minutes"][0])
+    assert all(minutes <= capacity for minutes in plan_minutes(result["plan"], data).values())
+
+
+def test_changeovers_count_against_capacity(make_data):
+    items = {"I1": item_doc("M1", 580, raw_material="R1"), "I2": item_doc("M1", 580, raw_material="R2")}
+    data = make_data(items, {"M1": SMALL_MACHINE})
+    assert solve(data, formulation="basic")["statusName"] == "OPTIMAL"
+    assert solve(data)["statusName"] == "INFEASIBLE"
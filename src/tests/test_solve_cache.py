@@ -0,0 +1,73 @@
+import os
+import time
+
+import solve_cache
+from conftest import item_doc, machine_doc
+from overrides import apply_overrides, writable_columns
+from planning_data import documents_to_columns, normalize_columns
+from solve_cache import DiskCache, MemoryCache, TieredCache, make_cache_key
+
+ITEMS = {"I1": item_doc("M1", 40), "I2": item_doc("M2", 25, lot_size=100)}
+MACHINES = {"M1": machine_doc(), "M2": machine_doc(hourly_cost=720.0)}
+OPTIONS = {"objective_mode": "linear", "formulation": "basic", "backend": "auto", "relative_gap": None}
+
+
+def key(payload=None, **options):
+    columns = writable_columns(documents_to_columns(ITEMS.items(), MACHINES.items()))
+    rate, _ = apply_overrides(columns, payload or {})
+    return make_cache_key(normalize_columns(columns), payload, {**OPTIONS, "stock_holding_rate_yearly": rate, **options})
+
+
+def test_key_is_stable():
+    assert key() == key()
+    assert key({"item_overrides": {"I1": {"FIXED_LOT_SIZE": 50}}}) == key({"item_overrides": {"I1": {"FIXED_LOT_SIZE": 50}}})
+
+
+def test_key_changes_with_overrides_and_options():
+    keys = {
+        key(),
+        key({"item_overrides": {"I1": {"FIXED_LOT_SIZE": 50}}}),
+        key({"item_overrides": {"I1": {"FIXED_LOT_SIZE": 60}}}),
+        key({"machine_overrides": {"M2": {"hourlyOperatingCost": 500.0}}}),
+        key({"global_overrides": {"STOCK_HOLDING_RATE_YEARLY": 0.4}}),
+        key(formulation="setup"),
+        key(backend="mip"),
+        key(relative_gap=0.05),
+        key(eligibility="all"),
+    }
+    assert len(keys) == 9
+
+
+def test_memory_entries_expire_and_least_recently_used_go_first(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(solve_cache.time, "time", lambda: now[0])
+    cache = MemoryCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    now[0] += 61
+    assert cache.get("a") is None
+
+
+def test_disk_entries_expire_and_oldest_go_first(tmp_path):
+    cache = DiskCache(str(tmp_path), max_entries=2, ttl_seconds=60)
+    for n, name in enumerate(["a", "b", "c"]):
+        cache.put(name, {"n": n})
+        os.utime(tmp_path / f"{name}.json", (time.time() - 30 + n, time.time() - 30 + n))
+    assert sorted(os.listdir(tmp_path)) == ["b.json", "c.json"]
+    assert cache.get("c") == {"n": 2}
+    os.utime(tmp_path / "c.json", (time.time() - 61, time.time() - 61))
+    assert cache.get("c") is None
+    assert not (tmp_path / "c.json").exists()
+
+
+def test_disk_hits_are_promoted(tmp_path):
+    disk = DiskCache(str(tmp_path))
+    disk.put("a", {"status": "success"})
+    cache = TieredCache(MemoryCache(), disk)
+    assert cache.get("a") == {"status": "success"}
+    assert cache.memory.get("a") == {"status": "success"}
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
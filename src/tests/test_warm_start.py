@@ -0,0 +1,65 @@
+import numpy as np
+
+from conftest import item_doc, machine_doc
+from eligibility import build_eligibility, eligible_pairs
+from planning_data import MONTHS
+from planning_model import build_model
+from warm_start import apply_warm_start, hint_is_feasible, plan_is_compatible
+
+# 1200 minutes a month, 5 min tool and 20 min material changes
+SMALL_MACHINE = machine_doc(daily_hours=1, weekly_days=1, tool_change=5, material_change=20)
+
+
+def model(data, formulation="basic"):
+    return build_model(data, 0.2, pairs=eligible_pairs(build_eligibility(data)), formulation=formulation)
+
+
+def test_initial_stock_covers_demand(make_data):
+    data = make_data({"I1": item_doc("M1", 10)}, {"M1": SMALL_MACHINE})
+    handle = model(data)
+    no_production = np.zeros((1, 12), dtype=np.int64)
+    assert hint_is_feasible(no_production, handle, data)[0] is False
+    data["initial_inventory"] = np.array([120])
+    feasible, inventory = hint_is_feasible(no_production, model(data), data)
+    assert feasible is True
+    assert inventory[0].tolist() == list(range(110, -1, -10))
+
+
+def test_changeovers_count_against_capacity(make_data):
+    items = {"I1": item_doc("M1", 580, raw_material="R1"), "I2": item_doc("M1", 580, raw_material="R2")}
+    data = make_data(items, {"M1": SMALL_MACHINE})
+    hint = np.full((2, 12), 580, dtype=np.int64)
+    # 1160 of 1200 minutes: fits without setups, not with two tool and two material changes (50 min)
+    assert hint_is_feasible(hint, model(data), data)[0] is True
+    assert hint_is_feasible(hint, model(data, "setup"), data)[0] is False
+
+
+def test_setup_hint_below_the_minimum_lot_is_infeasible(make_data):
+    data = make_data({"I1": item_doc("M1", 50, lot_size=100)}, {"M1": SMALL_MACHINE})
+    handle = model(data, "setup")
+    every_month = np.full((1, 12), 50, dtype=np.int64)
+    every_other_month = np.tile([100, 0], 6).reshape(1, 12)
+    assert hint_is_feasible(every_month, handle, data)[0] is False
+    assert hint_is_feasible(every_other_month, handle, data)[0] is True
+
+
+def test_apply_warm_start_reports_feasibility(make_data):
+    data = make_data({"I1": item_doc("M1", 50, lot_size=100)}, {"M1": SMALL_MACHINE})
+    plan = {"plan": [{"itemId": "I1", "machineId": "M1", "month": month, "quantity": 50} for month in MONTHS]}
+    report = apply_warm_start(model(data, "setup"), data, "p1", plan)
+    assert report["applied"] is True
+    assert report["matchedEntries"] == 12
+    assert report["hintFeasible"] is False
+    assert apply_warm_start(model(data), data, "p1", plan)["hintFeasible"] is True
+
+
+def test_compatible_plans():
+    header = {"dataset": {"version": "v2"}, "horizon": None, "setup": {"formulation": "basic"},
+              "eligibility": {"policy": "machine_type"}}
+    assert plan_is_compatible(header, "v2", "basic", "machine_type")
+    assert not plan_is_compatible(header, "v1", "basic", "machine_type")
+    assert not plan_is_compatible(header, "v2", "setup", "machine_type")
+    assert not plan_is_compatible(header, "v2", "basic", "all")
+    assert not plan_is_compatible({**header, "horizon": {"grid": "weekly"}}, "v2", "basic", "machine_type")
+    # Plans stored before these fields were recorded
+    assert not plan_is_compatible({"totalOptimizedCost": 1.0}, "v2", "basic", "machine_type")